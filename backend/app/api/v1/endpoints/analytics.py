@@ -1,8 +1,12 @@
-from typing import List
+import math
+from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select, func
-from app.core.db import get_session
-from app.models.telemetry import GovernanceTelemetry
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import get_async_session
+from app.models.rollup import TelemetryRollup
+from app.services.analytics_cache import cached
+from app.services.rollups import GRAINS
 from app.schemas.analytics import (
     ModelPerformance, 
     CostBreakdown, 
@@ -12,55 +16,98 @@ from app.schemas.analytics import (
 )
 from datetime import datetime, timedelta
 
+# Every endpoint reads the pre-aggregated rollups (app.services.rollups), never raw
+# telemetry: all-time views sum the day buckets, time-windowed ones the hour buckets.
+
 router = APIRouter()
 
+def _round_ms(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+def _mean(total, count):
+    # NULL (not 0) when nothing was counted, like AVG over no rows
+    return total / func.nullif(count, 0)
+
+def _stddev(sum_, sumsq, count) -> Optional[float]:
+    if not count:
+        return None
+    mean = sum_ / count
+    return round(math.sqrt(max(sumsq / count - mean * mean, 0.0)), 4)
+
+_requests = func.sum(TelemetryRollup.request_count)
+# Mean accuracy over rows with a judge verdict (NULL if none)
+_scored_accuracy = _mean(func.sum(TelemetryRollup.scored_accuracy_sum), func.sum(TelemetryRollup.scored_count))
+_day = TelemetryRollup.grain == "day"
+
 @router.get("/model-performance", response_model=List[ModelPerformance])
-def get_model_performance(
-    session: Session = Depends(get_session),
+@cached
+async def get_model_performance(
+    session: AsyncSession = Depends(get_async_session),
     limit: int = Query(50, description="Max number of models to return")
 ):
     """
     Get aggregated performance metrics for each model.
     Returns average accuracy, cost, latency, and token usage per model.
     """
-    # SQL aggregation query
     statement = (
         select(
-            GovernanceTelemetry.model_id,
-            GovernanceTelemetry.host_platform,
-            func.count(GovernanceTelemetry.id).label("total_requests"),
-            func.avg(GovernanceTelemetry.accuracy_score).label("avg_accuracy"),
-            func.avg(GovernanceTelemetry.total_cost).label("avg_cost"),
-            func.avg(GovernanceTelemetry.latency_ms).label("avg_latency_ms"),
-            func.avg(GovernanceTelemetry.input_tokens).label("avg_input_tokens"),
-            func.avg(GovernanceTelemetry.output_tokens).label("avg_output_tokens"),
-            func.sum(GovernanceTelemetry.total_cost).label("total_cost")
+            TelemetryRollup.model_id,
+            TelemetryRollup.host_platform,
+            _requests.label("total_requests"),
+            # Accuracy over judged rows only; pending, skipped and failed evaluations carry a placeholder 0
+            func.sum(TelemetryRollup.scored_count).label("scored_count"),
+            func.sum(TelemetryRollup.scored_accuracy_sum).label("accuracy_sum"),
+            func.sum(TelemetryRollup.scored_accuracy_sumsq).label("accuracy_sumsq"),
+            func.sum(TelemetryRollup.cost_sum).label("total_cost"),
+            # Batch inference rows carry no per-call latency and are left out of it
+            func.sum(TelemetryRollup.online_count).label("online_count"),
+            func.sum(TelemetryRollup.online_latency_sum).label("online_latency_sum"),
+            func.sum(TelemetryRollup.online_latency_sumsq).label("online_latency_sumsq"),
+            func.sum(TelemetryRollup.input_tokens_sum).label("input_tokens_sum"),
+            func.sum(TelemetryRollup.output_tokens_sum).label("output_tokens_sum"),
+            # Phase breakdown; averaged over the rows that recorded each phase
+            _mean(func.sum(TelemetryRollup.db_setup_ms_sum), func.sum(TelemetryRollup.db_setup_ms_count)).label("avg_db_setup_ms"),
+            _mean(func.sum(TelemetryRollup.guardrail_ms_sum), func.sum(TelemetryRollup.guardrail_ms_count)).label("avg_guardrail_ms"),
+            _mean(func.sum(TelemetryRollup.provider_call_ms_sum), func.sum(TelemetryRollup.provider_call_ms_count)).label("avg_provider_call_ms"),
+            _mean(func.sum(TelemetryRollup.time_to_first_token_ms_sum), func.sum(TelemetryRollup.time_to_first_token_ms_count)).label("avg_time_to_first_token_ms"),
+            _mean(func.sum(TelemetryRollup.evaluation_ms_sum), func.sum(TelemetryRollup.evaluation_ms_count)).label("avg_evaluation_ms"),
+            _mean(func.sum(TelemetryRollup.persistence_ms_sum), func.sum(TelemetryRollup.persistence_ms_count)).label("avg_persistence_ms")
         )
-        .group_by(GovernanceTelemetry.model_id, GovernanceTelemetry.host_platform)
-        .order_by(func.count(GovernanceTelemetry.id).desc())
+        .where(_day)
+        .group_by(TelemetryRollup.model_id, TelemetryRollup.host_platform)
+        .order_by(_requests.desc())
         .limit(limit)
     )
     
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     
     return [
         ModelPerformance(
             model_id=row.model_id,
             host_platform=row.host_platform,
             total_requests=row.total_requests,
-            avg_accuracy=round(row.avg_accuracy or 0, 2),
-            avg_cost=round(row.avg_cost or 0, 6),
-            avg_latency_ms=round(row.avg_latency_ms or 0, 2),
-            avg_input_tokens=int(row.avg_input_tokens or 0),
-            avg_output_tokens=int(row.avg_output_tokens or 0),
-            total_cost=round(row.total_cost or 0, 4)
+            avg_accuracy=round(row.accuracy_sum / row.scored_count, 2) if row.scored_count else 0.0,
+            avg_cost=round(row.total_cost / row.total_requests, 6),
+            avg_latency_ms=round(row.online_latency_sum / row.online_count, 2) if row.online_count else 0.0,
+            avg_input_tokens=int(row.input_tokens_sum / row.total_requests),
+            avg_output_tokens=int(row.output_tokens_sum / row.total_requests),
+            total_cost=round(row.total_cost, 4),
+            stddev_accuracy=_stddev(row.accuracy_sum, row.accuracy_sumsq, row.scored_count),
+            stddev_latency_ms=_stddev(row.online_latency_sum, row.online_latency_sumsq, row.online_count),
+            avg_db_setup_ms=_round_ms(row.avg_db_setup_ms),
+            avg_guardrail_ms=_round_ms(row.avg_guardrail_ms),
+            avg_provider_call_ms=_round_ms(row.avg_provider_call_ms),
+            avg_time_to_first_token_ms=_round_ms(row.avg_time_to_first_token_ms),
+            avg_evaluation_ms=_round_ms(row.avg_evaluation_ms),
+            avg_persistence_ms=_round_ms(row.avg_persistence_ms)
         )
         for row in results
     ]
 
 @router.get("/cost-breakdown", response_model=List[CostBreakdown])
-def get_cost_breakdown(
-    session: Session = Depends(get_session),
+@cached
+async def get_cost_breakdown(
+    session: AsyncSession = Depends(get_async_session),
     group_by: str = Query("model", description="Group by 'model' or 'platform'")
 ):
     """
@@ -68,103 +115,98 @@ def get_cost_breakdown(
     Shows total spend and average cost per request.
     """
     if group_by == "platform":
-        statement = (
-            select(
-                GovernanceTelemetry.host_platform,
-                func.literal("All Models").label("model_id"),
-                func.count(GovernanceTelemetry.id).label("total_requests"),
-                func.sum(GovernanceTelemetry.total_cost).label("total_cost"),
-                func.avg(GovernanceTelemetry.total_cost).label("avg_cost_per_request")
-            )
-            .group_by(GovernanceTelemetry.host_platform)
-            .order_by(func.sum(GovernanceTelemetry.total_cost).desc())
-        )
+        columns = (TelemetryRollup.host_platform,)
     else:
-        statement = (
-            select(
-                GovernanceTelemetry.host_platform,
-                GovernanceTelemetry.model_id,
-                func.count(GovernanceTelemetry.id).label("total_requests"),
-                func.sum(GovernanceTelemetry.total_cost).label("total_cost"),
-                func.avg(GovernanceTelemetry.total_cost).label("avg_cost_per_request")
-            )
-            .group_by(GovernanceTelemetry.host_platform, GovernanceTelemetry.model_id)
-            .order_by(func.sum(GovernanceTelemetry.total_cost).desc())
+        columns = (TelemetryRollup.host_platform, TelemetryRollup.model_id)
+    statement = (
+        select(
+            *columns,
+            _requests.label("total_requests"),
+            func.sum(TelemetryRollup.cost_sum).label("total_cost")
         )
+        .where(_day)
+        .group_by(*columns)
+        .order_by(func.sum(TelemetryRollup.cost_sum).desc())
+    )
     
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     
     return [
         CostBreakdown(
             host_platform=row.host_platform,
-            model_id=row.model_id,
+            model_id=row.model_id if group_by != "platform" else "All Models",
             total_requests=row.total_requests,
             total_cost=round(row.total_cost or 0, 4),
-            avg_cost_per_request=round(row.avg_cost_per_request or 0, 6)
+            avg_cost_per_request=round((row.total_cost or 0) / row.total_requests, 6)
         )
         for row in results
     ]
 
 @router.get("/accuracy-trends", response_model=List[AccuracyTrend])
-def get_accuracy_trends(
-    session: Session = Depends(get_session),
+@cached
+async def get_accuracy_trends(
+    session: AsyncSession = Depends(get_async_session),
     days: int = Query(7, description="Number of days to analyze")
 ):
     """
     Get accuracy trends over time for each model.
     Groups by date and model to show performance evolution.
     """
-    # Calculate date threshold
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-    
-    # SQLite date function
+    # Hour buckets from the one containing the cutoff onwards
+    cutoff_bucket = (datetime.utcnow() - timedelta(days=days)).strftime(GRAINS["hour"])
+    date = func.substr(TelemetryRollup.bucket, 1, 10)
+
     statement = (
         select(
-            func.date(GovernanceTelemetry.timestamp).label("date"),
-            GovernanceTelemetry.model_id,
-            func.avg(GovernanceTelemetry.accuracy_score).label("avg_accuracy"),
-            func.count(GovernanceTelemetry.id).label("request_count")
+            date.label("date"),
+            TelemetryRollup.model_id,
+            func.sum(TelemetryRollup.scored_accuracy_sum).label("accuracy_sum"),
+            func.sum(TelemetryRollup.scored_count).label("scored_count"),
+            _requests.label("request_count")
         )
-        .where(GovernanceTelemetry.timestamp >= cutoff_date)
-        .group_by(func.date(GovernanceTelemetry.timestamp), GovernanceTelemetry.model_id)
-        .order_by(func.date(GovernanceTelemetry.timestamp).desc())
+        .where(TelemetryRollup.grain == "hour", TelemetryRollup.bucket >= cutoff_bucket)
+        .group_by(date, TelemetryRollup.model_id)
+        .order_by(date.desc())
     )
     
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     
     return [
         AccuracyTrend(
             date=str(row.date),
             model_id=row.model_id,
-            avg_accuracy=round(row.avg_accuracy or 0, 2),
+            avg_accuracy=round(row.accuracy_sum / row.scored_count, 2) if row.scored_count else 0.0,
             request_count=row.request_count
         )
         for row in results
     ]
 
 @router.get("/complexity-analysis", response_model=List[ComplexityAnalysis])
-def get_complexity_analysis(
-    session: Session = Depends(get_session)
+@cached
+async def get_complexity_analysis(
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Get performance metrics grouped by query complexity category.
     Allows comparing how models perform on 'Straightforward' vs 'Advanced' queries.
     """
+    avg_accuracy = _scored_accuracy
     statement = (
         select(
-            GovernanceTelemetry.query_category,
-            GovernanceTelemetry.model_id,
-            func.count(GovernanceTelemetry.id).label("request_count"),
-            func.avg(GovernanceTelemetry.accuracy_score).label("avg_accuracy"),
-            func.avg(GovernanceTelemetry.latency_ms).label("avg_latency_ms"),
-            func.sum(GovernanceTelemetry.total_cost).label("total_cost")
+            TelemetryRollup.query_category,
+            TelemetryRollup.model_id,
+            _requests.label("request_count"),
+            avg_accuracy.label("avg_accuracy"),
+            _mean(func.sum(TelemetryRollup.online_latency_sum), func.sum(TelemetryRollup.online_count)).label("avg_latency_ms"),
+            func.sum(TelemetryRollup.cost_sum).label("total_cost")
         )
-        .where(GovernanceTelemetry.query_category != None)
-        .group_by(GovernanceTelemetry.query_category, GovernanceTelemetry.model_id)
-        .order_by(GovernanceTelemetry.query_category, func.avg(GovernanceTelemetry.accuracy_score).desc())
+        # Rows not yet evaluated have no category
+        .where(_day, TelemetryRollup.query_category != "")
+        .group_by(TelemetryRollup.query_category, TelemetryRollup.model_id)
+        .order_by(TelemetryRollup.query_category, avg_accuracy.desc())
     )
     
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     
     return [
         ComplexityAnalysis(
@@ -179,48 +221,47 @@ def get_complexity_analysis(
     ]
 
 @router.get("/summary", response_model=AnalyticsSummary)
-def get_analytics_summary(session: Session = Depends(get_session)):
+@cached
+async def get_analytics_summary(session: AsyncSession = Depends(get_async_session)):
     """
     Get overall analytics summary across all models.
     """
     # Overall stats
-    overall_stats = session.exec(
+    overall_stats = (await session.exec(
         select(
-            func.count(GovernanceTelemetry.id).label("total_requests"),
-            func.sum(GovernanceTelemetry.total_cost).label("total_cost"),
-            func.avg(GovernanceTelemetry.accuracy_score).label("avg_accuracy"),
-            func.avg(GovernanceTelemetry.latency_ms).label("avg_latency_ms")
+            _requests.label("total_requests"),
+            func.sum(TelemetryRollup.cost_sum).label("total_cost"),
+            _scored_accuracy.label("avg_accuracy"),
+            _mean(func.sum(TelemetryRollup.latency_sum), _requests).label("avg_latency_ms")
         )
-    ).first()
+        .where(_day)
+    )).first()
     
     # Top model by accuracy
-    top_accuracy = session.exec(
-        select(
-            GovernanceTelemetry.model_id,
-            func.avg(GovernanceTelemetry.accuracy_score).label("avg_acc")
-        )
-        .group_by(GovernanceTelemetry.model_id)
-        .order_by(func.avg(GovernanceTelemetry.accuracy_score).desc())
+    top_accuracy = (await session.exec(
+        select(TelemetryRollup.model_id)
+        .where(_day)
+        .group_by(TelemetryRollup.model_id)
+        .having(func.sum(TelemetryRollup.scored_count) > 0)
+        .order_by(_scored_accuracy.desc())
         .limit(1)
-    ).first()
+    )).first()
     
-    # Most cost-effective (best accuracy per dollar)
-    cost_effective = session.exec(
-        select(
-            GovernanceTelemetry.model_id,
-            (func.avg(GovernanceTelemetry.accuracy_score) / func.avg(GovernanceTelemetry.total_cost)).label("efficiency")
-        )
-        .where(GovernanceTelemetry.total_cost > 0)
-        .group_by(GovernanceTelemetry.model_id)
-        .order_by((func.avg(GovernanceTelemetry.accuracy_score) / func.avg(GovernanceTelemetry.total_cost)).desc())
+    # Most cost-effective (best accuracy per dollar, over paid requests)
+    cost_effective = (await session.exec(
+        select(TelemetryRollup.model_id)
+        .where(_day)
+        .group_by(TelemetryRollup.model_id)
+        .having(func.sum(TelemetryRollup.paid_count) > 0)
+        .order_by((func.sum(TelemetryRollup.paid_accuracy_sum) / func.sum(TelemetryRollup.cost_sum)).desc())
         .limit(1)
-    ).first()
+    )).first()
     
     return AnalyticsSummary(
         total_requests=overall_stats.total_requests or 0,
         total_cost=round(overall_stats.total_cost or 0, 4),
         avg_accuracy=round(overall_stats.avg_accuracy or 0, 2),
         avg_latency_ms=round(overall_stats.avg_latency_ms or 0, 2),
-        top_model_by_accuracy=top_accuracy.model_id if top_accuracy else "N/A",
-        most_cost_effective_model=cost_effective.model_id if cost_effective else "N/A"
+        top_model_by_accuracy=top_accuracy if top_accuracy else "N/A",
+        most_cost_effective_model=cost_effective if cost_effective else "N/A"
     )
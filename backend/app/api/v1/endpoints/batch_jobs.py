@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException
+from app.core.executor import invocation_executor
+from app.schemas.batch_jobs import BatchJobStatus
+from app.schemas.requests import BatchJobRequest
+from app.services.batch_jobs import batch_job_runner
+
+router = APIRouter()
+
+@router.post("", response_model=BatchJobStatus, status_code=202)
+async def submit_batch_job(request: BatchJobRequest):
+    """
+    Submit every query to every model through the providers' batch inference tier
+    (about half the on-demand price, results within 24h). Returns immediately;
+    poll GET /batch-jobs/{id}. Responses land in telemetry as they are ingested.
+    Queries are not screened by the request guardrail middleware.
+    """
+    job = await batch_job_runner.submit(
+        queries=request.queries,
+        configs=request.models,
+        governance_context=request.governance_context,
+        evaluator_model=request.evaluator_model
+    )
+    return BatchJobStatus(**await invocation_executor.run(batch_job_runner.status, job.id))
+
+@router.get("/{job_id}", response_model=BatchJobStatus)
+async def get_batch_job(job_id: str):
+    status = await invocation_executor.run(batch_job_runner.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return BatchJobStatus(**status)
@@ -1,32 +1,39 @@
 from typing import List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from app.schemas.requests import GovernanceRequest, BatchGovernanceRequest
 from app.schemas.governance import GovernanceLog
 from app.services import ai_engine
+from app.utils.timing import PhaseTimer
 import json
 import asyncio
 
 router = APIRouter()
 
+def _guardrail_timer(http_request: Request) -> PhaseTimer:
+    # Time the guardrail middleware spent on this request, if it ran
+    return PhaseTimer(guardrail=getattr(http_request.state, "guardrail_ms", None))
+
 @router.post("/analyze", response_model=GovernanceLog)
-def analyze_cloud_governance(request: GovernanceRequest):
+async def analyze_cloud_governance(request: GovernanceRequest, http_request: Request):
     """
     Analyze a cloud governance query using a SINGLE AI model.
     """
     try:
-        log_entry = ai_engine.analyze_governance(
+        log_entry = await ai_engine.analyze_governance(
             query=request.query, 
             provider_str=request.host_platform, 
             model_id=request.model_id,
-            governance_context=request.governance_context
+            governance_context=request.governance_context,
+            bypass_cache=request.bypass_cache,
+            timer=_guardrail_timer(http_request)
         )
         return log_entry
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/analyze/batch", response_model=List[GovernanceLog])
-async def analyze_batch_cloud_governance(request: BatchGovernanceRequest):
+async def analyze_batch_cloud_governance(request: BatchGovernanceRequest, http_request: Request):
     """
     Analyze a query and run it against MULTIPLE AI models in parallel.
     Returns a list of results, one for each model.
@@ -36,17 +43,22 @@ async def analyze_batch_cloud_governance(request: BatchGovernanceRequest):
             query=request.query,
             configs=request.models,
             evaluator_model=request.evaluator_model,
-            governance_context=request.governance_context
+            governance_context=request.governance_context,
+            batch_evaluation=request.batch_evaluation,
+            bypass_cache=request.bypass_cache,
+            timer=_guardrail_timer(http_request)
         )
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/analyze/stream")
-async def analyze_batch_stream(request: BatchGovernanceRequest):
+async def analyze_batch_stream(request: BatchGovernanceRequest, http_request: Request):
     """
     Stream results as each model completes (Server-Sent Events).
-    Returns results progressively for better UX with many models.
+    Returns results progressively for better UX with many models: 'delta' events
+    carry each model's text as it is generated, then its 'result' event, followed by
+    an 'evaluation' event once the judge has scored it.
     """
     HEARTBEAT_INTERVAL = 15  # seconds; keep Cloud Run proxy connection alive
 
@@ -59,25 +71,57 @@ async def analyze_batch_stream(request: BatchGovernanceRequest):
                 query=request.query,
                 configs=request.models,
                 evaluator_model=request.evaluator_model,
-                governance_context=request.governance_context
+                governance_context=request.governance_context,
+                batch_evaluation=request.batch_evaluation,
+                bypass_cache=request.bypass_cache,
+                stream_tokens=request.stream_tokens,
+                timer=_guardrail_timer(http_request)
             )
 
-            # Manual iteration so we can send heartbeat events during long model waits
-            while True:
-                try:
-                    result = await asyncio.wait_for(stream.__anext__(), timeout=HEARTBEAT_INTERVAL)
-                    # Send each result as it completes
-                    event_data = {
-                        'type': 'result',
-                        'data': result.model_dump(mode='json')
-                    }
+            # Manual iteration so we can send heartbeat events during long model waits.
+            # The pending __anext__ is awaited via asyncio.wait rather than wait_for: a
+            # heartbeat timeout must not cancel it, or the generator would close early.
+            next_event = None
+            try:
+                while True:
+                    if next_event is None:
+                        next_event = asyncio.ensure_future(stream.__anext__())
+                    done, _ = await asyncio.wait({next_event}, timeout=HEARTBEAT_INTERVAL)
+                    if not done:
+                        # SSE comment line as heartbeat to keep Cloud Run connection alive
+                        yield ": ping\n\n"
+                        continue
+
+                    try:
+                        event_type, result = next_event.result()
+                    except StopAsyncIteration:
+                        break
+                    next_event = None
+
+                    if event_type == 'delta':
+                        # Partial text from a model that is still generating
+                        event_data = {'type': 'delta', 'model_id': result['model_id'], 'text': result['text']}
+                    elif event_type == 'evaluation':
+                        # Judge verdict for a result already sent; matched by id/trace_id
+                        event_data = {
+                            'type': 'evaluation',
+                            'id': result.id,
+                            'trace_id': result.trace_id,
+                            'data': result.accuracy.model_dump(mode='json')
+                        }
+                    else:
+                        # Send each result as soon as its model responds
+                        event_data = {
+                            'type': 'result',
+                            'data': result.model_dump(mode='json')
+                        }
                     yield f"data: {json.dumps(event_data)}\n\n"
                     await asyncio.sleep(0)  # Allow other tasks to run
-                except asyncio.TimeoutError:
-                    # SSE comment line as heartbeat to keep Cloud Run connection alive
-                    yield ": ping\n\n"
-                except StopAsyncIteration:
-                    break
+            finally:
+                if next_event is not None and not next_event.done():
+                    next_event.cancel()
+                    await asyncio.gather(next_event, return_exceptions=True)
+                await stream.aclose()
             
             # Send completion event
             yield f"data: {json.dumps({'type': 'complete'})}\n\n"
@@ -1,39 +1,52 @@
 from typing import List
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
-from app.core.db import get_session
+from sqlalchemy.orm import selectinload
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import get_async_session
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.services import rollups
 from app.schemas.history import ConversationSummary, ConversationDetail, MessageDetail
 
 router = APIRouter()
 
+# Async sessions cannot lazy-load relationships, so messages and their telemetry
+# are loaded up front (one extra SELECT ... IN per relationship)
+_with_messages = selectinload(Conversation.messages).selectinload(Message.telemetry)
+
 @router.get("/conversations", response_model=List[ConversationSummary])
-def get_conversations(session: Session = Depends(get_session), limit: int = 50, offset: int = 0):
+async def get_conversations(session: AsyncSession = Depends(get_async_session), limit: int = 50, offset: int = 0):
     """
     Get a list of recent conversations (for sidebar).
     """
-    statement = select(Conversation).order_by(Conversation.created_at.desc()).offset(offset).limit(limit)
-    conversations = session.exec(statement).all()
-    
-    results = []
-    for conv in conversations:
-        # Count messages - optimize this in production with a separate count query if needed
-        count = len(conv.messages)
-        results.append(ConversationSummary(
+    # Message counts come from the same query instead of loading every message
+    statement = (
+        select(Conversation, func.count(Message.id).label("message_count"))
+        .outerjoin(Message, Message.conversation_id == Conversation.id)
+        .group_by(Conversation.id)
+        .order_by(Conversation.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    rows = (await session.exec(statement)).all()
+
+    return [
+        ConversationSummary(
             id=conv.id,
             title=conv.title,
             created_at=conv.created_at,
             message_count=count
-        ))
-    return results
+        )
+        for conv, count in rows
+    ]
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
-def get_conversation_detail(conversation_id: str, session: Session = Depends(get_session)):
+async def get_conversation_detail(conversation_id: str, session: AsyncSession = Depends(get_async_session)):
     """
     Get full details of a specific conversation, including messages and telemetry.
     """
-    conv = session.get(Conversation, conversation_id)
+    conv = await session.get(Conversation, conversation_id, options=[_with_messages])
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
@@ -42,7 +55,6 @@ def get_conversation_detail(conversation_id: str, session: Session = Depends(get
     
     message_details = []
     for msg in sorted_messages:
-        # Because we defined relationships in SQLModel, msg.telemetry is automatically loaded (lazy usually, but works here)
         message_details.append(MessageDetail(
             id=msg.id,
             role=msg.role,
@@ -60,14 +72,17 @@ def get_conversation_detail(conversation_id: str, session: Session = Depends(get
     )
 
 @router.delete("/conversations/{conversation_id}")
-def delete_conversation(conversation_id: str, session: Session = Depends(get_session)):
+async def delete_conversation(conversation_id: str, session: AsyncSession = Depends(get_async_session)):
     """
     Delete a conversation and all its messages/telemetry.
     """
-    conv = session.get(Conversation, conversation_id)
+    # The ORM cascade needs the children loaded to delete them
+    conv = await session.get(Conversation, conversation_id, options=[_with_messages])
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
         
-    session.delete(conv) # Cascade delete should work if configured, otherwise we rely on ORM
-    session.commit()
+    removed = [msg.telemetry for msg in conv.messages if msg.telemetry]
+    await session.delete(conv)
+    await rollups.apply_async(session, removed=removed)
+    await session.commit()
     return {"status": "deleted"}
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.executor import invocation_executor
+from app.schemas.jobs import JobStatus
+from app.schemas.requests import JobRequest
+from app.services.job_queue import JOB_COMPLETED, JOB_FAILED, job_queue
+
+router = APIRouter()
+
+# How often the events stream re-reads job progress, and the keep-alive interval
+EVENTS_POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15
+
+async def _status_or_404(job_id: str) -> dict:
+    status = await invocation_executor.run(job_queue.status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@router.post("", response_model=JobStatus, status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a comparison of every query against every model. Jobs are run by separate
+    worker processes (`python -m app.worker`), not by the API; poll GET /jobs/{id}
+    or follow GET /jobs/{id}/events.
+    """
+    job = await invocation_executor.run(
+        job_queue.enqueue,
+        request.queries,
+        request.models,
+        request.governance_context,
+        request.evaluator_model
+    )
+    return JobStatus(**await _status_or_404(job.id))
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return JobStatus(**await _status_or_404(job_id))
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events: a 'progress' event whenever the job's counters or status
+    change, then 'complete' once it has finished (cells included in the last event).
+    """
+    await _status_or_404(job_id)
+
+    async def event_generator():
+        last = None
+        idle = 0.0
+        while True:
+            # Counts only while running; the cells are read once, for the final event
+            status = await invocation_executor.run(job_queue.status, job_id, False)
+            finished = status["status"] in (JOB_COMPLETED, JOB_FAILED)
+            summary = {key: status[key] for key in ("status", "completed_cells", "failed_cells", "attempts")}
+            if summary != last:
+                last = summary
+                idle = 0.0
+                if finished:
+                    status = await invocation_executor.run(job_queue.status, job_id)
+                yield f"data: {json.dumps({'type': 'progress', 'data': JobStatus(**status).model_dump(mode='json')})}\n\n"
+            if finished:
+                yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+                return
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+            idle += EVENTS_POLL_INTERVAL
+            if idle >= HEARTBEAT_INTERVAL:
+                idle = 0.0
+                yield ": ping\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,141 @@
+from typing import List, Union
+from fastapi import APIRouter, HTTPException, Response
+from app.core.config import settings
+from app.core.db import engine
+from app.core.executor import invocation_executor
+from app.schemas.jobs import JobStatus
+from app.schemas.system import ExecutorMetrics, AnalyticsCacheStats, WriteBehindStats, CacheStats, VerdictCacheStats, SingleFlightStats, AdmissionStats, RetryStats, HedgingStats, PricingStats, PricingReloadResult, RecostReport, RollupRebuildReport
+from app.services import ai_engine
+from app.services.analytics_cache import analytics_cache
+from app.services.evaluator_service import evaluator_service
+from app.services.job_queue import job_queue
+from app.services.admission import admission_controller
+from app.services.retry import retry_policy
+from app.services.pricing_service import pricing_service
+from app.services.recosting import recost_telemetry
+from app.services.rollups import rebuild_rollups
+from app.services.write_behind import write_behind
+
+router = APIRouter()
+
+@router.get("/executor", response_model=ExecutorMetrics)
+def get_executor_metrics():
+    """
+    Saturation metrics for the shared invocation executor.
+    A growing queue_depth or p95_wait_ms means INVOCATION_MAX_WORKERS is too low.
+    """
+    return ExecutorMetrics(**invocation_executor.metrics())
+
+@router.get("/write-behind", response_model=WriteBehindStats)
+def get_write_behind_stats():
+    """
+    Group-commit writer for conversation, message and telemetry rows.
+    avg_batch is writes per commit; a queued count near max_queue means the
+    database cannot keep up and requests are waiting to enqueue.
+    """
+    return WriteBehindStats(**write_behind.stats())
+
+@router.get("/response-cache", response_model=CacheStats)
+def get_response_cache_stats():
+    """
+    Hit/miss counters for the provider response cache (RESPONSE_CACHE_ENABLED).
+    """
+    if ai_engine.response_cache is None:
+        return CacheStats(enabled=False)
+    return CacheStats(enabled=True, **ai_engine.response_cache.stats())
+
+@router.delete("/response-cache")
+def clear_response_cache():
+    """
+    Drop every cached provider response.
+    """
+    if ai_engine.response_cache is not None:
+        ai_engine.response_cache.clear()
+    return {"status": "cleared"}
+
+@router.get("/analytics-cache", response_model=AnalyticsCacheStats)
+def get_analytics_cache_stats():
+    """
+    Hit/miss counters for cached /analytics results. generation counts telemetry
+    commits; each one invalidates every cached result.
+    """
+    return AnalyticsCacheStats(enabled=settings.ANALYTICS_CACHE_ENABLED, **analytics_cache.stats())
+
+@router.get("/verdict-cache", response_model=VerdictCacheStats)
+def get_verdict_cache_stats():
+    """
+    Hit/miss counters for the evaluator verdict cache.
+    """
+    return VerdictCacheStats(enabled=True, **evaluator_service.verdict_cache.stats())
+
+@router.get("/single-flight", response_model=SingleFlightStats)
+def get_single_flight_stats():
+    """
+    How many provider invocations were joined onto an identical in-flight call.
+    """
+    return SingleFlightStats(**ai_engine.provider_flights.stats())
+
+@router.get("/admission", response_model=List[AdmissionStats])
+def get_admission_stats():
+    """
+    Per-provider and per-model admission limiters (PROVIDER_LIMITS / MODEL_LIMITS).
+    Growing rejected or avg_wait_ms counts mean the configured quota is the bottleneck.
+    """
+    return [AdmissionStats(**stats) for stats in admission_controller.stats()]
+
+@router.get("/retries", response_model=RetryStats)
+def get_retry_stats():
+    """
+    Global retry budget. A non-zero exhausted count means retries were refused
+    because providers were failing faster than RETRY_BUDGET_RATIO allows.
+    """
+    return RetryStats(**retry_policy.budget.stats())
+
+@router.get("/hedging", response_model=HedgingStats)
+def get_hedging_stats():
+    """
+    Observed p95 latency per (provider, model); with HEDGING_ENABLED a call still
+    running past its p95 gets a duplicate request.
+    """
+    return HedgingStats(enabled=settings.HEDGING_ENABLED, models=ai_engine.provider_latency.stats())
+
+@router.get("/pricing", response_model=PricingStats)
+def get_pricing_stats():
+    """
+    Pricing table currently used for cost calculation. version is recorded on
+    every telemetry row as pricing_version.
+    """
+    return PricingStats(**pricing_service.stats())
+
+@router.post("/pricing/reload", response_model=PricingReloadResult)
+def reload_pricing():
+    """
+    Re-read the pricing files now instead of waiting for the next poll.
+    An invalid table is rejected with 422 and the live version stays in place.
+    """
+    changed = pricing_service.reload(force=True)
+    if pricing_service.last_error:
+        raise HTTPException(status_code=422, detail=f"Pricing reload rejected: {pricing_service.last_error}")
+    return PricingReloadResult(changed=changed, **pricing_service.stats())
+
+@router.post("/pricing/recost", response_model=Union[RecostReport, JobStatus])
+async def recost_historical_telemetry(response: Response, dry_run: bool = True):
+    """
+    Recompute total_cost of all stored telemetry with the live pricing table, e.g.
+    after a price change or a pricing fix. By default only reports the difference
+    (dry run). dry_run=false queues the rewrite as a worker job (`python -m app.worker`)
+    and returns 202 with it; follow GET /jobs/{id} for its report.
+    """
+    if dry_run:
+        return RecostReport(**await invocation_executor.run(recost_telemetry, dry_run=True))
+    job = await invocation_executor.run(job_queue.enqueue_recost)
+    response.status_code = 202
+    return JobStatus(**await invocation_executor.run(job_queue.status, job.id))
+
+@router.post("/rollups/rebuild", response_model=RollupRebuildReport)
+async def rebuild_telemetry_rollups():
+    """
+    Recompute the analytics rollups from raw telemetry. They are maintained as rows
+    are written; this repairs them after direct edits to the telemetry table.
+    """
+    return RollupRebuildReport(**await invocation_executor.run(rebuild_rollups, engine))
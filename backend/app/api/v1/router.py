@@ -1,7 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import governance, history, analytics
+from app.api.v1.endpoints import governance, history, analytics, system, batch_jobs, jobs
 
 api_router = APIRouter()
 api_router.include_router(governance.router, prefix="/governance", tags=["governance"])
 api_router.include_router(history.router, prefix="/history", tags=["history"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
+api_router.include_router(batch_jobs.router, prefix="/batch-jobs", tags=["batch-jobs"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "AI Cloud Governance"
@@ -18,6 +18,121 @@ class Settings(BaseSettings):
     # AWS Bedrock Guardrails
     AWS_BEDROCK_GUARDRAIL_ID: Optional[str] = None
     AWS_BEDROCK_GUARDRAIL_VERSION: str = "DRAFT"
+
+    # Application database (SQLAlchemy URL). sqlite:/// and postgresql:// URLs are also
+    # served asynchronously (aiosqlite / asyncpg) to the async endpoints and request path
+    DATABASE_URL: str = "sqlite:///database.db"
+    DB_ECHO: bool = False # log every SQL statement
+    # Connection pool, per engine (the sync and the async engine each have one)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800 # Postgres only; SQLite connections never go stale
+    # SQLite profile, applied to every new connection. WAL lets readers run alongside the
+    # single writer; NORMAL only fsyncs at checkpoints (a power loss can drop the last
+    # commits but never corrupts the file); busy_timeout makes writers queue instead of
+    # failing with "database is locked"
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    # Previous location of the SQLite file (docker-compose used to mount it at
+    # /app/database.db). On first start, while DATABASE_URL's file does not exist yet,
+    # init_db() copies it there instead of starting on an empty database
+    LEGACY_DATABASE_PATH: Optional[str] = None
+    # Write-behind for the request path: one writer group-commits queued conversation,
+    # message and telemetry writes. Durability "async" returns once a write is queued
+    # (a crash loses what is still queued); "commit" waits for the group commit.
+    WRITE_BEHIND_DURABILITY: str = "async"
+    WRITE_BEHIND_MAX_QUEUE: int = 10000 # callers wait when the queue is full
+    WRITE_BEHIND_BATCH_SIZE: int = 500 # max writes per transaction
+    WRITE_BEHIND_LINGER_MS: float = 2.0 # wait this long for more writes before committing
+
+    # Shared executor for blocking work (DB writes, guardrail checks)
+    INVOCATION_MAX_WORKERS: int = 32
+
+    # Longest a single provider call may take (allows slower models to complete); also
+    # the default timeout of the shared Bedrock HTTP client
+    MODEL_TIMEOUT_SECONDS: float = 90.0
+
+    # Batched judging: max estimated tokens for one multi-response judge call
+    EVALUATOR_BATCH_TOKEN_BUDGET: int = 30000
+
+    # Analytics results are cached until telemetry is written in this process; writes
+    # from other processes (job workers) show up after at most the max staleness
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_MAX_STALENESS_SECONDS: float = 30.0
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 256
+
+    # Opt-in provider response cache (LRU with TTL)
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+
+    # Join identical in-flight provider invocations instead of repeating them
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Evaluator verdict cache; set EVALUATOR_CACHE_PATH to persist verdicts in SQLite
+    EVALUATOR_CACHE_MAX_ENTRIES: int = 4096
+    EVALUATOR_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    EVALUATOR_CACHE_PATH: Optional[str] = None
+
+    # Client-side admission control, keyed by provider ("aws", "openai", "google") and
+    # by model_id. Each entry may set "concurrency", "rpm" and "tpm"; 0 or absent = unlimited.
+    # Set as JSON in the environment, e.g. MODEL_LIMITS='{"gpt-4o": {"rpm": 500, "tpm": 30000}}'
+    PROVIDER_LIMITS: Dict[str, Dict[str, int]] = {
+        "aws": {"concurrency": 16},
+        "openai": {"concurrency": 16},
+        "google": {"concurrency": 16},
+    }
+    MODEL_LIMITS: Dict[str, Dict[str, int]] = {}
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    # Completion tokens reserved per call before the real usage is known
+    ADMISSION_OUTPUT_TOKEN_ESTIMATE: int = 1024
+
+    # Retries for transient provider errors (throttling, 5xx, dropped connections).
+    # The budget lets retries add at most RETRY_BUDGET_RATIO of the call volume,
+    # with bursts of up to RETRY_BUDGET_CAPACITY.
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY_SECONDS: float = 0.5
+    RETRY_MAX_DELAY_SECONDS: float = 8.0
+    RETRY_BUDGET_RATIO: float = 0.2
+    RETRY_BUDGET_CAPACITY: int = 20
+
+    # Hedged requests: once a model has HEDGE_MIN_SAMPLES latencies on record, a call
+    # still running after its p95 (never sooner than HEDGE_MIN_DELAY_SECONDS) gets a
+    # duplicate; the first answer wins. HEDGE_BEDROCK_REGION sends Bedrock duplicates
+    # to another region.
+    HEDGING_ENABLED: bool = False
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    HEDGE_BEDROCK_REGION: Optional[str] = None
+
+    # Pricing files are polled for changes every PRICING_RELOAD_INTERVAL_SECONDS
+    # (0 disables polling; POST /system/pricing/reload still works)
+    PRICING_RELOAD_INTERVAL_SECONDS: float = 30.0
+    # Rows per read/UPDATE batch when re-costing historical telemetry
+    RECOST_CHUNK_SIZE: int = 50_000
+
+    # Offline batch inference jobs. BATCH_BACKEND "provider" submits to the providers'
+    # batch APIs; "local" answers in-process (development and tests only).
+    BATCH_BACKEND: str = "provider"
+    BATCH_POLL_INTERVAL_SECONDS: float = 60.0
+    # Each running part is polled by one process at a time, under a lease renewed on every
+    # poll; it must outlast BATCH_POLL_INTERVAL_SECONDS plus fetching and storing a part's results
+    BATCH_LEASE_SECONDS: float = 300.0
+    BEDROCK_BATCH_S3_URI: Optional[str] = None # e.g. s3://my-bucket/governance-batches
+    BEDROCK_BATCH_ROLE_ARN: Optional[str] = None
+
+    # Durable job queue (POST /jobs), drained by `python -m app.worker` processes.
+    # A worker holds a job under a JOB_LEASE_SECONDS lease that it renews while running.
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_CELL_MAX_ATTEMPTS: int = 2
+    JOB_RETRY_DELAY_SECONDS: float = 30.0
+    JOB_CELL_CONCURRENCY: int = 8
+    JOB_WORKER_POLL_SECONDS: float = 2.0
     
     class Config:
         env_file = ".env"
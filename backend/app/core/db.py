@@ -1,16 +1,141 @@
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
+from app.core.migrations import migrate
 
-# Use SQLite for simplicity now, easily swappable for Postgres later
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+# Async drivers for the sync URL schemes DATABASE_URL may use
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+def async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _in_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine keyword arguments for url: pool sizing, plus SQLite's threading flag."""
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if _in_memory(url):
+            # Every connection to :memory: is a separate database; keep the default pool
+            return options
+    else:
+        # Drop connections the server or a proxy may have closed while idle
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
+        options["pool_pre_ping"] = True
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS
+    )
+    return options
+
+# Sizing arguments only a QueuePool accepts
+POOL_SIZING = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle")
+
+def _options(url: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    options = engine_options(url)
+    if "poolclass" in overrides:
+        options = {name: value for name, value in options.items() if name not in POOL_SIZING}
+    return {**options, **overrides}
+
+def sqlite_pragmas(in_memory: bool = False) -> Dict[str, Any]:
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,  # negative: KiB rather than pages
+        "foreign_keys": "ON",
+    }
+    if in_memory:
+        # No WAL (or file mapping) for an in-memory database
+        pragmas.pop("journal_mode")
+        pragmas.pop("mmap_size")
+    return pragmas
+
+def _apply_sqlite_pragmas(engine: Engine, url: str) -> None:
+    pragmas = sqlite_pragmas(_in_memory(url))
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def make_engine(url: str = settings.DATABASE_URL, **overrides: Any) -> Engine:
+    """Sync engine for url with the pool and (for SQLite) per-connection pragma profile."""
+    new_engine = create_engine(url, **_options(url, overrides))
+    if _is_sqlite(url):
+        _apply_sqlite_pragmas(new_engine, url)
+    return new_engine
+
+def make_async_engine(url: str = settings.DATABASE_URL, **overrides: Any) -> AsyncEngine:
+    """Async engine for the same database (aiosqlite / asyncpg), same profile as make_engine."""
+    new_engine = create_async_engine(async_url(url), **_options(url, overrides))
+    if _is_sqlite(url):
+        _apply_sqlite_pragmas(new_engine.sync_engine, url)
+    return new_engine
+
+def adopt_legacy_database(url: str, legacy_path: Optional[str]) -> bool:
+    """
+    Copies the SQLite database at legacy_path to url's file if that file does not
+    exist yet (first start after the move); returns True if it did. Every process
+    sharing the file may call this: the first one copies, the others find the file.
+    """
+    if not legacy_path or not _is_sqlite(url) or _in_memory(url):
+        return False
+    target = make_url(url).database
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    import fcntl  # Unix only, like the containers this runs in
+    with open(f"{target}.adopt.lock", "w") as lock:
+        # The API and the worker start together; only one of them may copy
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(target) or not os.path.exists(legacy_path):
+            return False
+        # Backup API rather than a file copy: consistent even with a -wal file beside it
+        partial = f"{target}.adopting"
+        with closing(sqlite3.connect(legacy_path)) as source, closing(sqlite3.connect(partial)) as copy:
+            source.backup(copy)
+        os.replace(partial, target)
+    print(f"Copied legacy database {legacy_path} to {target}")
+    return True
+
+engine = make_engine()
+
+# Same database for async callers: awaiting a query parks the coroutine instead of
+# holding an executor thread for the duration of the round trip
+async_engine = make_async_engine()
 
 def init_db():
+    adopt_legacy_database(settings.DATABASE_URL, settings.LEGACY_DATABASE_PATH)
     SQLModel.metadata.create_all(engine)
+    migrate(engine)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # expire_on_commit=False: returned rows stay readable without a reload round trip
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,22 @@
+import time
+
+class Deadline:
+    """
+    Absolute end-to-end time budget for one analysis, shared by every phase
+    (provider call, evaluation) so each gets only what is actually left.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, seconds: float) -> float:
+        """The smaller of a per-phase limit and the remaining budget."""
+        return min(seconds, self.remaining())
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+class InvocationExecutor:
+    """
+    Process-wide, bounded thread pool for the blocking work left on the request path
+    (DB writes, boto3 guardrail checks). Started and stopped by the app lifespan and
+    instrumented so saturation is visible: queue depth, active workers and queue wait time.
+    """
+
+    def __init__(self, max_workers: int, wait_samples: int = 1024):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._recent_waits = deque(maxlen=wait_samples)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="invocation")
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the shared pool and await its result."""
+        if self._pool is None:
+            # Outside the app lifespan (scripts, tests) start on first use
+            self.start()
+
+        enqueued_at = time.perf_counter()
+        # Set once the job leaves the queue, either by starting or by being abandoned
+        dequeued = [False]
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+
+        def task():
+            wait_ms = (time.perf_counter() - enqueued_at) * 1000
+            with self._lock:
+                if not dequeued[0]:
+                    dequeued[0] = True
+                    self._queued -= 1
+                self._active += 1
+                self._total_wait_ms += wait_ms
+                self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+                self._recent_waits.append(wait_ms)
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool, task)
+        finally:
+            # The caller was cancelled (client disconnect, wait_for timeout) before the
+            # job started: it never will, so it no longer counts towards queue_depth
+            with self._lock:
+                if not dequeued[0]:
+                    dequeued[0] = True
+                    self._queued -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            started = self._completed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "active_workers": self._active,
+                "queue_depth": self._queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait_ms / started, 3) if started else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max_wait_ms": round(self._max_wait_ms, 3),
+            }
+
+invocation_executor = InvocationExecutor(max_workers=settings.INVOCATION_MAX_WORKERS)
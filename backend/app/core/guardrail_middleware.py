@@ -1,9 +1,11 @@
 import json
+import time
 import boto3
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from app.core.config import settings
+from app.core.executor import invocation_executor
 
 class BedrockGuardrailMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, guardrail_id: str = None, guardrail_version: str = "DRAFT", region_name: str = "us-east-1"):
@@ -56,13 +58,17 @@ class BedrockGuardrailMiddleware(BaseHTTPMiddleware):
                 if query:
                     print(f"Guardrail Middleware: Analyzing query prefix: {query[:50]}...")
                     
-                    # 2. Call AWS Bedrock Guardrail (Synchronous check)
-                    response = self.client.apply_guardrail(
+                    # 2. Call AWS Bedrock Guardrail (blocking boto3 call, kept off the event loop)
+                    started = time.perf_counter()
+                    response = await invocation_executor.run(
+                        self.client.apply_guardrail,
                         guardrailIdentifier=active_guardrail_id,
                         guardrailVersion=self.guardrail_version,
                         source="INPUT",
                         content=[{"text": {"text": query}}]
                     )
+                    # Picked up by the endpoint as the "guardrail" phase of the analysis
+                    request.state.guardrail_ms = (time.perf_counter() - started) * 1000
                     
                     print(f"Guardrail Middleware: AWS Response Action: {response['action']}")
 
@@ -0,0 +1,254 @@
+"""
+Versioned schema migrations, applied in order by init_db() after create_all().
+
+create_all() only creates missing tables, so changes to existing tables (new
+columns, indexes) go here as a new Migration with the next version number.
+Applied versions are recorded in schema_migrations; each migration runs in its
+own transaction and must be safe on a database created by create_all() from the
+current models (i.e. skip columns that already exist, CREATE INDEX IF NOT EXISTS).
+
+    python -m app.core.migrations    # migrate DATABASE_URL and list applied versions
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+class Migration:
+    def __init__(self, version: int, name: str, apply: Callable[[Connection], None]):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+def _add_missing_columns(table: str, columns: Sequence[Tuple[str, str]]) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        inspector = inspect(conn)
+        if not inspector.has_table(table):
+            # create_all() will make it with every column
+            return
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for name, ddl in columns:
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                print(f"Added {table}.{name}")
+    return apply
+
+def _statements(*statements: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for statement in statements:
+            conn.execute(text(statement))
+    return apply
+
+# Migrations are frozen: the SQL below is the telemetryrollup schema and aggregation
+# as of version 4, written out so later model or rollup changes cannot alter what
+# this migration does to a database that has not yet applied it.
+_ROLLUP_TABLE_V4 = (
+    "CREATE TABLE IF NOT EXISTS telemetryrollup ("
+    "id {id} NOT NULL, grain VARCHAR NOT NULL, bucket VARCHAR NOT NULL, model_id VARCHAR NOT NULL, "
+    "host_platform VARCHAR NOT NULL, query_category VARCHAR NOT NULL, governance_context VARCHAR NOT NULL, "
+    "request_count INTEGER NOT NULL, accuracy_sum FLOAT NOT NULL, accuracy_sumsq FLOAT NOT NULL, "
+    "cost_sum FLOAT NOT NULL, cost_sumsq FLOAT NOT NULL, latency_sum FLOAT NOT NULL, "
+    "online_count INTEGER NOT NULL, online_latency_sum FLOAT NOT NULL, online_latency_sumsq FLOAT NOT NULL, "
+    "input_tokens_sum INTEGER NOT NULL, output_tokens_sum INTEGER NOT NULL, "
+    "paid_count INTEGER NOT NULL, paid_accuracy_sum FLOAT NOT NULL, "
+    "db_setup_ms_count INTEGER NOT NULL, db_setup_ms_sum FLOAT NOT NULL, "
+    "guardrail_ms_count INTEGER NOT NULL, guardrail_ms_sum FLOAT NOT NULL, "
+    "provider_call_ms_count INTEGER NOT NULL, provider_call_ms_sum FLOAT NOT NULL, "
+    "time_to_first_token_ms_count INTEGER NOT NULL, time_to_first_token_ms_sum FLOAT NOT NULL, "
+    "evaluation_ms_count INTEGER NOT NULL, evaluation_ms_sum FLOAT NOT NULL, "
+    "persistence_ms_count INTEGER NOT NULL, persistence_ms_sum FLOAT NOT NULL, "
+    "PRIMARY KEY (id), "
+    "CONSTRAINT uq_telemetryrollup_key UNIQUE (grain, bucket, model_id, host_platform, query_category, governance_context))"
+)
+# Rollup column -> aggregate over governancetelemetry (cf. rollups.contribution() at version 4)
+_ROLLUP_MEASURES_V4 = {
+    "request_count": "COUNT(*)",
+    "accuracy_sum": "SUM(COALESCE(accuracy_score, 0))",
+    "accuracy_sumsq": "SUM(COALESCE(accuracy_score, 0) * COALESCE(accuracy_score, 0))",
+    "cost_sum": "SUM(COALESCE(total_cost, 0))",
+    "cost_sumsq": "SUM(COALESCE(total_cost, 0) * COALESCE(total_cost, 0))",
+    "latency_sum": "SUM(COALESCE(latency_ms, 0))",
+    "online_count": "SUM(CASE WHEN batch_job_id IS NULL THEN 1 ELSE 0 END)",
+    "online_latency_sum": "SUM(CASE WHEN batch_job_id IS NULL THEN COALESCE(latency_ms, 0) ELSE 0 END)",
+    "online_latency_sumsq": "SUM(CASE WHEN batch_job_id IS NULL THEN COALESCE(latency_ms, 0) * COALESCE(latency_ms, 0) ELSE 0 END)",
+    "input_tokens_sum": "SUM(COALESCE(input_tokens, 0))",
+    "output_tokens_sum": "SUM(COALESCE(output_tokens, 0))",
+    "paid_count": "SUM(CASE WHEN total_cost > 0 THEN 1 ELSE 0 END)",
+    "paid_accuracy_sum": "SUM(CASE WHEN total_cost > 0 THEN COALESCE(accuracy_score, 0) ELSE 0 END)",
+    **{
+        f"{phase}_{part}": (f"COUNT({phase})" if part == "count" else f"COALESCE(SUM({phase}), 0)")
+        for phase in ("db_setup_ms", "guardrail_ms", "provider_call_ms", "time_to_first_token_ms", "evaluation_ms", "persistence_ms")
+        for part in ("count", "sum")
+    },
+}
+# Bucket label per grain and dialect, UTC: "YYYY-MM-DD HH:00" and "YYYY-MM-DD"
+_ROLLUP_BUCKETS_V4 = {
+    # text() would read ":00" as a bind parameter; the backslash keeps it literal
+    "sqlite": {"hour": "strftime('%Y-%m-%d %H\\:00', timestamp)", "day": "strftime('%Y-%m-%d', timestamp)"},
+    "postgresql": {"hour": "to_char(timestamp, 'YYYY-MM-DD HH24\\:00')", "day": "to_char(timestamp, 'YYYY-MM-DD')"},
+}
+
+def _insert_rollups(conn: Connection, measures: Dict[str, str]) -> None:
+    """Refills telemetryrollup from governancetelemetry with the given column -> aggregate SQL."""
+    dialect = conn.dialect.name
+    if dialect not in _ROLLUP_BUCKETS_V4:
+        raise ValueError(f"Telemetry rollups are not supported on {dialect}")
+    conn.execute(text("DELETE FROM telemetryrollup"))
+    dims = "model_id, host_platform, COALESCE(query_category, ''), governance_context"
+    for grain, bucket in _ROLLUP_BUCKETS_V4[dialect].items():
+        conn.execute(text(
+            f"INSERT INTO telemetryrollup (grain, bucket, model_id, host_platform, query_category, governance_context, "
+            f"{', '.join(measures)}) "
+            f"SELECT '{grain}', {bucket}, {dims}, {', '.join(measures.values())} "
+            f"FROM governancetelemetry GROUP BY {bucket}, {dims}"
+        ))
+
+def _backfill_rollups(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    conn.execute(text(_ROLLUP_TABLE_V4.format(id="SERIAL" if dialect == "postgresql" else "INTEGER")))
+    _insert_rollups(conn, _ROLLUP_MEASURES_V4)
+
+# Placeholder rationales written instead of a judge verdict up to version 10, when
+# rows started recording it in governancetelemetry.scored
+_UNSCORED_RATIONALES_V10 = (
+    "Evaluation pending", "Evaluation skipped%", "Evaluation exceeded%", "Evaluation failed%",
+    "Evaluator (%) not configured.", "Evaluator Output Malformed%", "Not evaluated%",
+    "Model execution failed", "No rationale provided",
+)
+_ROLLUP_MEASURES_V10 = {
+    **_ROLLUP_MEASURES_V4,
+    "scored_count": "SUM(CASE WHEN scored THEN 1 ELSE 0 END)",
+    "scored_accuracy_sum": "SUM(CASE WHEN scored THEN COALESCE(accuracy_score, 0) ELSE 0 END)",
+    "scored_accuracy_sumsq": "SUM(CASE WHEN scored THEN COALESCE(accuracy_score, 0) * COALESCE(accuracy_score, 0) ELSE 0 END)",
+}
+
+def _backfill_scored(conn: Connection) -> None:
+    _add_missing_columns("governancetelemetry", [("scored", "BOOLEAN NOT NULL DEFAULT FALSE")])(conn)
+    _add_missing_columns("telemetryrollup", [
+        ("scored_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("scored_accuracy_sum", "FLOAT NOT NULL DEFAULT 0"),
+        ("scored_accuracy_sumsq", "FLOAT NOT NULL DEFAULT 0"),
+    ])(conn)
+    # Older rows only tell a verdict from a placeholder by their rationale
+    placeholders = " OR ".join(f"accuracy_rationale LIKE :p{i}" for i in range(len(_UNSCORED_RATIONALES_V10)))
+    conn.execute(
+        text(f"UPDATE governancetelemetry SET scored = TRUE WHERE accuracy_rationale IS NOT NULL AND NOT ({placeholders})"),
+        {f"p{i}": pattern for i, pattern in enumerate(_UNSCORED_RATIONALES_V10)}
+    )
+    _insert_rollups(conn, _ROLLUP_MEASURES_V10)
+
+MIGRATIONS: List[Migration] = [
+    # Columns added by the old add_columns.py script, for databases created before them
+    Migration(1, "telemetry columns", _add_missing_columns("governancetelemetry", [
+        ("query_category", "TEXT"),
+        ("prompt_optimization", "TEXT"),
+        ("cache_hit", "BOOLEAN NOT NULL DEFAULT FALSE"),
+        ("coalesced", "BOOLEAN NOT NULL DEFAULT FALSE"),
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("hedge_cost", "FLOAT NOT NULL DEFAULT 0"),
+        ("time_to_first_token_ms", "FLOAT"),
+        ("pricing_version", "TEXT"),
+        ("batch_job_id", "TEXT"),
+        ("cache_read_tokens", "INTEGER NOT NULL DEFAULT 0"),
+        ("cache_write_tokens", "INTEGER NOT NULL DEFAULT 0"),
+        ("evaluator_cost", "FLOAT NOT NULL DEFAULT 0"),
+        ("db_setup_ms", "FLOAT"),
+        ("guardrail_ms", "FLOAT"),
+        ("provider_call_ms", "FLOAT"),
+        ("evaluation_ms", "FLOAT"),
+        ("persistence_ms", "FLOAT"),
+    ])),
+    Migration(2, "telemetry batch_job_id index", _statements(
+        "CREATE INDEX IF NOT EXISTS ix_governancetelemetry_batch_job_id ON governancetelemetry (batch_job_id)",
+    )),
+    # One index per /analytics query shape. The leading columns match the GROUP BY /
+    # WHERE, the trailing ones are the aggregated values, so the narrow queries are
+    # answered from the index alone instead of a scan plus a temporary sort.
+    Migration(3, "analytics indexes", _statements(
+        # model-performance, cost-breakdown by model, summary (top / most cost-effective model, totals)
+        "CREATE INDEX IF NOT EXISTS ix_telemetry_model_platform ON governancetelemetry "
+        "(model_id, host_platform, accuracy_score, total_cost, latency_ms, batch_job_id)",
+        # cost-breakdown by platform
+        "CREATE INDEX IF NOT EXISTS ix_telemetry_platform_cost ON governancetelemetry (host_platform, total_cost)",
+        # accuracy-trends: range on timestamp
+        "CREATE INDEX IF NOT EXISTS ix_telemetry_timestamp_model ON governancetelemetry "
+        "(timestamp, model_id, accuracy_score)",
+        # complexity-analysis
+        "CREATE INDEX IF NOT EXISTS ix_telemetry_category_model ON governancetelemetry "
+        "(query_category, model_id, accuracy_score, total_cost, latency_ms, batch_job_id)",
+    )),
+    # Analytics read pre-aggregated buckets from here on; seed them from existing telemetry
+    Migration(4, "telemetry rollups", _backfill_rollups),
+    # Analytics no longer read governancetelemetry, so version 3's covering indexes
+    # only cost writes (every insert, rescore and re-cost)
+    Migration(5, "drop raw analytics indexes", _statements(
+        "DROP INDEX IF EXISTS ix_telemetry_model_platform",
+        "DROP INDEX IF EXISTS ix_telemetry_platform_cost",
+        "DROP INDEX IF EXISTS ix_telemetry_timestamp_model",
+        "DROP INDEX IF EXISTS ix_telemetry_category_model",
+    )),
+    # Re-costing runs as a worker job
+    Migration(6, "job kind and result", _add_missing_columns("job", [
+        ("kind", "VARCHAR NOT NULL DEFAULT 'comparison'"),
+        ("result", "VARCHAR"),
+    ])),
+    # Batch parts are polled under a lease and their records ingested at most once
+    Migration(7, "batch part leases", _add_missing_columns("batchjobpart", [
+        ("lease_owner", "VARCHAR"),
+        ("lease_expires_at", "TIMESTAMP"),
+    ])),
+    Migration(8, "telemetry batch_record_id", _add_missing_columns("governancetelemetry", [
+        ("batch_record_id", "VARCHAR"),
+    ])),
+    Migration(9, "telemetry batch record key", _statements(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_governancetelemetry_batch_record "
+        "ON governancetelemetry (batch_job_id, model_id, batch_record_id)",
+    )),
+    # Accuracy averages count only rows a judge actually scored
+    Migration(10, "scored accuracy", _backfill_scored),
+    # A job cell's successful row is written once, however often the cell is rerun
+    Migration(11, "telemetry job_cell_id", _add_missing_columns("governancetelemetry", [
+        ("job_cell_id", "VARCHAR"),
+    ])),
+    Migration(12, "telemetry job cell key", _statements(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_governancetelemetry_job_cell ON governancetelemetry (job_cell_id)",
+    )),
+]
+
+def _ensure_version_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+def applied_versions(engine: Engine) -> List[int]:
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+def migrate(engine: Engine, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """Applies every migration not yet recorded; returns the versions applied now."""
+    done = set(applied_versions(engine))
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()}
+            )
+        print(f"Applied migration {migration.version}: {migration.name}")
+        applied.append(migration.version)
+    if applied:
+        # Fresh statistics so the planner weighs the new indexes
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return applied
+
+if __name__ == "__main__":
+    from app.core.db import init_db, engine
+    init_db()
+    print(f"Schema at version {max(applied_versions(engine), default=0)}")
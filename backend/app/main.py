@@ -1,16 +1,35 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.core.db import init_db
+from app.core.db import async_engine, init_db
+from app.core.executor import invocation_executor
+from app.services import ai_engine
+from app.services.pricing_service import pricing_service
+from app.services.batch_jobs import batch_job_runner
+from app.services.write_behind import write_behind
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create tables
+    # Startup: Create tables and the shared executor for blocking work
     init_db()
+    invocation_executor.start()
+    pricing_watcher = None
+    if settings.PRICING_RELOAD_INTERVAL_SECONDS > 0:
+        pricing_watcher = asyncio.create_task(pricing_service.watch(settings.PRICING_RELOAD_INTERVAL_SECONDS))
+    # Keep polling batch inference jobs submitted before a restart
+    await batch_job_runner.resume()
     yield
-    # Shutdown logic (if any)
+    batch_job_runner.stop()
+    if pricing_watcher is not None:
+        pricing_watcher.cancel()
+    # Shutdown: commit every queued write and let in-flight DB work finish before the process exits
+    await write_behind.stop()
+    await ai_engine.aclose()
+    invocation_executor.shutdown(wait=True)
+    await async_engine.dispose()
 
 from app.core.guardrail_middleware import BedrockGuardrailMiddleware
 
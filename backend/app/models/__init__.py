@@ -1,3 +1,6 @@
 from .conversation import Conversation
 from .message import Message
 from .telemetry import GovernanceTelemetry
+from .batch_job import BatchJob, BatchJobPart
+from .job import Job, JobCell
+from .rollup import TelemetryRollup
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+import uuid
+
+class BatchJob(SQLModel, table=True):
+    """An offline comparison: every query in `queries` sent to every model through batch inference."""
+    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    status: str = Field(default="running", index=True) # running, completed, failed
+    governance_context: str
+    evaluator_model: Optional[str] = None # judge used after ingestion; None = leave unscored
+    queries: str # JSON list; record ids are "q<index>" into it
+    conversation_ids: str # JSON list, one conversation per query
+    total_records: int = Field(default=0)
+    completed_records: int = Field(default=0)
+    failed_records: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+class BatchJobPart(SQLModel, table=True):
+    """One provider-side batch: all of a job's queries for a single model."""
+    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    job_id: str = Field(foreign_key="batchjob.id", index=True)
+    host_platform: str
+    model_id: str
+    backend: str # BatchBackend.name that holds the provider job
+    external_id: Optional[str] = None # provider job id / ARN
+    status: str = Field(default="running") # running, completed, failed
+    # Process polling this part; another one takes over once the lease lapses
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    error: Optional[str] = None
+    submitted_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+import uuid
+
+class Job(SQLModel, table=True):
+    """A queued job run by a worker process: a comparison (every query against every model) or a re-cost."""
+    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    kind: str = Field(default="comparison") # comparison, recost
+    status: str = Field(default="queued", index=True) # queued, running, completed, failed
+    governance_context: str
+    evaluator_model: Optional[str] = None
+    queries: str # JSON list
+    conversation_ids: str # JSON list, one conversation per query
+    total_cells: int = Field(default=0)
+    completed_cells: int = Field(default=0)
+    failed_cells: int = Field(default=0)
+    attempts: int = Field(default=0) # times a worker has claimed the job
+    error: Optional[str] = None
+    result: Optional[str] = None # JSON report of a finished recost job
+    # Lease: the claiming worker must heartbeat before lease_expires_at or the job is reclaimed
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    available_at: datetime = Field(default_factory=datetime.utcnow, index=True) # retry backoff
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobCell(SQLModel, table=True):
+    """Checkpoint for one (query, model) pair of a job; completed cells are never rerun."""
+    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    job_id: str = Field(foreign_key="job.id", index=True)
+    query_index: int
+    host_platform: str
+    model_id: str
+    status: str = Field(default="pending") # pending, completed, failed
+    attempts: int = Field(default=0)
+    trace_id: Optional[str] = None # telemetry row written by the successful attempt
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,55 @@
+from typing import Optional
+from sqlalchemy import UniqueConstraint
+from sqlmodel import SQLModel, Field
+
+class TelemetryRollup(SQLModel, table=True):
+    """
+    Pre-aggregated GovernanceTelemetry per time bucket and dimension key, maintained
+    as telemetry is written (see app.services.rollups) so analytics never scan raw rows.
+    Averages are sum / count; standard deviations come from the sums of squares.
+    """
+    __table_args__ = (
+        UniqueConstraint("grain", "bucket", "model_id", "host_platform", "query_category", "governance_context", name="uq_telemetryrollup_key"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    grain: str # hour or day
+    bucket: str # "YYYY-MM-DD HH:00" (hour) or "YYYY-MM-DD" (day), UTC
+    model_id: str
+    host_platform: str
+    query_category: str = Field(default="") # "" while the row is not yet evaluated
+    governance_context: str
+
+    request_count: int = Field(default=0)
+    accuracy_sum: float = Field(default=0.0) # every row, unscored ones as 0
+    accuracy_sumsq: float = Field(default=0.0)
+    # Rows with a judge verdict (GovernanceTelemetry.scored); accuracy averages use these.
+    # Server defaults so migration 4's frozen backfill can fill a table create_all() made.
+    scored_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    scored_accuracy_sum: float = Field(default=0.0, sa_column_kwargs={"server_default": "0"})
+    scored_accuracy_sumsq: float = Field(default=0.0, sa_column_kwargs={"server_default": "0"})
+    cost_sum: float = Field(default=0.0)
+    cost_sumsq: float = Field(default=0.0)
+    latency_sum: float = Field(default=0.0) # every row, batch rows included
+    # Online (non-batch) rows only: batch inference has no per-call latency
+    online_count: int = Field(default=0)
+    online_latency_sum: float = Field(default=0.0)
+    online_latency_sumsq: float = Field(default=0.0)
+    input_tokens_sum: int = Field(default=0)
+    output_tokens_sum: int = Field(default=0)
+    # Rows with total_cost > 0, for accuracy per dollar
+    paid_count: int = Field(default=0)
+    paid_accuracy_sum: float = Field(default=0.0)
+    # Per-phase timings are optional: count only rows that recorded the phase
+    db_setup_ms_count: int = Field(default=0)
+    db_setup_ms_sum: float = Field(default=0.0)
+    guardrail_ms_count: int = Field(default=0)
+    guardrail_ms_sum: float = Field(default=0.0)
+    provider_call_ms_count: int = Field(default=0)
+    provider_call_ms_sum: float = Field(default=0.0)
+    time_to_first_token_ms_count: int = Field(default=0)
+    time_to_first_token_ms_sum: float = Field(default=0.0)
+    evaluation_ms_count: int = Field(default=0)
+    evaluation_ms_sum: float = Field(default=0.0)
+    persistence_ms_count: int = Field(default=0)
+    persistence_ms_sum: float = Field(default=0.0)
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 import uuid
 
@@ -7,6 +8,13 @@ if TYPE_CHECKING:
     from .message import Message
 
 class GovernanceTelemetry(SQLModel, table=True):
+    __table_args__ = (
+        # A batch record is ingested once, however often its part is polled or retried
+        Index("uq_governancetelemetry_batch_record", "batch_job_id", "model_id", "batch_record_id", unique=True),
+        # ... and a job cell completes once, even if its worker dies before checkpointing it
+        Index("uq_governancetelemetry_job_cell", "job_cell_id", unique=True),
+    )
+
     id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     message_id: Optional[str] = Field(default=None, foreign_key="message.id")
     
@@ -20,15 +28,34 @@ class GovernanceTelemetry(SQLModel, table=True):
     
     # Metrics
     latency_ms: float
+    time_to_first_token_ms: Optional[float] = None # set for streamed invocations
+    # Per-phase breakdown (see PhaseTimings); latency_ms spans db_setup and provider_call
+    db_setup_ms: Optional[float] = None
+    guardrail_ms: Optional[float] = None
+    provider_call_ms: Optional[float] = None
+    evaluation_ms: Optional[float] = None
+    persistence_ms: Optional[float] = None
     input_tokens: int
     output_tokens: int
+    cache_read_tokens: int = Field(default=0) # part of input_tokens billed at the prompt cache read rate
+    cache_write_tokens: int = Field(default=0) # part of input_tokens billed at the prompt cache write rate
     total_cost: float
+    hedge_cost: float = Field(default=0.0) # part of total_cost spent on hedged duplicates
+    pricing_version: Optional[str] = None # pricing table used to compute total_cost
+    cache_hit: bool = Field(default=False) # served from the response cache, zero incremental cost
+    coalesced: bool = Field(default=False) # shared an identical in-flight call, zero incremental cost
+    attempts: int = Field(default=0) # provider attempts including retries
+    batch_job_id: Optional[str] = Field(default=None, index=True) # priced at batch rates; latency_ms not measured
+    batch_record_id: Optional[str] = None # record within the batch job ("q<index>"); NULL for online calls
+    job_cell_id: Optional[str] = None # worker job cell this row completed; NULL for failed attempts and other calls
     
     # Accuracy / Quality (aggregated here for easy dashboard queries)
     accuracy_score: float = Field(default=0.0)
+    scored: bool = Field(default=False) # accuracy_score is a judge verdict, not a pending/skipped/failed placeholder
     accuracy_rationale: Optional[str] = None
     query_category: Optional[str] = None
     prompt_optimization: Optional[str] = None
+    evaluator_cost: float = Field(default=0.0) # judge call cost, not included in total_cost
     
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     
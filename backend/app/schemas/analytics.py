@@ -12,6 +12,16 @@ class ModelPerformance(BaseModel):
     avg_input_tokens: int
     avg_output_tokens: int
     total_cost: float
+    # Spread across requests (population standard deviation)
+    stddev_accuracy: Optional[float] = None
+    stddev_latency_ms: Optional[float] = None
+    # Average per-phase breakdown (ms); None where no row recorded the phase
+    avg_db_setup_ms: Optional[float] = None
+    avg_guardrail_ms: Optional[float] = None
+    avg_provider_call_ms: Optional[float] = None
+    avg_time_to_first_token_ms: Optional[float] = None
+    avg_evaluation_ms: Optional[float] = None
+    avg_persistence_ms: Optional[float] = None
 
 class CostBreakdown(BaseModel):
     host_platform: str
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class BatchJobPartStatus(BaseModel):
+    id: str
+    host_platform: str
+    model_id: str
+    backend: str
+    external_id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    submitted_at: datetime
+    completed_at: Optional[datetime] = None
+
+class BatchJobStatus(BaseModel):
+    id: str
+    status: str # running, completed, failed
+    total_records: int
+    completed_records: int
+    failed_records: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    parts: List[BatchJobPartStatus]
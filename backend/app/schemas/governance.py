@@ -22,7 +22,10 @@ class UsageMetrics(BaseModel):
     input_tokens: int = 0
     output_tokens: int = 0
     total_tokens: int = 0
+    cache_read_tokens: int = 0 # Part of input_tokens served from the provider's prompt cache
+    cache_write_tokens: int = 0 # Part of input_tokens written to the provider's prompt cache
     latency_ms: float = 0.0
+    time_to_first_token_ms: Optional[float] = None # Streamed calls only
     
     @computed_field
     def total_tokens_calc(self) -> int:
@@ -32,7 +35,9 @@ class CostMetrics(BaseModel):
     """Calculated cost metrics"""
     input_cost: float = 0.0
     output_cost: float = 0.0
-    total_cost: float = 0.0
+    total_cost: float = 0.0 # Includes hedge_cost
+    hedge_cost: float = 0.0 # Duplicate spend from a hedged request
+    pricing_version: Optional[str] = None # Pricing table the cost was computed with (None if not costed)
     currency: str = "USD"
     
 class AccuracyMetrics(BaseModel):
@@ -42,6 +47,16 @@ class AccuracyMetrics(BaseModel):
     evaluator_model: Optional[str] = Field(None, description="Model used to evaluate accuracy")
     query_category: Optional[str] = Field(None, description="Category of the query (e.g., Reasoning, Forecasting)")
     prompt_optimization: Optional[str] = Field(None, description="Suggestions to optimize the prompt")
+    evaluator_cost: float = Field(0.0, description="Cost of the judge call in USD (share of it for batched verdicts, 0 if reused)")
+    scored: bool = Field(False, description="score is a judge verdict (False while pending, skipped or failed)")
+
+class PhaseTimings(BaseModel):
+    """Where the time of one analysis went (ms); None for phases that did not run"""
+    db_setup_ms: Optional[float] = None # conversation/user message writes
+    guardrail_ms: Optional[float] = None # Bedrock guardrail check in the middleware
+    provider_call_ms: Optional[float] = None # model invocation incl. admission, retries, hedging
+    evaluation_ms: Optional[float] = None # judge call
+    persistence_ms: Optional[float] = None # assistant message + telemetry writes
 
 class GovernanceLog(BaseModel):
     """
@@ -64,6 +79,7 @@ class GovernanceLog(BaseModel):
     
     # Data
     usage: UsageMetrics = Field(default_factory=UsageMetrics)
+    timings: PhaseTimings = Field(default_factory=PhaseTimings)
     cost: Optional[CostMetrics] = None
     accuracy: Optional[AccuracyMetrics] = None # New field for accuracy scoring
     
@@ -75,8 +91,14 @@ class GovernanceLog(BaseModel):
     # Content
     input_prompt: Optional[str] = None # Added field
     response_text: Optional[str] = None # Added field
-    input_hash: Optional[str] = None
-    output_hash: Optional[str] = None
+    input_hash: Optional[str] = None # SHA-256 of the normalized prompt
+    output_hash: Optional[str] = None # SHA-256 of the response text
+    cache_hit: bool = False # Response served from the response cache (no provider call)
+    coalesced: bool = False # Response shared with an identical in-flight invocation
+    attempts: int = 0 # Provider attempts made by this call, retries included (0 if cached/coalesced)
+    batch_job_id: Optional[str] = None # Set when the response came from an offline batch inference job
+    batch_record_id: Optional[str] = None # Record within that job ("q<index>")
+    job_cell_id: Optional[str] = None # Worker job cell this response completed (successful responses only)
     
     class Config:
         use_enum_values = True
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+class JobCellStatus(BaseModel):
+    id: str
+    query_index: int
+    host_platform: str
+    model_id: str
+    status: str # pending, completed, failed
+    attempts: int
+    trace_id: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: datetime
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str = "comparison" # comparison, recost
+    status: str # queued, running, completed, failed
+    total_cells: int
+    completed_cells: int
+    failed_cells: int
+    progress: float # settled cells / total cells
+    attempts: int
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None # RecostReport of a finished recost job
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cells: List[JobCellStatus]
@@ -8,6 +8,7 @@ class GovernanceRequest(BaseModel):
     host_platform: str = Field("aws_bedrock", description="The AI host platform (aws_bedrock, gcp_vertex, openai)")
     model_id: str
     evaluator_model: Optional[str] = "gemini-2.5-pro"
+    bypass_cache: bool = Field(False, description="Skip the response cache and always call the provider")
 
 # Batch Request Components
 class ModelConfig(BaseModel):
@@ -19,6 +20,21 @@ class BatchGovernanceRequest(BaseModel):
     governance_context: str = Field("aws", description="The cloud provider context (aws, azure, gcp)")
     models: List[ModelConfig]
     evaluator_model: Optional[str] = "gemini-2.5-pro"
+    batch_evaluation: bool = Field(False, description="Grade all responses in one judge call instead of one call per model")
+    bypass_cache: bool = Field(False, description="Skip the response cache and always call the provider")
+    stream_tokens: bool = Field(True, description="Stream endpoint only: forward each model's text as 'delta' events while it is generated")
+
+class BatchJobRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, description="Every query is sent to every model")
+    governance_context: str = Field("aws", description="The cloud provider context (aws, azure, gcp)")
+    models: List[ModelConfig] = Field(..., min_length=1)
+    evaluator_model: Optional[str] = Field(None, description="Judge that scores responses once ingested; omit to leave them unscored")
+
+class JobRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, description="Every query is run against every model")
+    governance_context: str = Field("aws", description="The cloud provider context (aws, azure, gcp)")
+    models: List[ModelConfig] = Field(..., min_length=1)
+    evaluator_model: Optional[str] = Field("gemini-2.5-pro", description="Judge for each response; null skips evaluation")
 
 class GovernanceResponse(BaseModel):
     result: str
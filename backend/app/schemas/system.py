@@ -0,0 +1,97 @@
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+class ExecutorMetrics(BaseModel):
+    max_workers: int
+    active_workers: int
+    queue_depth: int
+    submitted: int
+    completed: int
+    failed: int
+    avg_wait_ms: float
+    p95_wait_ms: float
+    max_wait_ms: float
+
+class WriteBehindStats(BaseModel):
+    durability: str
+    queued: int
+    max_queue: int
+    writes: int
+    commits: int
+    failed: int
+    avg_batch: float
+    max_batch: int
+
+class CacheStats(BaseModel):
+    enabled: bool
+    entries: int = 0
+    max_entries: int = 0
+    ttl_seconds: Optional[float] = None
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+class AnalyticsCacheStats(CacheStats):
+    generation: int = 0
+
+class VerdictCacheStats(CacheStats):
+    persistent: bool = False
+    persistent_hits: int = 0
+
+class SingleFlightStats(BaseModel):
+    in_flight: int
+    calls: int
+    coalesced: int
+
+class AdmissionStats(BaseModel):
+    scope: str
+    concurrency: int
+    active: int
+    waiting: int
+    rpm_available: Optional[float] = None
+    tpm_available: Optional[float] = None
+    admitted: int
+    queued: int
+    rejected: int
+    avg_wait_ms: float
+
+class RetryStats(BaseModel):
+    requests: int
+    retries: int
+    exhausted: int
+    balance: float
+    ratio: float
+
+class PricingStats(BaseModel):
+    version: str
+    loaded_at: float
+    models: Dict[str, int]
+    reloads: int
+    failed_reloads: int
+    last_error: Optional[str] = None
+
+class PricingReloadResult(PricingStats):
+    changed: bool
+
+class RecostReport(BaseModel):
+    rows: int
+    updated: int
+    chunks: int
+    cost_before: float
+    cost_after: float
+    pricing_version: str
+    dry_run: bool
+    elapsed_ms: float
+
+class RollupRebuildReport(BaseModel):
+    buckets: int
+    elapsed_ms: float
+
+class LatencySample(BaseModel):
+    samples: int
+    p95_ms: float
+
+class HedgingStats(BaseModel):
+    enabled: bool
+    models: Dict[str, LatencySample]
@@ -0,0 +1,227 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional
+from app.core.config import settings
+
+class AdmissionRejected(Exception):
+    """Raised when a call could not be admitted within the allowed queueing time."""
+    pass
+
+class TokenBucket:
+    """
+    Continuously refilling bucket sized for a per-minute quota.
+    The level may go negative when a call turns out to cost more than estimated;
+    later callers then wait until that debt has been refilled.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (amounts above capacity only need a full bucket)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class Limiter:
+    """
+    Concurrency cap plus optional RPM/TPM buckets for one scope (a provider or a model).
+    A limit of 0 disables it. Waiters are woken in arrival order when a slot frees up.
+    """
+
+    def __init__(self, name: str, concurrency: int = 0, rpm: int = 0, tpm: int = 0):
+        self.name = name
+        self.concurrency = concurrency
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def _delay(self, tokens: int) -> Optional[float]:
+        """0 if admissible now, seconds until the buckets allow it, or None if all slots are busy."""
+        if self.concurrency and self.active >= self.concurrency:
+            return None
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.wait_time(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.wait_time(tokens))
+        return delay
+
+    async def acquire(self, tokens: int, give_up_at: float) -> None:
+        started = time.monotonic()
+        waited = False
+        while True:
+            delay = self._delay(tokens)
+            if delay == 0:
+                break
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0 or (delay is not None and delay > remaining):
+                self.rejected += 1
+                reason = "concurrency" if delay is None else "rate"
+                raise AdmissionRejected(f"{self.name}: {reason} limit reached, not admitted within the queueing window")
+            if not waited:
+                waited = True
+                self.queued += 1
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout=remaining if delay is None else delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        self.active += 1
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+        self.admitted += 1
+        self.total_wait += time.monotonic() - started
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        self.active -= 1
+        if self.tokens and actual_tokens is not None:
+            # Reconcile the estimate charged at admission with what the call really used
+            difference = actual_tokens - estimated_tokens
+            if difference > 0:
+                self.tokens.take(difference)
+            elif difference < 0:
+                self.tokens.give(-difference)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scope": self.name,
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "rpm_available": round(self._level(self.requests), 2) if self.requests else None,
+            "tpm_available": round(self._level(self.tokens), 2) if self.tokens else None,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+        }
+
+    def _level(self, bucket: TokenBucket) -> float:
+        bucket._refill()
+        return bucket.level
+
+class Ticket:
+    """Handed to the admitted caller; set actual_tokens once the provider reports usage."""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+class AdmissionController:
+    """
+    Client-side admission in front of each provider. A call must pass its provider's
+    limiter and, if configured, its model's limiter; callers queue for up to
+    max_wait seconds instead of spending a request on a certain throttling error.
+    """
+
+    def __init__(
+        self,
+        provider_limits: Dict[str, Dict[str, int]],
+        model_limits: Dict[str, Dict[str, int]],
+        max_wait: float,
+        output_token_estimate: int
+    ):
+        self.provider_limits = provider_limits
+        self.model_limits = model_limits
+        self.max_wait = max_wait
+        self.output_token_estimate = output_token_estimate
+        self._limiters: Dict[str, Limiter] = {}
+
+    def estimate_tokens(self, prompt: str) -> int:
+        # ~4 characters per token, plus the completion the provider reserves quota for
+        return len(prompt) // 4 + self.output_token_estimate
+
+    def _limiter(self, scope: str, limits: Optional[Dict[str, int]]) -> Optional[Limiter]:
+        if not limits:
+            return None
+        limiter = self._limiters.get(scope)
+        if limiter is None:
+            limiter = Limiter(
+                scope,
+                concurrency=limits.get("concurrency", 0),
+                rpm=limits.get("rpm", 0),
+                tpm=limits.get("tpm", 0)
+            )
+            self._limiters[scope] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def admit(self, provider: str, model_id: str, prompt: str):
+        estimated = self.estimate_tokens(prompt)
+        ticket = Ticket(estimated)
+        limiters = [
+            limiter for limiter in (
+                self._limiter(provider, self.provider_limits.get(provider)),
+                self._limiter(f"{provider}/{model_id}", self.model_limits.get(model_id)),
+            ) if limiter is not None
+        ]
+
+        give_up_at = time.monotonic() + self.max_wait
+        acquired: List[Limiter] = []
+        try:
+            for limiter in limiters:
+                await limiter.acquire(estimated, give_up_at)
+                acquired.append(limiter)
+        except BaseException:
+            # Not admitted after all: hand back the partial reservation untouched
+            for limiter in acquired:
+                limiter.release(estimated, 0)
+            raise
+
+        try:
+            yield ticket
+        finally:
+            # A failed call keeps its estimate charged; the provider likely counted it
+            for limiter in acquired:
+                limiter.release(estimated, ticket.actual_tokens)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [limiter.stats() for limiter in self._limiters.values()]
+
+admission_controller = AdmissionController(
+    provider_limits=settings.PROVIDER_LIMITS,
+    model_limits=settings.MODEL_LIMITS,
+    max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+    output_token_estimate=settings.ADMISSION_OUTPUT_TOKEN_ESTIMATE
+)
@@ -1,103 +1,365 @@
 import uuid
 import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Callable, Set
 from app.schemas.governance import (
-    GovernanceLog, 
-    ModelProvider, 
-    UsageMetrics, 
+    GovernanceLog,
+    ModelProvider,
+    UsageMetrics,
     InvocationStatus,
+    PhaseTimings,
     CostMetrics,
     AccuracyMetrics
 )
 from app.schemas.requests import ModelConfig
 from app.core.config import settings
+from app.core.deadline import Deadline
 from app.services.llm_providers.bedrock import BedrockService
 from app.services.llm_providers.openai_provider import OpenAIProvider
 from app.services.llm_providers.vertex_provider import VertexProvider
 from app.services.pricing_service import pricing_service
-from app.services.db_service import db_service
+from app.services.write_behind import write_behind
 from app.services.evaluator_service import evaluator_service
+from app.services.admission import admission_controller
+from app.services.retry import AttemptLog, StreamInterrupted, retry_policy
+from app.services.singleflight import SingleFlight
+from app.services.hedging import LatencyTracker, hedged
+from app.utils.cache import TTLCache
+from app.utils.common import content_hash, normalize_query
+from app.utils.timing import PhaseTimer
 
 # Initialize providers
 bedrock_service = BedrockService()
 openai_service = OpenAIProvider()
 vertex_service = VertexProvider()
+# Optional second Bedrock region that hedged duplicates are sent to
+hedge_bedrock_service = BedrockService(settings.HEDGE_BEDROCK_REGION) if settings.HEDGE_BEDROCK_REGION else None
 
-def analyze_governance(
-    query: str, 
-    provider_str: str, 
-    model_id: str, 
-    conversation_id: Optional[str] = None, 
+async def aclose() -> None:
+    """Closes the providers' shared HTTP clients (app lifespan and worker shutdown)."""
+    for service in (bedrock_service, hedge_bedrock_service, evaluator_service.bedrock_service):
+        if service is not None:
+            await service.aclose()
+
+# Opt-in cache of provider responses keyed by (provider, model_id, normalized query hash)
+response_cache = (
+    TTLCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if settings.RESPONSE_CACHE_ENABLED else None
+)
+
+# Concurrent identical (provider, model_id, prompt) invocations share one upstream call
+provider_flights = SingleFlight()
+
+# Recent provider latencies per (provider, model_id); their p95 is the hedging trigger
+provider_latency = LatencyTracker(window=200, min_samples=settings.HEDGE_MIN_SAMPLES)
+
+# Per-model timeout (settings.MODEL_TIMEOUT_SECONDS, 90 seconds by default)
+MODEL_TIMEOUT = settings.MODEL_TIMEOUT_SECONDS
+
+# End-to-end budget for one analysis (provider call + evaluation). The provider call
+# gets at most MODEL_TIMEOUT of it; the judge is skipped if less than
+# EVALUATION_MIN_BUDGET is left when the model answers.
+REQUEST_DEADLINE = 150.0
+EVALUATION_MIN_BUDGET = 5.0
+
+# Rationale carried by entries whose judge call runs after the result is streamed
+PENDING_EVALUATION = "Evaluation pending"
+# Rationale for entries no judge will ever score (jobs submitted without an evaluator)
+NOT_EVALUATED = "Not evaluated (job without evaluator)"
+
+# Stream judge calls left to finish after their client disconnected (held until done)
+_detached_evaluations: Set[asyncio.Task] = set()
+
+def _resolve_provider(provider_str: str) -> ModelProvider:
+    # Map string provider to Enum
+    provider_key = provider_str.lower()
+    if "aws" in provider_key:
+        return ModelProvider.AWS
+    elif "openai" in provider_key:
+        return ModelProvider.OPENAI
+    elif "google" in provider_key or "gcp" in provider_key:
+        return ModelProvider.GOOGLE
+    return ModelProvider.OTHER
+
+async def _invoke_provider(
+    provider: ModelProvider,
+    model_id: str,
+    query: str,
+    deadline: Optional[Deadline] = None,
+    attempts: Optional[AttemptLog] = None,
+    backup: bool = False,
+    on_delta: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    One provider invocation, retried with backoff on transient errors (throttling,
+    5xx, dropped connections) while the deadline and global retry budget allow.
+    A backup (hedged) call goes to the alternate Bedrock region when one is configured.
+    With on_delta the provider is called in streaming mode and text is forwarded as
+    it arrives; once any text has been forwarded, a failure is no longer retried.
+    """
+    services = {
+        ModelProvider.AWS: hedge_bedrock_service if backup and hedge_bedrock_service else bedrock_service,
+        # Call Real OpenAI Service
+        ModelProvider.OPENAI: openai_service,
+        # Call GCP Vertex AI Service
+        ModelProvider.GOOGLE: vertex_service,
+    }
+
+    forwarded = False
+
+    def forward(text: str) -> None:
+        nonlocal forwarded
+        forwarded = True
+        on_delta(text)
+
+    async def attempt(timeout: Optional[float]) -> Dict[str, Any]:
+        if provider not in services:
+            await asyncio.sleep(0.1)
+            if on_delta:
+                on_delta(f"Mock response from {provider}")
+            return {
+                "response_text": f"Mock response from {provider}",
+                "input_tokens": 5,
+                "output_tokens": 5
+            }
+        # Queue behind the provider's concurrency/RPM/TPM limits instead of risking a 429
+        async with admission_controller.admit(provider.value, model_id, query) as ticket:
+            if on_delta is None:
+                result = await services[provider].invoke_model_async(model_id, query, timeout=timeout)
+            else:
+                try:
+                    result = await services[provider].stream_model_async(model_id, query, forward, timeout=timeout)
+                except Exception as e:
+                    if forwarded:
+                        raise StreamInterrupted(f"Stream interrupted after partial output: {e}") from e
+                    raise
+            ticket.actual_tokens = result["input_tokens"] + result["output_tokens"]
+            return result
+
+    return await retry_policy.run(attempt, deadline, attempts, label=f"{provider.value}/{model_id}")
+
+async def _invoke_hedged(
+    provider: ModelProvider,
+    model_id: str,
+    query: str,
+    deadline: Deadline,
+    attempts: AttemptLog,
+    on_delta: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Provider call that, with HEDGING_ENABLED, fires a duplicate once the model's
+    observed p95 has passed and keeps whichever answers first. A result whose
+    duplicate was still in flight is marked "hedged" so its extra spend is costed.
+    Streamed calls are never hedged: two streams would interleave their text.
+    """
+    key = (provider.value, model_id)
+    started = time.monotonic()
+    p95 = provider_latency.p95(key) if settings.HEDGING_ENABLED and on_delta is None else None
+
+    call = lambda backup=False: _invoke_provider(provider, model_id, query, deadline, attempts, backup, on_delta)
+    if p95 is None or p95 >= deadline.remaining():
+        result = await call()
+    else:
+        result, duplicate_billed = await hedged(call, lambda: call(backup=True), max(p95, settings.HEDGE_MIN_DELAY_SECONDS))
+        if duplicate_billed:
+            result = {**result, "hedged": True}
+
+    provider_latency.record(key, time.monotonic() - started)
+    return result
+
+def _failed_log(
+    model_id: str,
+    query: str,
+    evaluator_model: str,
+    governance_context: str,
+    error_message: str,
+    rationale: str,
+    latency_ms: float = 0
+) -> GovernanceLog:
+    """Placeholder log for a model whose analysis never produced its own entry."""
+    now = datetime.utcnow()
+    return GovernanceLog(
+        id=str(uuid.uuid4()),
+        trace_id=str(uuid.uuid4()),
+        provider=ModelProvider.OTHER,
+        model_id=model_id,
+        started_at=now,
+        ended_at=now,
+        usage=UsageMetrics(input_tokens=0, output_tokens=0, total_tokens=0, latency_ms=latency_ms),
+        cost=CostMetrics(input_cost=0, output_cost=0, total_cost=0),
+        accuracy=AccuracyMetrics(score=0, rationale=rationale, evaluator_model=evaluator_model),
+        status=InvocationStatus.FAILED,
+        success=False,
+        error_message=error_message,
+        tags={"environment": "dev", "governance_context": governance_context},
+        input_prompt=query,
+        response_text=""
+    )
+
+def _settle_result(
+    res: Any,
+    config: ModelConfig,
+    query: str,
+    evaluator_model: str,
+    governance_context: str
+) -> GovernanceLog:
+    """Turns a gathered result (log or crash) into a GovernanceLog."""
+    if isinstance(res, Exception):
+        # This handles cases where analyze_governance itself crashed before its internal try-except
+        print(f"Batch Error for model {config.model_id}: {res}")
+        return _failed_log(
+            config.model_id, query, evaluator_model, governance_context,
+            error_message=str(res),
+            rationale="Model execution failed"
+        )
+    return res
+
+async def _judge_within(deadline: Deadline, judge, count: Optional[int] = None):
+    """
+    Runs a judge call inside what is left of the deadline, passing the remaining
+    seconds down as the SDK timeout. Skipped outright when too little is left.
+    """
+    remaining = deadline.remaining()
+    if remaining < EVALUATION_MIN_BUDGET:
+        verdict = {"score": 0, "rationale": "Evaluation skipped (deadline exhausted)"}
+    else:
+        try:
+            return await asyncio.wait_for(judge(remaining), timeout=remaining)
+        except asyncio.TimeoutError:
+            verdict = {"score": 0, "rationale": "Evaluation exceeded the request deadline"}
+    return verdict if count is None else [dict(verdict) for _ in range(count)]
+
+def _build_accuracy(accuracy_data: Dict[str, Any], evaluator_model: str) -> AccuracyMetrics:
+    return AccuracyMetrics(
+        score=accuracy_data.get("score", 0),
+        rationale=accuracy_data.get("rationale", "No rationale provided"),
+        evaluator_model=evaluator_model,
+        query_category=accuracy_data.get("query_category"),
+        prompt_optimization=accuracy_data.get("prompt_optimization"),
+        evaluator_cost=accuracy_data.get("evaluator_cost", 0.0),
+        # The judge tags every parsed verdict (fresh or reused) with its model; placeholders are not
+        scored=bool(accuracy_data.get("evaluator_model"))
+    )
+
+async def analyze_governance(
+    query: str,
+    provider_str: str,
+    model_id: str,
+    conversation_id: Optional[str] = None,
     evaluator_model: str = "gemini-2.5-pro",
-    governance_context: str = "aws"
+    governance_context: str = "aws",
+    evaluate: bool = True,
+    unscored_rationale: str = PENDING_EVALUATION,
+    bypass_cache: bool = False,
+    deadline: Optional[Deadline] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    timer: Optional[PhaseTimer] = None,
+    job_cell_id: Optional[str] = None
 ) -> GovernanceLog:
     """
     Orchestrates the AI analysis and persists the result.
+    Provider and evaluator calls are awaited natively and DB writes are only queued
+    for the write-behind writer, so no executor thread is held for this analysis.
+
+    With evaluate=False the judge call is skipped and the entry is persisted with a
+    pending accuracy; evaluate_log() scores it later and updates telemetry in place.
+    Callers that will never score it pass unscored_rationale=NOT_EVALUATED instead.
+    When the response cache is enabled, a fresh entry for the same provider, model
+    and normalized query is reused at zero cost unless bypass_cache is set.
+    Identical invocations already in flight are joined rather than repeated; the
+    joining caller still gets its own log and telemetry row, marked coalesced.
+
+    The deadline bounds the whole analysis: the provider call is abandoned (and its
+    SDK request timed out) when its share runs out, and the outcome is persisted
+    exactly once, by this function, whether it succeeded or timed out.
+
+    With on_delta the provider streams and each text chunk is passed on as it
+    arrives; the time to the first chunk is recorded in usage. Cached or coalesced
+    answers arrive whole, without deltas.
+
+    Each phase (db_setup, provider_call, evaluation, persistence) is timed separately;
+    timer may carry phases that ran before this call (guardrail, a batch's db_setup).
+    latency_ms keeps its meaning: from the start of the analysis to the model's answer,
+    conversation setup included; provider_call_ms is that call alone.
+
+    job_cell_id tags a successful result's telemetry row with the worker job cell it
+    completes, so a rerun of that cell finds it instead of writing a second row.
     """
-    
+
     start_time = datetime.utcnow()
-    
+    if deadline is None:
+        deadline = Deadline(REQUEST_DEADLINE)
+    timer = timer.copy() if timer else PhaseTimer()
+
     # 1. Conversation Management
     if not conversation_id:
-        conv = db_service.create_conversation(title=query[:50])
-        conversation_id = conv.id
-        db_service.add_message(conversation_id, "user", query)
+        with timer.phase("db_setup"):
+            conversation_id = await write_behind.add_conversation(query[:50], query)
 
-    # Map string provider to Enum
-    provider_key = provider_str.lower()
-    if "aws" in provider_key:
-        provider = ModelProvider.AWS
-    elif "openai" in provider_key:
-        provider = ModelProvider.OPENAI
-    elif "google" in provider_key or "gcp" in provider_key:
-        provider = ModelProvider.GOOGLE
-    else:
-        provider = ModelProvider.OTHER
+    provider = _resolve_provider(provider_str)
 
     # Initialize placeholders
     response_text = ""
     input_tokens = 0
     output_tokens = 0
+    cache_read_tokens = 0
+    cache_write_tokens = 0
     error_msg = None
     success = False
 
+    input_hash = content_hash(normalize_query(query))
+    cache_key = (provider.value, model_id, input_hash)
+    cache_hit = False
+    coalesced = False
+    budget = deadline.cap(MODEL_TIMEOUT)
+    attempts = AttemptLog()
+    hedge_fired = False
+    call_started = time.monotonic()
+    first_token_at = None
+
+    def forward(text: str) -> None:
+        nonlocal first_token_at
+        if first_token_at is None:
+            first_token_at = time.monotonic()
+        on_delta(text)
+
     print(f"DEBUG: Starting analysis for {model_id} on {provider_str} (Context: {governance_context})")
     try:
-        if provider == ModelProvider.AWS:
-            result = bedrock_service.invoke_model(model_id, query)
-            response_text = result["response_text"]
-            input_tokens = result["input_tokens"]
-            output_tokens = result["output_tokens"]
-            success = True
-        elif provider == ModelProvider.OPENAI:
-            # Call Real OpenAI Service
-            result = openai_service.invoke_model(model_id, query)
-            response_text = result["response_text"]
-            input_tokens = result["input_tokens"]
-            output_tokens = result["output_tokens"]
-            success = True
-        elif provider == ModelProvider.GOOGLE:
-            # Call GCP Vertex AI Service
-            result = vertex_service.invoke_model(model_id, query)
+        with timer.phase("provider_call"):
+            result = None
+            if response_cache is not None and not bypass_cache:
+                result = response_cache.get(cache_key)
+                cache_hit = result is not None
+            if result is None:
+                flight_key = (provider.value, model_id, content_hash(query))
+                provider_deadline = Deadline(budget)
+                invoke = lambda: _invoke_hedged(
+                    provider, model_id, query, provider_deadline, attempts, forward if on_delta else None
+                )
+                if settings.SINGLE_FLIGHT_ENABLED:
+                    result, coalesced = await asyncio.wait_for(provider_flights.do(flight_key, invoke), timeout=budget)
+                else:
+                    result = await asyncio.wait_for(invoke(), timeout=budget)
+                if response_cache is not None and not coalesced:
+                    response_cache.put(cache_key, result)
             response_text = result["response_text"]
             input_tokens = result["input_tokens"]
             output_tokens = result["output_tokens"]
-            success = True
-        else:
-            time.sleep(0.1)
-            response_text = f"Mock response from {provider}"
-            input_tokens = 5
-            output_tokens = 5
+            cache_read_tokens = result.get("cache_read_tokens", 0)
+            cache_write_tokens = result.get("cache_write_tokens", 0)
+            hedge_fired = result.get("hedged", False)
             success = True
 
+    except asyncio.TimeoutError:
+        print(f"Timeout for model {model_id} after {budget:.1f}s")
+        error_msg = f"Model execution exceeded {budget:.1f}s timeout"
+        success = False
     except Exception as e:
         print(f"ERROR: Model {model_id} ({provider_str}) failed: {str(e)}")
         error_msg = str(e)
         success = False
-    
+
     # Calculate Latency
     end_time = datetime.utcnow()
     latency_ms = (end_time - start_time).total_seconds() * 1000
@@ -106,35 +368,48 @@ def analyze_governance(
         input_tokens=input_tokens,
         output_tokens=output_tokens,
         total_tokens=input_tokens + output_tokens,
-        latency_ms=latency_ms
-    )
-    
-    # Calculate Real Cost
-    cost_data = pricing_service.calculate_cost(
-        provider=provider_str,
-        model_name=model_id,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens
+        cache_read_tokens=cache_read_tokens,
+        cache_write_tokens=cache_write_tokens,
+        latency_ms=latency_ms,
+        time_to_first_token_ms=(first_token_at - call_started) * 1000 if first_token_at is not None else None
     )
-    
+
+    # Calculate Real Cost (a cached or coalesced answer costs nothing extra)
+    if cache_hit or coalesced:
+        cost_data = {"input_cost": 0.0, "output_cost": 0.0, "total_cost": 0.0}
+    else:
+        cost_data = pricing_service.calculate_cost(
+            provider=provider_str,
+            model_name=model_id,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cache_read_tokens=cache_read_tokens,
+            cache_write_tokens=cache_write_tokens
+        )
+
+    # A hedged duplicate is priced as a full copy of the winning call: providers bill
+    # non-streamed generations even when the client has already disconnected
+    hedge_cost = cost_data["total_cost"] if hedge_fired and not (cache_hit or coalesced) else 0.0
+
     cost = CostMetrics(
         input_cost=cost_data["input_cost"],
         output_cost=cost_data["output_cost"],
-        total_cost=cost_data["total_cost"]
+        total_cost=cost_data["total_cost"] + hedge_cost,
+        hedge_cost=hedge_cost,
+        pricing_version=cost_data.get("pricing_version")
     )
 
     # Calculate Real Accuracy using selected Evaluator
     accuracy_data = {"score": 0, "rationale": "Evaluation skipped (failed)"}
-    if success:
-        accuracy_data = evaluator_service.evaluate_response(query, response_text, model_id=evaluator_model)
-    
-    accuracy = AccuracyMetrics(
-        score=accuracy_data.get("score", 0),
-        rationale=accuracy_data.get("rationale", "No rationale provided"),
-        evaluator_model=evaluator_model,
-        query_category=accuracy_data.get("query_category"),
-        prompt_optimization=accuracy_data.get("prompt_optimization")
-    )
+    if success and evaluate:
+        with timer.phase("evaluation"):
+            accuracy_data = await _judge_within(deadline, lambda timeout: evaluator_service.evaluate_response_async(
+                query, response_text, model_id=evaluator_model, timeout=timeout
+            ))
+    elif success:
+        accuracy_data = {"score": 0, "rationale": unscored_rationale}
+
+    accuracy = _build_accuracy(accuracy_data, evaluator_model)
 
     # Create the log entry (Transient Pydantic Object)
     log_entry = GovernanceLog(
@@ -145,6 +420,7 @@ def analyze_governance(
         started_at=start_time,
         ended_at=end_time,
         usage=usage,
+        timings=PhaseTimings(**{f"{name}_ms": ms for name, ms in timer.phases.items()}),
         cost=cost,
         accuracy=accuracy,
         status=InvocationStatus.COMPLETED if success else InvocationStatus.FAILED,
@@ -152,195 +428,247 @@ def analyze_governance(
         error_message=error_msg,
         tags={"environment": "dev", "governance_context": governance_context},
         input_prompt=query,
-        response_text=response_text
+        response_text=response_text,
+        input_hash=input_hash,
+        output_hash=content_hash(response_text) if success else None,
+        cache_hit=cache_hit,
+        coalesced=coalesced,
+        attempts=attempts.count,
+        job_cell_id=job_cell_id if success else None
     )
-    
-    # 2. Persist Assistant Response & Telemetry to DB
-    msg = db_service.add_message(conversation_id, "assistant", response_text)
-    db_service.add_telemetry(msg.id, log_entry.model_dump())
-    
+
+    # 2. Persist Assistant Response & Telemetry to DB (queued for the group-committing writer)
+    log_entry.timings.persistence_ms = await write_behind.add_response(conversation_id, log_entry.model_dump())
+
     return log_entry
 
+async def evaluate_log(
+    log_entry: GovernanceLog,
+    evaluator_model: str = "gemini-2.5-pro",
+    deadline: Optional[Deadline] = None
+) -> GovernanceLog:
+    """
+    Second phase of a two-phase analysis: scores a persisted entry and updates its
+    telemetry row (matched on trace_id) in place.
+    """
+    timer = PhaseTimer()
+    with timer.phase("evaluation"):
+        accuracy_data = await _judge_within(deadline or Deadline(MODEL_TIMEOUT), lambda timeout: evaluator_service.evaluate_response_async(
+            log_entry.input_prompt, log_entry.response_text, model_id=evaluator_model, timeout=timeout
+        ))
+
+    await _apply_verdict(log_entry, accuracy_data, evaluator_model, timer.get("evaluation"))
+    return log_entry
+
+async def evaluate_logs(
+    log_entries: List[GovernanceLog],
+    evaluator_model: str = "gemini-2.5-pro",
+    deadline: Optional[Deadline] = None
+) -> List[GovernanceLog]:
+    """
+    Batched second phase: grades every response to the same query in a single judge
+    call (see EvaluatorService.evaluate_batch_async) and updates each telemetry row.
+    """
+    if not log_entries:
+        return []
+
+    # One shared judge call, so every entry reports the same evaluation time
+    timer = PhaseTimer()
+    with timer.phase("evaluation"):
+        verdicts = await _judge_within(deadline or Deadline(MODEL_TIMEOUT), lambda timeout: evaluator_service.evaluate_batch_async(
+            log_entries[0].input_prompt,
+            [log_entry.response_text for log_entry in log_entries],
+            model_id=evaluator_model,
+            timeout=timeout
+        ), count=len(log_entries))
+
+    await asyncio.gather(*(
+        _apply_verdict(log_entry, verdict, evaluator_model, timer.get("evaluation"))
+        for log_entry, verdict in zip(log_entries, verdicts)
+    ))
+    return log_entries
+
+async def _apply_verdict(log_entry: GovernanceLog, accuracy_data: Dict[str, Any], evaluator_model: str, evaluation_ms: Optional[float]) -> None:
+    log_entry.accuracy = _build_accuracy(accuracy_data, evaluator_model)
+    log_entry.timings.evaluation_ms = evaluation_ms
+    await write_behind.update_accuracy(log_entry.trace_id, log_entry.accuracy.model_dump(), evaluation_ms)
+
 async def analyze_governance_batch(
-    query: str, 
-    configs: List[ModelConfig], 
+    query: str,
+    configs: List[ModelConfig],
     evaluator_model: str = "gemini-2.5-pro",
-    governance_context: str = "aws"
+    governance_context: str = "aws",
+    batch_evaluation: bool = False,
+    bypass_cache: bool = False,
+    timer: Optional[PhaseTimer] = None
 ) -> List[GovernanceLog]:
-    loop = asyncio.get_running_loop()
-    
-    # 1. Create conversation first
-    conv = db_service.create_conversation(title=query[:100])
-    db_service.add_message(conv.id, "user", query)
-    
-    # Per-model timeout: 90 seconds (allows slower models to complete)
-    MODEL_TIMEOUT = 90.0
-    
-    tasks = []
-    with ThreadPoolExecutor(max_workers=max(len(configs), 1) + 2) as executor:
-        futures = [
-            loop.run_in_executor(
-                executor, 
-                analyze_governance, 
-                query, 
-                config.host_platform, 
-                config.model_id,
-                conv.id,
-                evaluator_model,
-                governance_context
-            )
-            for config in configs
-        ]
-        
-        # Wrap each future with a timeout
-        timeout_futures = [
-            asyncio.wait_for(future, timeout=MODEL_TIMEOUT)
-            for future in futures
-        ]
-        
-        # Use return_exceptions=True to prevent one failure from killing the batch
-        raw_results = await asyncio.gather(*timeout_futures, return_exceptions=True)
-        
-        results = []
-        for i, res in enumerate(raw_results):
-            if isinstance(res, asyncio.TimeoutError):
-                print(f"Timeout for model {configs[i].model_id} after {MODEL_TIMEOUT}s")
-                # Create a failed log entry for timeout
-                timeout_log = GovernanceLog(
-                    id=str(uuid.uuid4()),
-                    trace_id=str(uuid.uuid4()),
-                    provider=ModelProvider.OTHER,
-                    model_id=configs[i].model_id,
-                    started_at=datetime.utcnow(),
-                    ended_at=datetime.utcnow(),
-                    usage=UsageMetrics(input_tokens=0, output_tokens=0, total_tokens=0, latency_ms=MODEL_TIMEOUT * 1000),
-                    cost=CostMetrics(input_cost=0, output_cost=0, total_cost=0),
-                    accuracy=AccuracyMetrics(score=0, rationale="Model timed out", evaluator_model=evaluator_model),
-                    status=InvocationStatus.FAILED,
-                    success=False,
-                    error_message=f"Model execution exceeded {MODEL_TIMEOUT}s timeout",
-                    tags={"environment": "dev", "governance_context": governance_context},
-                    input_prompt=query,
-                    response_text=""
-                )
-                results.append(timeout_log)
-            elif isinstance(res, Exception):
-                # This handles cases where analyze_governance itself crashed before its internal try-except
-                print(f"Batch Error for model {configs[i].model_id}: {res}")
-                # Create a failed log entry
-                error_log = GovernanceLog(
-                    id=str(uuid.uuid4()),
-                    trace_id=str(uuid.uuid4()),
-                    provider=ModelProvider.OTHER,
-                    model_id=configs[i].model_id,
-                    started_at=datetime.utcnow(),
-                    ended_at=datetime.utcnow(),
-                    usage=UsageMetrics(input_tokens=0, output_tokens=0, total_tokens=0, latency_ms=0),
-                    cost=CostMetrics(input_cost=0, output_cost=0, total_cost=0),
-                    accuracy=AccuracyMetrics(score=0, rationale="Model execution failed", evaluator_model=evaluator_model),
-                    status=InvocationStatus.FAILED,
-                    success=False,
-                    error_message=str(res),
-                    tags={"environment": "dev", "governance_context": governance_context},
-                    input_prompt=query,
-                    response_text=""
-                )
-                results.append(error_log)
-            else:
-                results.append(res)
-        
+    """
+    Runs every model concurrently. With batch_evaluation the responses are then
+    graded together in one judge call instead of one judge call per model.
+    """
+    deadline = Deadline(REQUEST_DEADLINE)
+
+    # 1. Create conversation first (its write time is shared by every model's timings)
+    timer = timer.copy() if timer else PhaseTimer()
+    with timer.phase("db_setup"):
+        conversation_id = await write_behind.add_conversation(query[:100], query)
+
+    # One coroutine per model; each enforces the shared deadline itself
+    coros = [
+        analyze_governance(
+            query,
+            config.host_platform,
+            config.model_id,
+            conversation_id,
+            evaluator_model,
+            governance_context,
+            evaluate=not batch_evaluation,
+            bypass_cache=bypass_cache,
+            deadline=deadline,
+            timer=timer
+        )
+        for config in configs
+    ]
+
+    # Use return_exceptions=True to prevent one failure from killing the batch
+    raw_results = await asyncio.gather(*coros, return_exceptions=True)
+
+    results = [
+        _settle_result(res, configs[i], query, evaluator_model, governance_context)
+        for i, res in enumerate(raw_results)
+    ]
+
+    if batch_evaluation:
+        await evaluate_logs([r for r in results if r.success], evaluator_model, deadline)
+
     return results
 
 
 async def analyze_governance_stream(
-    query: str, 
-    configs: List[ModelConfig], 
+    query: str,
+    configs: List[ModelConfig],
     evaluator_model: str = "gemini-2.5-pro",
-    governance_context: str = "aws"
+    governance_context: str = "aws",
+    batch_evaluation: bool = False,
+    bypass_cache: bool = False,
+    stream_tokens: bool = True,
+    timer: Optional[PhaseTimer] = None
 ):
     """
     Stream results as each model completes (async generator for SSE).
-    Yields GovernanceLog objects as they become available.
+    Two-phase: yields ("result", log) as soon as a model responds, with accuracy
+    pending, then ("evaluation", log) for the same trace_id once the judge finishes.
+    With batch_evaluation the judge runs once, after the last model has responded.
+    With stream_tokens, ("delta", {"model_id", "text"}) events carry each model's
+    text while it is generated; all of a model's deltas precede its result.
     """
-    loop = asyncio.get_running_loop()
-    
-    # 1. Create conversation first
-    conv = db_service.create_conversation(title=query[:100])
-    db_service.add_message(conv.id, "user", query)
-    
-    # Per-model timeout: 90 seconds
-    MODEL_TIMEOUT = 90.0
-    
-    with ThreadPoolExecutor(max_workers=max(len(configs), 1) + 2) as executor:
-        # Create all futures with timeout
-        tasks = []
-        config_map = {}
-        
-        for config in configs:
-            future = loop.run_in_executor(
-                executor, 
-                analyze_governance, 
-                query, 
-                config.host_platform, 
-                config.model_id,
-                conv.id,
-                evaluator_model,
-                governance_context
-            )
-            # Create a task with timeout
-            task = asyncio.create_task(asyncio.wait_for(future, timeout=MODEL_TIMEOUT))
-            tasks.append(task)
-            config_map[task] = config
-        
-        # Yield results as they complete
-        pending = set(tasks)
-        
+    deadline = Deadline(REQUEST_DEADLINE)
+    deltas: asyncio.Queue = asyncio.Queue()
+
+    # 1. Create conversation first (its write time is shared by every model's timings)
+    timer = timer.copy() if timer else PhaseTimer()
+    with timer.phase("db_setup"):
+        conversation_id = await write_behind.add_conversation(query[:100], query)
+
+    # Model tasks map to their config, evaluation tasks to the logs they score
+    model_tasks = {}
+    evaluation_tasks = {}
+    awaiting_judge = []
+
+    for config in configs:
+        task = asyncio.create_task(analyze_governance(
+            query,
+            config.host_platform,
+            config.model_id,
+            conversation_id,
+            evaluator_model,
+            governance_context,
+            evaluate=False,
+            bypass_cache=bypass_cache,
+            deadline=deadline,
+            on_delta=(lambda text, model_id=config.model_id: deltas.put_nowait((model_id, text))) if stream_tokens else None,
+            timer=timer
+        ))
+        model_tasks[task] = config
+
+    # Yield events as tasks complete
+    pending = set(model_tasks)
+    next_delta = None
+
+    try:
         while pending:
-            # Wait for the next task to complete
-            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-            
+            # Wait for the next task to complete, or for new text from any model
+            if next_delta is None:
+                next_delta = asyncio.ensure_future(deltas.get())
+            done, pending = await asyncio.wait(pending | {next_delta}, return_when=asyncio.FIRST_COMPLETED)
+            pending.discard(next_delta)
+
+            if next_delta in done:
+                done.discard(next_delta)
+                model_id, text = next_delta.result()
+                next_delta = None
+                yield "delta", {"model_id": model_id, "text": text}
+            # Deltas are queued synchronously, so draining here keeps them ahead of the result
+            while not deltas.empty():
+                model_id, text = deltas.get_nowait()
+                yield "delta", {"model_id": model_id, "text": text}
+
             for task in done:
-                config = config_map[task]
+                if task in evaluation_tasks:
+                    evaluation_tasks.pop(task)
+                    # Never raises: a failed judge call comes back with a terminal verdict
+                    for log_entry in task.result():
+                        yield "evaluation", log_entry
+                    continue
+
+                config = model_tasks.pop(task)
                 try:
-                    result = await task
-                    yield result
-                except asyncio.TimeoutError:
-                    print(f"Timeout for model {config.model_id} after {MODEL_TIMEOUT}s")
-                    timeout_log = GovernanceLog(
-                        id=str(uuid.uuid4()),
-                        trace_id=str(uuid.uuid4()),
-                        provider=ModelProvider.OTHER,
-                        model_id=config.model_id,
-                        started_at=datetime.utcnow(),
-                        ended_at=datetime.utcnow(),
-                        usage=UsageMetrics(input_tokens=0, output_tokens=0, total_tokens=0, latency_ms=MODEL_TIMEOUT * 1000),
-                        cost=CostMetrics(input_cost=0, output_cost=0, total_cost=0),
-                        accuracy=AccuracyMetrics(score=0, rationale="Model timed out", evaluator_model=evaluator_model),
-                        status=InvocationStatus.FAILED,
-                        success=False,
-                        error_message=f"Model execution exceeded {MODEL_TIMEOUT}s timeout",
-                        tags={"environment": "dev", "governance_context": governance_context},
-                        input_prompt=query,
-                        response_text=""
-                    )
-                    yield timeout_log
+                    res = task.result()
                 except Exception as e:
-                    print(f"Stream Error for model {config.model_id}: {e}")
-                    error_log = GovernanceLog(
-                        id=str(uuid.uuid4()),
-                        trace_id=str(uuid.uuid4()),
-                        provider=ModelProvider.OTHER,
-                        model_id=config.model_id,
-                        started_at=datetime.utcnow(),
-                        ended_at=datetime.utcnow(),
-                        usage=UsageMetrics(input_tokens=0, output_tokens=0, total_tokens=0, latency_ms=0),
-                        cost=CostMetrics(input_cost=0, output_cost=0, total_cost=0),
-                        accuracy=AccuracyMetrics(score=0, rationale="Model execution failed", evaluator_model=evaluator_model),
-                        status=InvocationStatus.FAILED,
-                        success=False,
-                        error_message=str(e),
-                        tags={"environment": "dev", "governance_context": governance_context},
-                        input_prompt=query,
-                        response_text=""
-                    )
-                    yield error_log
+                    res = e
+                log_entry = _settle_result(res, config, query, evaluator_model, governance_context)
+                # Queued before the yield: a client leaving right after it still gets the row judged
+                if log_entry.success:
+                    awaiting_judge.append(log_entry)
+                yield "result", log_entry
+
+                # Per-response judging starts right away; batched judging once every model is in
+                if awaiting_judge and (not batch_evaluation or not model_tasks):
+                    batch, awaiting_judge = awaiting_judge, []
+                    eval_task = asyncio.create_task(_evaluate_or_fail(batch, evaluator_model, deadline, batch_evaluation))
+                    evaluation_tasks[eval_task] = batch
+                    pending.add(eval_task)
+    finally:
+        # Client went away mid-stream: stop the remaining model calls. Their responses are
+        # already persisted as pending, so judging carries on detached from the stream.
+        for task in pending:
+            if task not in evaluation_tasks:
+                task.cancel()
+        if awaiting_judge:
+            evaluation_tasks[asyncio.create_task(_evaluate_or_fail(awaiting_judge, evaluator_model, deadline, batch_evaluation))] = awaiting_judge
+        for task in evaluation_tasks:
+            _detached_evaluations.add(task)
+            task.add_done_callback(_detached_evaluations.discard)
+        if next_delta is not None:
+            next_delta.cancel()
+
+async def _evaluate_or_fail(
+    log_entries: List[GovernanceLog],
+    evaluator_model: str,
+    deadline: Deadline,
+    batched: bool
+) -> List[GovernanceLog]:
+    """
+    Scores log_entries (in one judge call if batched). If the judge call itself raises,
+    each entry gets a terminal "Evaluation failed" verdict instead, so no persisted row
+    is left pending.
+    """
+    try:
+        if batched:
+            return await evaluate_logs(log_entries, evaluator_model, deadline)
+        return [await evaluate_log(log_entry, evaluator_model, deadline) for log_entry in log_entries]
+    except Exception as e:
+        print(f"Stream Evaluation Error for {[log_entry.model_id for log_entry in log_entries]}: {e}")
+        verdict = {"score": 0, "rationale": f"Evaluation failed: {e}"}
+        await asyncio.gather(*(_apply_verdict(log_entry, verdict, evaluator_model, None) for log_entry in log_entries))
+        return log_entries
@@ -0,0 +1,74 @@
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+# Session.info flag set by transactions that changed the telemetry rollups
+_DIRTY = "analytics_dirty"
+
+class AnalyticsCache:
+    """
+    Results of the /analytics endpoints keyed by endpoint, query params and write
+    generation. Every commit that changes the telemetry rollups bumps the generation,
+    so an entry is only served while no telemetry has been written since it was
+    computed. Writes committed by another process (e.g. a standalone worker) do not
+    bump this process's generation; max_staleness bounds how long those go unseen.
+    """
+
+    def __init__(self, max_entries: int, max_staleness: float):
+        # Entries from older generations are never looked up again and age out of the LRU
+        self.entries = TTLCache(max_entries, max_staleness)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self) -> None:
+        with self._lock:
+            self._generation += 1
+
+    def mark(self, session: Any) -> None:
+        """Bump the generation once session's current transaction commits (sync or async session)."""
+        session.info[_DIRTY] = True
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        # Read before computing: a write landing mid-query files the result under the
+        # old generation, where it is never served
+        generation = self._generation
+        result = self.entries.get((key, generation))
+        if result is None:
+            result = await compute()
+            self.entries.put((key, generation), result)
+        return result
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.entries.stats(), "generation": self._generation}
+
+analytics_cache = AnalyticsCache(settings.ANALYTICS_CACHE_MAX_ENTRIES, settings.ANALYTICS_CACHE_MAX_STALENESS_SECONDS)
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY, False):
+        analytics_cache.bump()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY, None)
+
+def cached(endpoint: Callable) -> Callable:
+    """Serves an analytics endpoint from analytics_cache, keyed by its query params."""
+    @functools.wraps(endpoint)
+    async def wrapper(session, **params):
+        if not settings.ANALYTICS_CACHE_ENABLED:
+            return await endpoint(session=session, **params)
+        key = (endpoint.__name__, tuple(sorted(params.items())))
+        return await analytics_cache.get_or_compute(key, lambda: endpoint(session=session, **params))
+    return wrapper
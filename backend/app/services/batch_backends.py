@@ -0,0 +1,235 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.executor import invocation_executor
+from app.services.llm_providers.bedrock import BedrockService
+from app.services.llm_providers.openai_provider import OpenAIProvider
+from app.services.model_catalog import model_catalog
+
+# Provider batch states collapse to these three
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_FAILED = "failed"
+
+# (record_id, prompt) pairs; record ids come back with each result
+BatchRecords = List[Tuple[str, str]]
+
+class BatchBackend:
+    """
+    A provider's batch inference API for one model at a time: build a JSONL payload,
+    submit it, poll until the provider finishes, then fetch per-record results.
+
+    results() returns dicts shaped like the on-demand providers' output
+    (response_text, input_tokens, output_tokens) plus record_id, and error for
+    records the provider could not answer.
+    """
+    name = "base"
+
+    def build_payload(self, model_id: str, records: BatchRecords) -> str:
+        raise NotImplementedError
+
+    async def submit(self, job_name: str, model_id: str, payload: str) -> str:
+        """Returns the provider's id for the submitted batch."""
+        raise NotImplementedError
+
+    async def poll(self, external_id: str) -> str:
+        raise NotImplementedError
+
+    async def results(self, external_id: str, model_id: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+def _jsonl(lines: List[Dict[str, Any]]) -> str:
+    return "\n".join(json.dumps(line) for line in lines) + "\n"
+
+class LocalBatchBackend(BatchBackend):
+    """
+    In-process stand-in for tests and local development: "submitting" stores the
+    payload, the batch finishes after `polls` polls, and each record is answered by
+    `responder(model_id, prompt)`, which returns a provider-style result dict.
+    """
+    name = "local"
+
+    def __init__(self, responder: Optional[Callable[[str, str], Awaitable[Dict[str, Any]]]] = None, polls: int = 1):
+        self.responder = responder or self._echo
+        self.polls = polls
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def _echo(self, model_id: str, prompt: str) -> Dict[str, Any]:
+        return {"response_text": f"[{model_id}] {prompt}", "input_tokens": len(prompt) // 4, "output_tokens": len(prompt) // 4}
+
+    def build_payload(self, model_id: str, records: BatchRecords) -> str:
+        return _jsonl([{"recordId": record_id, "prompt": prompt} for record_id, prompt in records])
+
+    async def submit(self, job_name: str, model_id: str, payload: str) -> str:
+        self._jobs[job_name] = {"model_id": model_id, "payload": payload, "polls": 0}
+        return job_name
+
+    async def poll(self, external_id: str) -> str:
+        job = self._jobs.get(external_id)
+        if job is None:
+            return BATCH_FAILED
+        job["polls"] += 1
+        return BATCH_COMPLETED if job["polls"] >= self.polls else BATCH_RUNNING
+
+    async def results(self, external_id: str, model_id: str) -> List[Dict[str, Any]]:
+        job = self._jobs.pop(external_id)
+        outputs = []
+        for line in job["payload"].splitlines():
+            record = json.loads(line)
+            try:
+                result = await self.responder(job["model_id"], record["prompt"])
+                outputs.append({"record_id": record["recordId"], **result})
+            except Exception as e:
+                outputs.append({"record_id": record["recordId"], "error": str(e)})
+        return outputs
+
+class BedrockBatchBackend(BatchBackend):
+    """
+    Bedrock batch inference (CreateModelInvocationJob). Input and output go through
+    S3 under BEDROCK_BATCH_S3_URI, and Bedrock assumes BEDROCK_BATCH_ROLE_ARN to
+    read and write them. Bedrock enforces a minimum number of records per job, so
+    small query sets are rejected at submission.
+    """
+    name = "bedrock"
+
+    _STATES = {"Completed": BATCH_COMPLETED, "PartiallyCompleted": BATCH_COMPLETED, "Failed": BATCH_FAILED, "Stopped": BATCH_FAILED, "Expired": BATCH_FAILED}
+
+    def __init__(self, service: BedrockService, s3_uri: Optional[str] = None, role_arn: Optional[str] = None):
+        self.service = service
+        self.s3_uri = (s3_uri or settings.BEDROCK_BATCH_S3_URI or "").rstrip("/")
+        self.role_arn = role_arn or settings.BEDROCK_BATCH_ROLE_ARN
+        self._control = None
+        self._s3 = None
+        self._outputs: Dict[str, str] = {}
+
+    def _clients(self):
+        if not self.s3_uri or not self.role_arn:
+            raise ValueError("Bedrock batch inference needs BEDROCK_BATCH_S3_URI and BEDROCK_BATCH_ROLE_ARN")
+        if self._control is None:
+            self._control = self.service.session.client("bedrock")
+            self._s3 = self.service.session.client("s3")
+        return self._control, self._s3
+
+    def build_payload(self, model_id: str, records: BatchRecords) -> str:
+        adapter = model_catalog.resolve(model_id).adapter
+        if adapter == "claude":
+            body = self.service._claude_body
+        elif adapter == "llama":
+            body = self.service._llama_body
+        else:
+            raise ValueError(f"Unsupported Bedrock model: {model_id}")
+        return _jsonl([{"recordId": record_id, "modelInput": json.loads(body(prompt))} for record_id, prompt in records])
+
+    async def submit(self, job_name: str, model_id: str, payload: str) -> str:
+        control, s3 = self._clients()
+        bucket, prefix = _split_s3(f"{self.s3_uri}/{job_name}")
+        await invocation_executor.run(s3.put_object, Bucket=bucket, Key=f"{prefix}/input.jsonl", Body=payload.encode())
+        response = await invocation_executor.run(
+            control.create_model_invocation_job,
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{bucket}/{prefix}/input.jsonl"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{prefix}/output/"}}
+        )
+        return response["jobArn"]
+
+    async def poll(self, external_id: str) -> str:
+        control, _ = self._clients()
+        job = await invocation_executor.run(control.get_model_invocation_job, jobIdentifier=external_id)
+        # Output lands under <output uri>/<job id>/<input file name>.out
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"].rstrip("/")
+        self._outputs[external_id] = f"{output_uri}/{external_id.rsplit('/', 1)[-1]}/input.jsonl.out"
+        return self._STATES.get(job["status"], BATCH_RUNNING)
+
+    async def results(self, external_id: str, model_id: str) -> List[Dict[str, Any]]:
+        _, s3 = self._clients()
+        if external_id not in self._outputs:
+            await self.poll(external_id)
+        bucket, key = _split_s3(self._outputs.pop(external_id))
+        response = await invocation_executor.run(s3.get_object, Bucket=bucket, Key=key)
+        body = await invocation_executor.run(response["Body"].read)
+        parse = self.service._parse_llama if model_catalog.resolve(model_id).adapter == "llama" else self.service._parse_claude
+
+        outputs = []
+        for line in body.decode().splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "modelOutput" not in record:
+                error = record.get("error", {})
+                outputs.append({"record_id": record["recordId"], "error": error.get("errorMessage", str(error)) if isinstance(error, dict) else str(error)})
+                continue
+            outputs.append({"record_id": record["recordId"], **parse(record["modelOutput"], "")})
+        return outputs
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: a JSONL file of /v1/chat/completions requests, 24h completion window."""
+    name = "openai"
+
+    _STATES = {"completed": BATCH_COMPLETED, "failed": BATCH_FAILED, "expired": BATCH_FAILED, "cancelled": BATCH_FAILED, "cancelling": BATCH_FAILED}
+
+    def __init__(self, provider: OpenAIProvider):
+        self.provider = provider
+
+    def _client(self):
+        if not self.provider.async_client:
+            raise ValueError("OpenAI Client not initialized (Missing Key)")
+        return self.provider.async_client
+
+    def build_payload(self, model_id: str, records: BatchRecords) -> str:
+        return _jsonl([
+            {
+                "custom_id": record_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": model_id, "messages": [{"role": "user", "content": prompt}], "temperature": 0.7}
+            }
+            for record_id, prompt in records
+        ])
+
+    async def submit(self, job_name: str, model_id: str, payload: str) -> str:
+        client = self._client()
+        upload = await client.files.create(file=(f"{job_name}.jsonl", payload.encode()), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"job": job_name}
+        )
+        return batch.id
+
+    async def poll(self, external_id: str) -> str:
+        batch = await self._client().batches.retrieve(external_id)
+        return self._STATES.get(batch.status, BATCH_RUNNING)
+
+    async def results(self, external_id: str, model_id: str) -> List[Dict[str, Any]]:
+        client = self._client()
+        batch = await client.batches.retrieve(external_id)
+        outputs = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    outputs.append(self._parse_line(json.loads(line)))
+        return outputs
+
+    def _parse_line(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or response.get("body", {}).get("error") or {}
+            return {"record_id": line["custom_id"], "error": error.get("message", str(error)) if isinstance(error, dict) else str(error)}
+        body = response["body"]
+        usage = body.get("usage") or {}
+        return {
+            "record_id": line["custom_id"],
+            "response_text": body["choices"][0]["message"]["content"] or "",
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0)
+        }
+
+def _split_s3(uri: str) -> Tuple[str, str]:
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.executor import invocation_executor
+from app.models.batch_job import BatchJob, BatchJobPart
+from app.schemas.governance import (
+    GovernanceLog,
+    UsageMetrics,
+    InvocationStatus,
+    CostMetrics,
+    AccuracyMetrics
+)
+from app.schemas.requests import ModelConfig
+from app.services import ai_engine
+from app.services.batch_backends import (
+    BATCH_COMPLETED,
+    BATCH_FAILED,
+    BATCH_RUNNING,
+    BatchBackend,
+    BedrockBatchBackend,
+    LocalBatchBackend,
+    OpenAIBatchBackend
+)
+from app.services.db_service import db_service
+from app.services.pricing_service import pricing_service
+from app.utils.common import content_hash, normalize_query
+
+def default_backends() -> Dict[str, BatchBackend]:
+    """Batch backends keyed by ModelProvider value; providers without one cannot run batch jobs."""
+    if settings.BATCH_BACKEND == "local":
+        local = LocalBatchBackend()
+        return {"aws": local, "openai": local, "google": local}
+    # Vertex batch prediction needs a GCS/BigQuery staging setup that is not configured here
+    return {
+        "aws": BedrockBatchBackend(ai_engine.bedrock_service),
+        "openai": OpenAIBatchBackend(ai_engine.openai_service),
+    }
+
+class BatchJobRunner:
+    """
+    Runs offline model comparisons through provider batch inference: each model gets
+    one provider-side batch holding every query, priced at the batch tier.
+
+    Job and part state live in the database, so polling survives a restart (see
+    resume()); the poller itself is a background task that only wakes up every
+    poll_interval seconds, so no web worker is held while the provider works.
+    Every web process resumes every running job, but each part is only advanced
+    under a lease (claim_batch_part), and a finished part's records, state and job
+    counters are stored in one transaction that skips records already ingested.
+    """
+
+    def __init__(
+        self,
+        backends: Optional[Dict[str, BatchBackend]] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+        owner: Optional[str] = None
+    ):
+        self._backends = backends
+        self.poll_interval = poll_interval if poll_interval is not None else settings.BATCH_POLL_INTERVAL_SECONDS
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.BATCH_LEASE_SECONDS
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def backends(self) -> Dict[str, BatchBackend]:
+        # Built on first use so importing this module never touches provider clients
+        if self._backends is None:
+            self._backends = default_backends()
+        return self._backends
+
+    def _backend_for(self, host_platform: str) -> Optional[BatchBackend]:
+        return self.backends.get(ai_engine._resolve_provider(host_platform).value)
+
+    async def submit(
+        self,
+        queries: List[str],
+        configs: List[ModelConfig],
+        governance_context: str = "aws",
+        evaluator_model: Optional[str] = None
+    ) -> BatchJob:
+        conversation_ids = await invocation_executor.run(db_service.create_query_conversations, queries)
+        job = BatchJob(
+            governance_context=governance_context,
+            evaluator_model=evaluator_model,
+            queries=json.dumps(queries),
+            conversation_ids=json.dumps(conversation_ids),
+            total_records=len(queries) * len(configs)
+        )
+        records = [(f"q{i}", query) for i, query in enumerate(queries)]
+
+        parts = []
+        for n, config in enumerate(configs):
+            backend = self._backend_for(config.host_platform)
+            part = BatchJobPart(
+                job_id=job.id,
+                host_platform=config.host_platform,
+                model_id=config.model_id,
+                backend=backend.name if backend else "none"
+            )
+            try:
+                if backend is None:
+                    raise ValueError(f"No batch inference backend for {config.host_platform}")
+                payload = backend.build_payload(config.model_id, records)
+                part.external_id = await backend.submit(f"gov-{job.id[:8]}-{n}", config.model_id, payload)
+            except Exception as e:
+                print(f"Batch submission failed for {config.model_id}: {e}")
+                part.status = BATCH_FAILED
+                part.error = str(e)
+                part.completed_at = datetime.utcnow()
+                job.failed_records += len(queries)
+            parts.append(part)
+
+        if all(part.status == BATCH_FAILED for part in parts):
+            job.status = BATCH_FAILED
+            job.completed_at = datetime.utcnow()
+        job = await invocation_executor.run(db_service.create_batch_job, job, parts)
+        if job.status == BATCH_RUNNING:
+            self.start(job.id)
+        return job
+
+    def start(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def resume(self) -> None:
+        """Restarts polling for jobs left running by a previous process."""
+        for job_id in await invocation_executor.run(db_service.running_batch_job_ids):
+            self.start(job_id)
+
+    def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def _run(self, job_id: str) -> None:
+        try:
+            while True:
+                found = await invocation_executor.run(db_service.get_batch_job, job_id)
+                if found is None:
+                    return
+                job, parts = found
+                if job.status != BATCH_RUNNING:
+                    # Finished by another process
+                    return
+                for part in parts:
+                    if part.status == BATCH_RUNNING:
+                        await self._advance(job, part)
+                if all(part.status != BATCH_RUNNING for part in parts):
+                    status = BATCH_COMPLETED if any(part.status == BATCH_COMPLETED for part in parts) else BATCH_FAILED
+                    if await invocation_executor.run(db_service.finish_batch_job, job_id, status):
+                        print(f"Batch job {job_id} {status}")
+                    return
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Left as running in the database; resume() picks it up again
+            print(f"Batch job {job_id} poller error: {e}")
+        finally:
+            self._tasks.pop(job_id, None)
+
+    async def _advance(self, job: BatchJob, part: BatchJobPart) -> None:
+        """Polls one part; once the provider is done, ingests its results."""
+        if not await invocation_executor.run(db_service.claim_batch_part, part.id, self.owner, self.lease_seconds):
+            # Another process holds the lease and polls this part
+            return
+        backend = self._backend_for(part.host_platform)
+        total = len(json.loads(job.queries))
+        state = results = None
+        if backend is not None:
+            try:
+                state = await backend.poll(part.external_id)
+                if state == BATCH_COMPLETED:
+                    results = await backend.results(part.external_id, part.model_id)
+            except Exception as e:
+                # Network blip, throttling, provider 5xx: the provider batch itself is unaffected,
+                # so the part stays running and is polled again (here or, once the lease lapses, elsewhere)
+                print(f"Batch part {part.model_id} of job {job.id} poll error, retrying: {e}")
+                return
+        if state == BATCH_RUNNING:
+            return
+        try:
+            if backend is None:
+                raise ValueError(f"No batch inference backend for {part.host_platform}")
+            if state == BATCH_FAILED:
+                raise RuntimeError(f"Provider reported batch {part.external_id} as failed")
+            records = self._records(job, part, results)
+            part.status = BATCH_COMPLETED
+        except Exception as e:
+            print(f"Batch part {part.model_id} of job {job.id} failed: {e}")
+            part.status = BATCH_FAILED
+            part.error = str(e)
+            records = []
+        part.completed_at = datetime.utcnow()
+
+        completed = sum(1 for _, _, log_entry in records if log_entry.success)
+        written = await invocation_executor.run(
+            db_service.finish_batch_part, part, self.owner, completed, total - completed,
+            [(conversation_id, record_id, log_entry.model_dump()) for conversation_id, record_id, log_entry in records]
+        )
+        if written is None:
+            print(f"Batch part {part.model_id} of job {job.id} lost its lease; left to its new owner")
+            part.status = BATCH_RUNNING
+            return
+
+        # Only rows stored by this call are scored, so a re-ingested part never pays the judge twice
+        written = set(written)
+        unscored = [log_entry for _, record_id, log_entry in records if record_id in written and log_entry.success]
+        if job.evaluator_model and unscored:
+            await asyncio.gather(*(ai_engine.evaluate_log(log_entry, job.evaluator_model) for log_entry in unscored))
+
+    def _records(self, job: BatchJob, part: BatchJobPart, results: List[Dict[str, Any]]) -> List[Tuple[str, str, GovernanceLog]]:
+        """(conversation_id, record_id, telemetry entry) for each record the provider answered."""
+        queries = json.loads(job.queries)
+        conversation_ids = json.loads(job.conversation_ids)
+        records = []
+        for result in results:
+            record_id = result["record_id"]
+            index = int(record_id[1:])
+            records.append((conversation_ids[index], record_id, _batch_log(job, part, record_id, queries[index], result)))
+        return records
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        found = db_service.get_batch_job(job_id)
+        if found is None:
+            return None
+        job, parts = found
+        return {
+            "id": job.id,
+            "status": job.status,
+            "total_records": job.total_records,
+            "completed_records": job.completed_records,
+            "failed_records": job.failed_records,
+            "created_at": job.created_at,
+            "completed_at": job.completed_at,
+            "parts": [part.model_dump(exclude={"job_id"}) for part in parts],
+        }
+
+def _batch_log(job: BatchJob, part: BatchJobPart, record_id: str, query: str, result: Dict[str, Any]) -> GovernanceLog:
+    success = "error" not in result
+    input_tokens = result.get("input_tokens", 0) if success else 0
+    output_tokens = result.get("output_tokens", 0) if success else 0
+    response_text = result.get("response_text", "") if success else ""
+
+    cost_data = pricing_service.calculate_cost(
+        provider=part.host_platform,
+        model_name=part.model_id,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        batch=True
+    )
+    if success and job.evaluator_model:
+        rationale = ai_engine.PENDING_EVALUATION
+    else:
+        rationale = ai_engine.NOT_EVALUATED if success else "Model execution failed"
+
+    now = datetime.utcnow()
+    return GovernanceLog(
+        id=str(uuid.uuid4()),
+        trace_id=str(uuid.uuid4()),
+        provider=ai_engine._resolve_provider(part.host_platform),
+        model_id=part.model_id,
+        started_at=part.submitted_at,
+        ended_at=now,
+        # A batch has no per-call latency; only the provider's turnaround for the whole job
+        usage=UsageMetrics(input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens),
+        cost=CostMetrics(
+            input_cost=cost_data["input_cost"],
+            output_cost=cost_data["output_cost"],
+            total_cost=cost_data["total_cost"],
+            pricing_version=cost_data["pricing_version"]
+        ),
+        accuracy=AccuracyMetrics(score=0, rationale=rationale, evaluator_model=job.evaluator_model),
+        status=InvocationStatus.COMPLETED if success else InvocationStatus.FAILED,
+        success=success,
+        error_message=None if success else result["error"],
+        tags={"environment": "dev", "governance_context": job.governance_context, "batch_job_id": job.id},
+        input_prompt=query,
+        response_text=response_text,
+        input_hash=content_hash(normalize_query(query)),
+        output_hash=content_hash(response_text) if success else None,
+        attempts=1,
+        batch_job_id=job.id,
+        batch_record_id=record_id
+    )
+
+batch_job_runner = BatchJobRunner()
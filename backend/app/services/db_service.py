@@ -1,14 +1,88 @@
+from sqlalchemy import or_, update
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.telemetry import GovernanceTelemetry
-from app.core.db import engine
-from typing import Optional
+from app.models.batch_job import BatchJob, BatchJobPart
+from app.core.db import async_engine, engine
+from app.services import rollups
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence, Tuple
+import threading
+import time
 import uuid
 
+# SQLite admits one writer at a time. The sync writers run concurrently on executor
+# threads, so they take turns here instead of racing on a shared connection (or
+# waiting out busy_timeout); other databases write concurrently.
+_sqlite_write_lock = threading.Lock()
+
+@contextmanager
+def write_session() -> Iterator[Session]:
+    """Session for a sync write transaction, serialized per process on SQLite."""
+    if engine.dialect.name != "sqlite":
+        with Session(engine) as session:
+            yield session
+        return
+    with _sqlite_write_lock, Session(engine) as session:
+        yield session
+
+def telemetry_from_log(message_id: str, log_data: dict) -> GovernanceTelemetry:
+    """Builds the GovernanceTelemetry row for a GovernanceLog (as .model_dump())."""
+    usage = log_data.get("usage", {})
+    cost = log_data.get("cost", {})
+    accuracy = log_data.get("accuracy", {})
+    timings = log_data.get("timings") or {}
+
+    return GovernanceTelemetry(
+        message_id=message_id,
+        trace_id=log_data.get("trace_id"),
+        governance_context=log_data.get("tags", {}).get("governance_context", "unknown"),
+        host_platform=str(log_data.get("provider")),
+        model_id=log_data.get("model_id"),
+        latency_ms=usage.get("latency_ms", 0.0),
+        time_to_first_token_ms=usage.get("time_to_first_token_ms"),
+        input_tokens=usage.get("input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cache_read_tokens=usage.get("cache_read_tokens", 0),
+        cache_write_tokens=usage.get("cache_write_tokens", 0),
+        total_cost=cost.get("total_cost", 0.0),
+        hedge_cost=cost.get("hedge_cost", 0.0),
+        pricing_version=cost.get("pricing_version"),
+        cache_hit=log_data.get("cache_hit", False),
+        coalesced=log_data.get("coalesced", False),
+        attempts=log_data.get("attempts", 0),
+        batch_job_id=log_data.get("batch_job_id"),
+        batch_record_id=log_data.get("batch_record_id"),
+        job_cell_id=log_data.get("job_cell_id"),
+        accuracy_score=accuracy.get("score", 0.0) if accuracy else 0.0,
+        scored=accuracy.get("scored", False) if accuracy else False,
+        accuracy_rationale=accuracy.get("rationale") if accuracy else None,
+        query_category=accuracy.get("query_category") if accuracy else None,
+        prompt_optimization=accuracy.get("prompt_optimization") if accuracy else None,
+        evaluator_cost=accuracy.get("evaluator_cost", 0.0) if accuracy else 0.0,
+        db_setup_ms=timings.get("db_setup_ms"),
+        guardrail_ms=timings.get("guardrail_ms"),
+        provider_call_ms=timings.get("provider_call_ms"),
+        evaluation_ms=timings.get("evaluation_ms"),
+        persistence_ms=timings.get("persistence_ms"),
+    )
+
+def apply_accuracy(telemetry: GovernanceTelemetry, accuracy: dict, evaluation_ms: Optional[float] = None) -> None:
+    telemetry.accuracy_score = accuracy.get("score", 0.0)
+    telemetry.scored = accuracy.get("scored", False)
+    telemetry.accuracy_rationale = accuracy.get("rationale")
+    telemetry.query_category = accuracy.get("query_category")
+    telemetry.prompt_optimization = accuracy.get("prompt_optimization")
+    telemetry.evaluator_cost = accuracy.get("evaluator_cost", 0.0)
+    if evaluation_ms is not None:
+        telemetry.evaluation_ms = evaluation_ms
+
 class DBService:
     def create_conversation(self, title: str) -> Conversation:
-        with Session(engine) as session:
+        with write_session() as session:
             conv = Conversation(title=title)
             session.add(conv)
             session.commit()
@@ -16,43 +90,230 @@ class DBService:
             return conv
 
     def add_message(self, conversation_id: str, role: str, content: str) -> Message:
-        with Session(engine) as session:
+        with write_session() as session:
             msg = Message(conversation_id=conversation_id, role=role, content=content)
             session.add(msg)
             session.commit()
             session.refresh(msg)
             return msg
 
-    def add_telemetry(self, message_id: str, log_data: dict) -> GovernanceTelemetry:
+    def add_telemetry(self, message_id: str, log_data: dict, persistence_started: Optional[float] = None) -> GovernanceTelemetry:
         """
-        Extracts relevant fields from GovernanceLog (dict) and saves GovernanceTelemetry
+        Extracts relevant fields from GovernanceLog (dict) and saves GovernanceTelemetry.
+        persistence_started (time.perf_counter()) lets the row carry its own write time,
+        measured up to the final commit.
         """
-        with Session(engine) as session:
-            # Check if metrics are nested objects or dicts (Pydantic objects need .dict() or accessors)
-            # Assuming log_data is the .model_dump() of GovernanceLog
-            
-            usage = log_data.get("usage", {})
-            cost = log_data.get("cost", {})
-            accuracy = log_data.get("accuracy", {})
-            
-            telemetry = GovernanceTelemetry(
-                message_id=message_id,
-                trace_id=log_data.get("trace_id"),
-                governance_context=log_data.get("tags", {}).get("governance_context", "unknown"),
-                host_platform=str(log_data.get("provider")),
-                model_id=log_data.get("model_id"),
-                latency_ms=usage.get("latency_ms", 0.0),
-                input_tokens=usage.get("input_tokens", 0),
-                output_tokens=usage.get("output_tokens", 0),
-                total_cost=cost.get("total_cost", 0.0),
-                accuracy_score=accuracy.get("score", 0.0) if accuracy else 0.0,
-                accuracy_rationale=accuracy.get("rationale") if accuracy else None,
-                query_category=accuracy.get("query_category") if accuracy else None,
-                prompt_optimization=accuracy.get("prompt_optimization") if accuracy else None,
-            )
+        with write_session() as session:
+            telemetry = telemetry_from_log(message_id, log_data)
+            if persistence_started is not None:
+                telemetry.persistence_ms = (time.perf_counter() - persistence_started) * 1000
             session.add(telemetry)
+            rollups.apply(session, added=[telemetry])
             session.commit()
             session.refresh(telemetry)
             return telemetry
 
+    def update_telemetry_accuracy(self, trace_id: str, accuracy: dict, evaluation_ms: Optional[float] = None) -> Optional[GovernanceTelemetry]:
+        """
+        Fills in the evaluator verdict for a telemetry row persisted before its score was known.
+        """
+        with write_session() as session:
+            telemetry = session.exec(
+                select(GovernanceTelemetry).where(GovernanceTelemetry.trace_id == trace_id)
+            ).first()
+            if not telemetry:
+                return None
+
+            before = rollups.snapshot(telemetry)
+            apply_accuracy(telemetry, accuracy, evaluation_ms)
+            session.add(telemetry)
+            rollups.apply(session, added=[telemetry], removed=[before])
+            session.commit()
+            session.refresh(telemetry)
+            return telemetry
+
+    def create_query_conversations(self, queries: List[str]) -> List[str]:
+        """One conversation (with its user message) per query, written in a single transaction."""
+        with write_session() as session:
+            conversations = [Conversation(title=query[:50]) for query in queries]
+            session.add_all(conversations)
+            session.add_all([
+                Message(conversation_id=conv.id, role="user", content=query)
+                for conv, query in zip(conversations, queries)
+            ])
+            session.commit()
+            return [conv.id for conv in conversations]
+
+    def create_batch_job(self, job: BatchJob, parts: List[BatchJobPart]) -> BatchJob:
+        with write_session() as session:
+            session.add(job)
+            session.add_all(parts)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def get_batch_job(self, job_id: str) -> Optional[Tuple[BatchJob, List[BatchJobPart]]]:
+        with Session(engine) as session:
+            job = session.get(BatchJob, job_id)
+            if not job:
+                return None
+            parts = session.exec(select(BatchJobPart).where(BatchJobPart.job_id == job_id)).all()
+            return job, list(parts)
+
+    def running_batch_job_ids(self) -> List[str]:
+        with Session(engine) as session:
+            return list(session.exec(select(BatchJob.id).where(BatchJob.status == "running")).all())
+
+    def claim_batch_part(self, part_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Takes (or renews) the lease on a running part. A conditional UPDATE, so of several
+        processes polling the same job only one advances each part; the others take over
+        once its lease lapses.
+        """
+        now = datetime.utcnow()
+        with write_session() as session:
+            claimed = session.execute(
+                update(BatchJobPart).where(
+                    BatchJobPart.id == part_id,
+                    BatchJobPart.status == "running",
+                    or_(
+                        BatchJobPart.lease_owner.is_(None),
+                        BatchJobPart.lease_owner == owner,
+                        BatchJobPart.lease_expires_at < now
+                    )
+                ).values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            )
+            session.commit()
+            return claimed.rowcount == 1
+
+    def finish_batch_part(
+        self,
+        part: BatchJobPart,
+        owner: str,
+        completed: int,
+        failed: int,
+        records: Sequence[Tuple[str, str, dict]] = ()
+    ) -> Optional[List[str]]:
+        """
+        Stores a finished part in one transaction: an assistant message and telemetry row per
+        record (conversation_id, record_id, GovernanceLog dump) not already ingested, the part's
+        final state and the job's record counters. Returns the record ids written now, or None
+        (nothing written) if owner no longer holds the part's lease.
+        """
+        with write_session() as session:
+            released = session.execute(
+                update(BatchJobPart).where(
+                    BatchJobPart.id == part.id, BatchJobPart.status == "running", BatchJobPart.lease_owner == owner
+                ).values(
+                    status=part.status, error=part.error, completed_at=part.completed_at,
+                    lease_owner=None, lease_expires_at=None
+                )
+            )
+            if released.rowcount != 1:
+                session.rollback()
+                return None
+
+            stored = set(session.exec(
+                select(GovernanceTelemetry.batch_record_id).where(
+                    GovernanceTelemetry.batch_job_id == part.job_id,
+                    GovernanceTelemetry.model_id == part.model_id,
+                    GovernanceTelemetry.batch_record_id.in_([record_id for _, record_id, _ in records])
+                )
+            ).all()) if records else set()
+            written, rows = [], []
+            for conversation_id, record_id, log_data in records:
+                if record_id in stored:
+                    continue
+                msg = Message(conversation_id=conversation_id, role="assistant", content=log_data.get("response_text") or "")
+                session.add(msg)
+                rows.append(telemetry_from_log(msg.id, log_data))
+                written.append(record_id)
+            session.add_all(rows)
+            if rows:
+                rollups.apply(session, added=rows)
+
+            session.execute(
+                update(BatchJob).where(BatchJob.id == part.job_id).values(
+                    completed_records=BatchJob.completed_records + completed,
+                    failed_records=BatchJob.failed_records + failed
+                )
+            )
+            session.commit()
+            return written
+
+    def finish_batch_job(self, job_id: str, status: str) -> bool:
+        """Marks a job done once all its parts are; False if a part is still running or the job is already done."""
+        parts_running = select(BatchJobPart.id).where(BatchJobPart.job_id == job_id, BatchJobPart.status == "running").exists()
+        with write_session() as session:
+            finished = session.execute(
+                update(BatchJob).where(BatchJob.id == job_id, BatchJob.status == "running", ~parts_running).values(
+                    status=status, completed_at=datetime.utcnow()
+                )
+            )
+            session.commit()
+            return finished.rowcount == 1
+
+class AsyncDBService:
+    """
+    Async counterpart of DBService for the request path: statements run on the async
+    engine (aiosqlite / asyncpg), so a DB wait suspends the coroutine instead of
+    occupying an executor thread. Sessions use expire_on_commit=False, so returned
+    rows need no refresh round trip.
+    """
+
+    async def create_conversation(self, title: str) -> Conversation:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            conv = Conversation(title=title)
+            session.add(conv)
+            await session.commit()
+            return conv
+
+    async def add_message(self, conversation_id: str, role: str, content: str) -> Message:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            msg = Message(conversation_id=conversation_id, role=role, content=content)
+            session.add(msg)
+            await session.commit()
+            return msg
+
+    async def add_telemetry(self, message_id: str, log_data: dict, persistence_started: Optional[float] = None) -> GovernanceTelemetry:
+        """See DBService.add_telemetry."""
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            telemetry = telemetry_from_log(message_id, log_data)
+            if persistence_started is not None:
+                telemetry.persistence_ms = (time.perf_counter() - persistence_started) * 1000
+            session.add(telemetry)
+            await rollups.apply_async(session, added=[telemetry])
+            await session.commit()
+            return telemetry
+
+    async def add_response(self, conversation_id: str, log_data: dict, persistence_started: Optional[float] = None) -> GovernanceTelemetry:
+        """Assistant message and its telemetry row in one transaction."""
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            msg = Message(conversation_id=conversation_id, role="assistant", content=log_data.get("response_text") or "")
+            telemetry = telemetry_from_log(msg.id, log_data)
+            session.add(msg)
+            session.add(telemetry)
+            if persistence_started is not None:
+                telemetry.persistence_ms = (time.perf_counter() - persistence_started) * 1000
+            await rollups.apply_async(session, added=[telemetry])
+            await session.commit()
+            return telemetry
+
+    async def update_telemetry_accuracy(self, trace_id: str, accuracy: dict, evaluation_ms: Optional[float] = None) -> Optional[GovernanceTelemetry]:
+        """See DBService.update_telemetry_accuracy."""
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            telemetry = (await session.exec(
+                select(GovernanceTelemetry).where(GovernanceTelemetry.trace_id == trace_id)
+            )).first()
+            if not telemetry:
+                return None
+
+            before = rollups.snapshot(telemetry)
+            apply_accuracy(telemetry, accuracy, evaluation_ms)
+            session.add(telemetry)
+            await rollups.apply_async(session, added=[telemetry], removed=[before])
+            await session.commit()
+            return telemetry
+
 db_service = DBService()
+async_db_service = AsyncDBService()
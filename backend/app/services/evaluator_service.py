@@ -1,8 +1,71 @@
+import json
+import asyncio
 from google import genai
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from app.core.config import settings
 from app.services.llm_providers.openai_provider import OpenAIProvider
 from app.services.llm_providers.bedrock import BedrockService
+from app.services.llm_providers.vertex_provider import cached_tokens, request_config
+from app.services.verdict_cache import VerdictCache
+from app.core.deadline import Deadline
+from app.services.admission import admission_controller
+from app.services.retry import retry_policy
+from app.services.model_catalog import model_catalog
+from app.services.pricing_service import pricing_service
+
+# Static prefixes of the judge prompts (single response / several responses): identical
+# bytes on every call, sent as the system turn ahead of the query and responses. At ~250-300
+# tokens they are below every provider's minimum cacheable prefix (1024+), so prompt caching
+# does not apply to the judge today; cache tokens are still priced if a provider reports them.
+# Anything that varies per call belongs in _build_prompt / _build_batch_prompt, never here.
+JUDGE_INSTRUCTIONS = """You are an expert AI Governance Judge.
+
+TASK: Evaluate the accuracy and completeness of the AI's response to the User's query.
+Also, classify the query complexity and provide prompt optimization suggestions.
+
+INSTRUCTIONS:
+1. Rate the accuracy from 0 to 100 (100 being perfect, 0 being completely wrong).
+2. Provide a brief rationale (1 sentence).
+3. Classify the query into ONE of these complexity levels: "Straightforward", "Mid-Level Complication", "Advanced Reasoning".
+4. Provide a suggestion to optimize the user's prompt for better results (1 sentence).
+
+5. Output ONLY valid JSON in this format:
+{
+    "score": 95,
+    "rationale": "Correctly identifies S3 encryption defaults and provides actionable steps.",
+    "query_category": "Advanced Reasoning",
+    "prompt_optimization": "Specify the AWS region and specific encryption types (SSE-S3 vs KMS) for more precise advice."
+}
+
+IMPORTANT: The score must be an integer between 0 and 100.
+"""
+
+JUDGE_BATCH_INSTRUCTIONS = """You are an expert AI Governance Judge.
+
+TASK: Several AI models answered the same User query. Evaluate the accuracy and completeness of EACH response independently.
+Also, classify the query complexity and provide prompt optimization suggestions.
+
+INSTRUCTIONS:
+1. Rate the accuracy of each response from 0 to 100 (100 being perfect, 0 being completely wrong).
+2. Provide a brief rationale for each response (1 sentence).
+3. Classify the query into ONE of these complexity levels: "Straightforward", "Mid-Level Complication", "Advanced Reasoning".
+4. Provide a suggestion to optimize the user's prompt for better results (1 sentence).
+
+5. Output ONLY valid JSON in this format, with exactly one entry per response:
+{
+    "query_category": "Advanced Reasoning",
+    "prompt_optimization": "Specify the AWS region and specific encryption types (SSE-S3 vs KMS) for more precise advice.",
+    "results": [
+        {"response": 1, "score": 95, "rationale": "Correctly identifies S3 encryption defaults and provides actionable steps."},
+        {"response": 2, "score": 60, "rationale": "Misses bucket policy checks."}
+    ]
+}
+
+IMPORTANT: Every score must be an integer between 0 and 100.
+"""
+
+class EvaluatorNotConfigured(Exception):
+    """The selected judge's provider has no credentials configured."""
 
 class EvaluatorService:
     def __init__(self):
@@ -19,90 +82,32 @@ class EvaluatorService:
         # Initialize Bedrock Provider
         self.bedrock_service = BedrockService()
 
-    def evaluate_response(self, original_query: str, ai_response: str, model_id: str = "gemini-2.5-pro") -> Dict[str, any]:
+        # Identical (judge, query, response) triples are only judged once
+        self.verdict_cache = VerdictCache(
+            max_entries=settings.EVALUATOR_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.EVALUATOR_CACHE_TTL_SECONDS,
+            path=settings.EVALUATOR_CACHE_PATH
+        )
+
+    async def evaluate_response_async(self, original_query: str, ai_response: str, model_id: str = "gemini-2.5-pro", timeout: Optional[float] = None) -> Dict[str, any]:
         """
         Uses the specified 'Judge' model to rate the accuracy of an AI response.
-        Returns dictionary with score (0-100 percentage) and rationale.
-        """
-        
-        prompt = f"""
-        You are an expert AI Governance Judge.
-        
-        TASK: Evaluate the accuracy and completeness of the AI's response to the User's query.
-        Also, classify the query complexity and provide prompt optimization suggestions.
-        
-        USER QUERY: {original_query}
-        AI RESPONSE: {ai_response}
-        
-        INSTRUCTIONS:
-        1. Rate the accuracy from 0 to 100 (100 being perfect, 0 being completely wrong).
-        2. Provide a brief rationale (1 sentence).
-        3. Classify the query into ONE of these complexity levels: "Straightforward", "Mid-Level Complication", "Advanced Reasoning".
-        4. Provide a suggestion to optimize the user's prompt for better results (1 sentence).
-        
-        5. Output ONLY valid JSON in this format:
-        {{
-            "score": 95,
-            "rationale": "Correctly identifies S3 encryption defaults and provides actionable steps.",
-            "query_category": "Advanced Reasoning",
-            "prompt_optimization": "Specify the AWS region and specific encryption types (SSE-S3 vs KMS) for more precise advice."
-        }}
-        
-        IMPORTANT: The score must be an integer between 0 and 100.
+        Returns dictionary with score (0-100 percentage), rationale and evaluator_cost.
+        timeout (seconds) is passed down to the judge's HTTP request.
         """
-        
+        cached = await self._cached_verdict_async(model_id, original_query, ai_response)
+        if cached is not None:
+            return cached
+
+        prompt = self._build_prompt(original_query, ai_response)
+
         try:
-            result_text = ""
-            
-            # ROUTING LOGIC based on model_id
-            if "gpt" in model_id.lower() or "o1" in model_id.lower():
-                # OpenAI Route
-                if not settings.OPENAI_API_KEY:
-                     return {"score": 0, "rationale": "Evaluator (OpenAI) not configured."}
-                
-                openai_res = self.openai_provider.invoke_model(model_id, prompt)
-                result_text = openai_res["response_text"]
-                
-            elif "llama" in model_id.lower() or "bedrock" in model_id.lower():
-                # Bedrock Route
-                bedrock_res = self.bedrock_service.invoke_model(model_id, prompt)
-                result_text = bedrock_res["response_text"]
-
-            else:
-                # Default: Google Route (Gemini)
-                if not self.client:
-                    return {"score": 0, "rationale": "Evaluator (Google) not configured."}
-                
-                # Check for "preview" models which might need specific handling or just work
-                response = self.client.models.generate_content(
-                    model=model_id,
-                    contents=prompt
-                )
-                result_text = response.text
-            
-            # Clean up response (common for all providers)
-            text = result_text.replace("```json", "").replace("```", "").strip()
-            
-            import json
-            # Handle potential JSON parsing errors more gracefully
-            try:
-                result = json.loads(text)
-            except json.JSONDecodeError:
-                # Fallback if model returned plain text despite instructions
-                return {
-                    "score": 50,
-                    "rationale": f"Evaluator Output Malformed: {text[:100]}"
-                }
-            
-            # Ensure score is an integer
-            if "score" in result:
-                result["score"] = int(result["score"])
-            
-            # Tag which judge was used for transparency
-            result["evaluator_model"] = model_id
-            
-            return result
-            
+            judge_res = await self._call_judge_async(model_id, prompt, timeout)
+            result = self._parse_result(judge_res["response_text"], model_id)
+            result["evaluator_cost"] = self._judge_cost(model_id, judge_res)
+            return await self._remember_async(original_query, ai_response, model_id, result)
+        except EvaluatorNotConfigured as e:
+            return {"score": 0, "rationale": str(e)}
         except Exception as e:
             print(f"Evaluator Error ({model_id}): {e}")
             return {
@@ -110,4 +115,203 @@ class EvaluatorService:
                 "rationale": f"Evaluation failed: {str(e)}"
             }
 
+    async def evaluate_batch_async(self, original_query: str, ai_responses: List[str], model_id: str = "gemini-2.5-pro", timeout: Optional[float] = None) -> List[Dict[str, any]]:
+        """
+        Grades several responses to the same query in ONE judge call.
+        Returns one result dict per response, in order. Falls back to per-response
+        calls when the combined prompt exceeds EVALUATOR_BATCH_TOKEN_BUDGET, and for
+        any response the judge left out of its batched verdict. Responses with a
+        cached verdict are not sent to the judge at all.
+        """
+        results = [await self._cached_verdict_async(model_id, original_query, r) for r in ai_responses]
+        uncached = [i for i, r in enumerate(results) if r is None]
+        if uncached:
+            judged = await self._judge_batch_async(original_query, [ai_responses[i] for i in uncached], model_id, timeout)
+            for i, result in zip(uncached, judged):
+                results[i] = await self._remember_async(original_query, ai_responses[i], model_id, result)
+        return results
+
+    async def _judge_batch_async(self, original_query: str, ai_responses: List[str], model_id: str, timeout: Optional[float] = None) -> List[Dict[str, any]]:
+        if len(ai_responses) <= 1:
+            return [await self.evaluate_response_async(original_query, r, model_id=model_id, timeout=timeout) for r in ai_responses]
+
+        prompt = self._build_batch_prompt(original_query, ai_responses)
+        if self._estimate_tokens(JUDGE_BATCH_INSTRUCTIONS + prompt, len(ai_responses)) > settings.EVALUATOR_BATCH_TOKEN_BUDGET:
+            print(f"Evaluator: batch of {len(ai_responses)} exceeds token budget, judging individually")
+            return await self._evaluate_each_async(original_query, ai_responses, model_id, timeout)
+
+        # The shared call is billed once; each verdict carries an equal share of it
+        share = 0.0
+        try:
+            judge_res = await self._call_judge_async(model_id, prompt, timeout, system=JUDGE_BATCH_INSTRUCTIONS)
+            share = self._judge_cost(model_id, judge_res) / len(ai_responses)
+            results = self._parse_batch_result(judge_res["response_text"], model_id, len(ai_responses))
+        except EvaluatorNotConfigured as e:
+            return [{"score": 0, "rationale": str(e)} for _ in ai_responses]
+        except Exception as e:
+            print(f"Evaluator Batch Error ({model_id}): {e}")
+            results = [None] * len(ai_responses)
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            retried = await self._evaluate_each_async(original_query, [ai_responses[i] for i in missing], model_id, timeout)
+            for i, result in zip(missing, retried):
+                results[i] = result
+        for result in results:
+            result["evaluator_cost"] = result.get("evaluator_cost", 0.0) + share
+        return results
+
+    async def _evaluate_each_async(self, original_query: str, ai_responses: List[str], model_id: str, timeout: Optional[float] = None) -> List[Dict[str, any]]:
+        return list(await asyncio.gather(
+            *(self.evaluate_response_async(original_query, r, model_id=model_id, timeout=timeout) for r in ai_responses)
+        ))
+
+    async def _call_judge_async(self, model_id: str, prompt: str, timeout: Optional[float] = None, system: str = JUDGE_INSTRUCTIONS) -> Dict[str, any]:
+        # Throttled or briefly unavailable judges are retried within the caller's timeout
+        return await retry_policy.run(
+            lambda remaining: self._call_judge_once(model_id, prompt, remaining, system),
+            Deadline(timeout) if timeout is not None else None,
+            label=f"judge {model_id}"
+        )
+
+    async def _call_judge_once(self, model_id: str, prompt: str, timeout: Optional[float] = None, system: str = JUDGE_INSTRUCTIONS) -> Dict[str, any]:
+        """
+        Sends system (JUDGE_INSTRUCTIONS or JUDGE_BATCH_INSTRUCTIONS) as the static prefix and prompt as the user turn.
+        Returns the provider-style result (response_text, token counts incl. cache reads/writes).
+        """
+        # ROUTING LOGIC based on model_id
+        provider = model_catalog.resolve(model_id).provider
+        full_text = system + prompt
+        if provider == "openai":
+            # OpenAI Route
+            if not settings.OPENAI_API_KEY:
+                raise EvaluatorNotConfigured("Evaluator (OpenAI) not configured.")
+
+            async with admission_controller.admit("openai", model_id, full_text) as ticket:
+                openai_res = await self.openai_provider.invoke_model_async(model_id, prompt, timeout=timeout, system=system)
+                ticket.actual_tokens = openai_res["input_tokens"] + openai_res["output_tokens"]
+            return openai_res
+
+        elif provider == "aws":
+            # Bedrock Route
+            async with admission_controller.admit("aws", model_id, full_text) as ticket:
+                bedrock_res = await self.bedrock_service.invoke_model_async(model_id, prompt, timeout=timeout, system=system)
+                ticket.actual_tokens = bedrock_res["input_tokens"] + bedrock_res["output_tokens"]
+            return bedrock_res
+
+        # Default: Google Route (Gemini)
+        if not self.client:
+            raise EvaluatorNotConfigured("Evaluator (Google) not configured.")
+
+        async with admission_controller.admit("google", model_id, full_text) as ticket:
+            response = await self.client.aio.models.generate_content(
+                model=model_id,
+                contents=prompt,
+                config=request_config(timeout, system_instruction=system)
+            )
+            gemini_res = self._gemini_result(response)
+            ticket.actual_tokens = gemini_res["input_tokens"] + gemini_res["output_tokens"]
+        return gemini_res
+
+    def _gemini_result(self, response) -> Dict[str, any]:
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "response_text": response.text,
+            "input_tokens": (usage.prompt_token_count or 0) if usage else 0,
+            "output_tokens": (usage.candidates_token_count or 0) if usage else 0,
+            "cache_read_tokens": cached_tokens(usage)
+        }
+
+    def _judge_cost(self, model_id: str, judge_res: Dict[str, any]) -> float:
+        return pricing_service.calculate_cost(
+            provider="",
+            model_name=model_id,
+            input_tokens=judge_res.get("input_tokens", 0),
+            output_tokens=judge_res.get("output_tokens", 0),
+            cache_read_tokens=judge_res.get("cache_read_tokens", 0),
+            cache_write_tokens=judge_res.get("cache_write_tokens", 0)
+        )["total_cost"]
+
+    async def _cached_verdict_async(self, model_id: str, original_query: str, ai_response: str) -> Optional[Dict[str, any]]:
+        # A reused verdict costs nothing this time
+        cached = await self.verdict_cache.get_async(model_id, original_query, ai_response)
+        return {**cached, "evaluator_cost": 0.0} if cached is not None else None
+
+    def _estimate_tokens(self, prompt: str, response_count: int) -> int:
+        # ~4 characters per token, plus room for one verdict object per response
+        return len(prompt) // 4 + response_count * 150
+
+    def _build_prompt(self, original_query: str, ai_response: str) -> str:
+        # Variable part only; JUDGE_INSTRUCTIONS is sent ahead of it as the static prefix
+        return f"""
+USER QUERY: {original_query}
+AI RESPONSE: {ai_response}
+"""
+
+    async def _remember_async(self, original_query: str, ai_response: str, model_id: str, result: Dict[str, any]) -> Dict[str, any]:
+        # Only well-formed verdicts (tagged with their judge) are worth reusing
+        if result.get("evaluator_model"):
+            await self.verdict_cache.put_async(model_id, original_query, ai_response, result)
+        return result
+
+    def _parse_result(self, result_text: str, model_id: str) -> Dict[str, any]:
+        # Clean up response (common for all providers)
+        text = result_text.replace("```json", "").replace("```", "").strip()
+        
+        # Handle potential JSON parsing errors more gracefully
+        try:
+            result = json.loads(text)
+        except json.JSONDecodeError:
+            # Fallback if model returned plain text despite instructions
+            return {
+                "score": 50,
+                "rationale": f"Evaluator Output Malformed: {text[:100]}"
+            }
+        
+        # Ensure score is an integer
+        if "score" in result:
+            result["score"] = int(result["score"])
+        
+        # Tag which judge was used for transparency
+        result["evaluator_model"] = model_id
+        
+        return result
+
+    def _build_batch_prompt(self, original_query: str, ai_responses: List[str]) -> str:
+        numbered = "\n\n".join(
+            f"RESPONSE {i}:\n<<<\n{response}\n>>>" for i, response in enumerate(ai_responses, start=1)
+        )
+        # Variable part only; JUDGE_BATCH_INSTRUCTIONS is sent ahead of it as the static prefix
+        return f"""
+USER QUERY: {original_query}
+
+{numbered}
+"""
+
+    def _parse_batch_result(self, result_text: str, model_id: str, count: int) -> List[Optional[Dict[str, any]]]:
+        """Splits a batched verdict into per-response dicts; None marks a response the judge skipped."""
+        text = result_text.replace("```json", "").replace("```", "").strip()
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            print(f"Evaluator Batch Output Malformed ({model_id}): {text[:100]}")
+            return [None] * count
+
+        results: List[Optional[Dict[str, any]]] = [None] * count
+        for entry in payload.get("results", []):
+            try:
+                index = int(entry["response"]) - 1
+                score = int(entry["score"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < count:
+                results[index] = {
+                    "score": score,
+                    "rationale": entry.get("rationale"),
+                    "query_category": payload.get("query_category"),
+                    "prompt_optimization": payload.get("prompt_optimization"),
+                    "evaluator_model": model_id
+                }
+        return results
+
 evaluator_service = EvaluatorService()
@@ -0,0 +1,72 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+class LatencyTracker:
+    """
+    Rolling window of recent successful call latencies (seconds) per key, used to
+    decide when a call has become slow enough to be worth hedging.
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Hashable, Deque[float]] = {}
+
+    def record(self, key: Hashable, seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def p95(self, key: Hashable) -> Optional[float]:
+        """None until enough samples exist to trust the estimate."""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            str(key): {"samples": len(samples), "p95_ms": round((self.p95(key) or 0) * 1000, 2)}
+            for key, samples in self._samples.items()
+        }
+
+async def hedged(
+    primary: Callable[[], Awaitable[Any]],
+    backup: Callable[[], Awaitable[Any]],
+    delay: float
+) -> Tuple[Any, bool]:
+    """
+    Runs primary; if it has not finished after delay seconds, starts backup as well
+    and returns whichever succeeds first, cancelling the other.
+    Returns (result, duplicate_billed): the second flag is True when the loser was
+    still running when cancelled, i.e. the provider has likely charged for it too.
+    """
+    first = asyncio.ensure_future(primary())
+    second: Optional[asyncio.Future] = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result(), False
+
+        second = asyncio.ensure_future(backup())
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # Only a loser that was still in flight counts as duplicate spend
+                    duplicate_billed = bool(pending)
+                    for loser in pending:
+                        loser.cancel()
+                    return task.result(), duplicate_billed
+                error = error or task.exception()
+        raise error
+    finally:
+        # Also reached when the caller is cancelled (deadline): leave nothing running
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
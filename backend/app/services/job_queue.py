@@ -0,0 +1,248 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.db import engine
+from app.models.job import Job, JobCell
+from app.models.telemetry import GovernanceTelemetry
+from app.schemas.requests import ModelConfig
+from app.services.db_service import db_service
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+JOB_KIND_COMPARISON = "comparison"
+JOB_KIND_RECOST = "recost"
+
+CELL_PENDING = "pending"
+CELL_COMPLETED = "completed"
+CELL_FAILED = "failed"
+
+class JobQueue:
+    """
+    Durable queue of comparison jobs in the application database.
+
+    Workers claim a job under a lease and heartbeat to keep it; a job whose lease
+    lapses (worker crashed or was redeployed) is claimed again by the next worker,
+    which only reruns the cells not yet checkpointed. A job is failed after
+    max_attempts claims; a cell after max_cell_attempts unsuccessful runs.
+    All methods are blocking; call them through the invocation executor.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+        max_cell_attempts: int = settings.JOB_CELL_MAX_ATTEMPTS,
+        retry_delay: float = settings.JOB_RETRY_DELAY_SECONDS
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_cell_attempts = max_cell_attempts
+        self.retry_delay = retry_delay
+
+    def enqueue(
+        self,
+        queries: List[str],
+        configs: List[ModelConfig],
+        governance_context: str = "aws",
+        evaluator_model: Optional[str] = None
+    ) -> Job:
+        conversation_ids = db_service.create_query_conversations(queries)
+        with Session(engine) as session:
+            job = Job(
+                governance_context=governance_context,
+                evaluator_model=evaluator_model,
+                queries=json.dumps(queries),
+                conversation_ids=json.dumps(conversation_ids),
+                total_cells=len(queries) * len(configs)
+            )
+            session.add(job)
+            session.add_all([
+                JobCell(job_id=job.id, query_index=i, host_platform=config.host_platform, model_id=config.model_id)
+                for i in range(len(queries))
+                for config in configs
+            ])
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def enqueue_recost(self) -> Job:
+        """Queues a re-cost of all stored telemetry with the worker's live pricing table."""
+        with Session(engine) as session:
+            job = Job(kind=JOB_KIND_RECOST, governance_context="", queries="[]", conversation_ids="[]")
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Takes the oldest runnable job: queued and due, or running with a lapsed lease.
+        The claim is a conditional UPDATE, so two workers racing for the same job
+        cannot both win.
+        """
+        now = datetime.utcnow()
+        runnable = or_(
+            (Job.status == JOB_QUEUED) & (Job.available_at <= now),
+            (Job.status == JOB_RUNNING) & (Job.lease_expires_at < now)
+        )
+        with Session(engine) as session:
+            candidates = session.exec(
+                select(Job.id, Job.attempts).where(runnable).order_by(Job.created_at).limit(5)
+            ).all()
+            for job_id, attempts in candidates:
+                if attempts >= self.max_attempts:
+                    # Lapsed once too often (a job that keeps crashing its worker)
+                    session.execute(
+                        update(Job).where(Job.id == job_id, runnable).values(
+                            status=JOB_FAILED, error="Exceeded maximum attempts", finished_at=now, lease_owner=None
+                        )
+                    )
+                    session.commit()
+                    continue
+                claimed = session.execute(
+                    update(Job).where(Job.id == job_id, runnable).values(
+                        status=JOB_RUNNING,
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=Job.attempts + 1,
+                        started_at=func.coalesce(Job.started_at, now)
+                    )
+                )
+                session.commit()
+                if claimed.rowcount == 1:
+                    return session.get(Job, job_id, populate_existing=True)
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extends the lease; False means another worker has taken the job over."""
+        with Session(engine) as session:
+            extended = session.execute(
+                update(Job).where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == JOB_RUNNING).values(
+                    lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                )
+            )
+            session.commit()
+            return extended.rowcount == 1
+
+    def pending_cells(self, job_id: str) -> List[JobCell]:
+        with Session(engine) as session:
+            return list(session.exec(
+                select(JobCell).where(JobCell.job_id == job_id, JobCell.status == CELL_PENDING)
+            ).all())
+
+    def cell_trace(self, cell_id: str) -> Optional[str]:
+        """trace_id of the telemetry row that already completed a cell (written before a crash lost its checkpoint)."""
+        with Session(engine) as session:
+            return session.exec(
+                select(GovernanceTelemetry.trace_id).where(GovernanceTelemetry.job_cell_id == cell_id)
+            ).first()
+
+    def record_cell(self, cell_id: str, success: bool, trace_id: Optional[str] = None, error: Optional[str] = None) -> JobCell:
+        """Checkpoints one attempt at a cell and updates the job's progress counters."""
+        with Session(engine) as session:
+            cell = session.get(JobCell, cell_id)
+            cell.attempts += 1
+            cell.trace_id = trace_id
+            cell.error = None if success else error
+            cell.updated_at = datetime.utcnow()
+            if success:
+                cell.status = CELL_COMPLETED
+                counter = {"completed_cells": Job.completed_cells + 1}
+            elif cell.attempts >= self.max_cell_attempts:
+                cell.status = CELL_FAILED
+                counter = {"failed_cells": Job.failed_cells + 1}
+            else:
+                counter = None
+            session.add(cell)
+            if counter:
+                session.execute(update(Job).where(Job.id == cell.job_id).values(**counter))
+            session.commit()
+            session.refresh(cell)
+            return cell
+
+    def finish(self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """Marks a job whose cells are all settled; failed only if no cell succeeded."""
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.lease_owner != worker_id:
+                return
+            job.status = JOB_COMPLETED if job.completed_cells or not job.total_cells else JOB_FAILED
+            job.finished_at = datetime.utcnow()
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if result is not None:
+                job.result = json.dumps(result)
+            session.add(job)
+            session.commit()
+
+    def fail_attempt(self, job_id: str, worker_id: str, error: str) -> None:
+        """A worker hit an unexpected error: retry the job later, or fail it for good."""
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.lease_owner != worker_id:
+                return
+            job.error = error
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if job.attempts >= self.max_attempts:
+                job.status = JOB_FAILED
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = JOB_QUEUED
+                job.available_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * job.attempts)
+            session.add(job)
+            session.commit()
+
+    def release(self, job_id: str, worker_id: str) -> None:
+        """Hands a job back on graceful shutdown; the claim does not count as an attempt."""
+        with Session(engine) as session:
+            session.execute(
+                update(Job).where(Job.id == job_id, Job.lease_owner == worker_id).values(
+                    status=JOB_QUEUED, lease_owner=None, lease_expires_at=None, attempts=Job.attempts - 1
+                )
+            )
+            session.commit()
+
+    def status(self, job_id: str, include_cells: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        The job and its cells. include_cells=False is the cheap variant for progress
+        polling: cell counts come from one GROUP BY instead of loading every cell.
+        """
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            if job is None:
+                return None
+            if include_cells:
+                cells = session.exec(select(JobCell).where(JobCell.job_id == job_id)).all()
+                completed, failed = job.completed_cells, job.failed_cells
+            else:
+                cells = []
+                counts = dict(session.exec(
+                    select(JobCell.status, func.count()).where(JobCell.job_id == job_id).group_by(JobCell.status)
+                ).all())
+                completed, failed = counts.get(CELL_COMPLETED, 0), counts.get(CELL_FAILED, 0)
+            settled = completed + failed
+            return {
+                "id": job.id,
+                "kind": job.kind,
+                "status": job.status,
+                "total_cells": job.total_cells,
+                "completed_cells": completed,
+                "failed_cells": failed,
+                "progress": round(settled / job.total_cells, 4) if job.total_cells else 1.0,
+                "attempts": job.attempts,
+                "error": job.error,
+                "result": json.loads(job.result) if job.result else None,
+                "created_at": job.created_at,
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+                "cells": [cell.model_dump(exclude={"job_id"}) for cell in cells],
+            }
+
+job_queue = JobQueue()
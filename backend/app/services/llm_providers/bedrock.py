@@ -1,32 +1,210 @@
+import asyncio
+import base64
 import boto3
+import httpx
 import json
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional, Callable, AsyncIterator, Tuple
+from urllib.parse import quote
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.eventstream import EventStreamBuffer
+from botocore.exceptions import ClientError
 from app.core.config import settings
+from app.services.model_catalog import model_catalog
 
 class BedrockService:
-    def __init__(self):
-        self.client = boto3.client(
-            'bedrock-runtime',
-            region_name=settings.AWS_REGION,
+    def __init__(self, region_name: Optional[str] = None):
+        self.session = boto3.Session(
+            region_name=region_name or settings.AWS_REGION,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
         )
+        self.client = self.session.client('bedrock-runtime')
+        # Shared HTTP client for the async path, created lazily on first use
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
 
-    def invoke_model(self, model_id: str, prompt: str) -> Dict[str, Any]:
+    async def aclose(self) -> None:
+        """Closes the shared HTTP client (app lifespan and worker shutdown)."""
+        http, self._http, self._http_loop = self._http, None, None
+        if http is not None:
+            await http.aclose()
+
+    def invoke_model(self, model_id: str, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
         """
-        Generic invoker that handles payload differences between models
+        Generic invoker that handles payload differences between models.
+        system is a static instruction prefix, sent as Claude's system turn.
         """
-        if "anthropic" in model_id:
-            return self._invoke_claude(model_id, prompt)
-        elif "meta" in model_id:
-            return self._invoke_llama(model_id, prompt)
+        adapter = model_catalog.resolve(model_id).adapter
+        if adapter == "claude":
+            return self._invoke_claude(model_id, prompt, system)
+        elif adapter == "llama":
+            return self._invoke_llama(model_id, prompt, system)
         else:
             raise ValueError(f"Unsupported Bedrock model: {model_id}")
 
-    def _invoke_claude(self, model_id: str, prompt: str) -> Dict[str, Any]:
+    async def invoke_model_async(self, model_id: str, prompt: str, timeout: Optional[float] = None, system: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of invoke_model.
+        boto3 has no asyncio support, so the InvokeModel call is SigV4-signed with
+        botocore and sent over a shared httpx.AsyncClient instead of a worker thread.
+        timeout (seconds) bounds the HTTP request itself.
+        """
+        adapter = model_catalog.resolve(model_id).adapter
+        if adapter == "claude":
+            body, parse, label = self._claude_body(prompt, system), self._parse_claude, "Claude"
+        elif adapter == "llama":
+            body, parse, label = self._llama_body(prompt, system), self._parse_llama, "Llama"
+        else:
+            raise ValueError(f"Unsupported Bedrock model: {model_id}")
+
+        try:
+            raw_body = await self._post_signed(model_id, body, timeout)
+            return parse(json.loads(raw_body), prompt)
+        except Exception as e:
+            print(f"CRITICAL: {label} Bedrock Error ({model_id}): {str(e)}")
+            if 'raw_body' in locals():
+                print(f"Raw Response Body: {raw_body}")
+            raise e
+
+    async def stream_model_async(
+        self,
+        model_id: str,
+        prompt: str,
+        on_delta: Callable[[str], None],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Streaming variant (InvokeModelWithResponseStream): on_delta receives each text
+        chunk as it arrives; the assembled result has the same shape as invoke_model_async.
+        """
+        adapter = model_catalog.resolve(model_id).adapter
+        if adapter == "claude":
+            body, extract, label = self._claude_body(prompt), self._claude_chunk, "Claude"
+        elif adapter == "llama":
+            body, extract, label = self._llama_body(prompt), self._llama_chunk, "Llama"
+        else:
+            raise ValueError(f"Unsupported Bedrock model: {model_id}")
+
+        parts = []
+        usage = {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0}
+        try:
+            async for chunk in self._stream_signed(model_id, body, timeout):
+                text = extract(chunk, usage)
+                if text:
+                    parts.append(text)
+                    on_delta(text)
+                # Final chunk carries Bedrock's own token accounting
+                metrics = chunk.get("amazon-bedrock-invocationMetrics")
+                if metrics:
+                    usage["cache_read_tokens"] = metrics.get("cacheReadInputTokenCount", usage["cache_read_tokens"])
+                    usage["cache_write_tokens"] = metrics.get("cacheWriteInputTokenCount", usage["cache_write_tokens"])
+                    if "inputTokenCount" in metrics:
+                        # Bedrock counts cached prompt tokens separately; input_tokens includes them here
+                        usage["input_tokens"] = metrics["inputTokenCount"] + usage["cache_read_tokens"] + usage["cache_write_tokens"]
+                    usage["output_tokens"] = metrics.get("outputTokenCount", usage["output_tokens"])
+        except Exception as e:
+            print(f"CRITICAL: {label} Bedrock Stream Error ({model_id}): {str(e)}")
+            raise e
+
+        return {
+            "response_text": "".join(parts),
+            "input_tokens": int(usage["input_tokens"]),
+            "output_tokens": int(usage["output_tokens"]),
+            "cache_read_tokens": int(usage["cache_read_tokens"]),
+            "cache_write_tokens": int(usage["cache_write_tokens"])
+        }
+
+    def _signed(self, model_id: str, action: str, body: str, headers: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+        url = f"{self.client.meta.endpoint_url}/model/{quote(model_id, safe='')}/{action}"
+
+        credentials = self.session.get_credentials()
+        if credentials is None:
+            raise ValueError("Bedrock credentials not configured")
+
+        request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+        SigV4Auth(credentials.get_frozen_credentials(), "bedrock", self.client.meta.region_name).add_auth(request)
+        return url, dict(request.headers.items())
+
+    async def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http_loop is not loop:
+            # Pooled connections belong to the event loop that opened them
+            stale = self._http
+            # Explicit timeout: httpx's own default is 5s, far below what slow models need
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(settings.MODEL_TIMEOUT_SECONDS))
+            self._http_loop = loop
+            if stale is not None:
+                try:
+                    await stale.aclose()
+                except Exception as e:
+                    # Its loop is already closed; the sockets go when the transports are collected
+                    print(f"Bedrock: could not close the previous event loop's HTTP client: {e}")
+        return self._http
+
+    async def _post_signed(self, model_id: str, body: str, timeout: Optional[float] = None) -> bytes:
+        url, headers = self._signed(model_id, "invoke", body, {"Content-Type": "application/json", "Accept": "application/json"})
+        http = await self._client()
+        response = await http.post(
+            url,
+            content=body,
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
+
+        if response.status_code >= 400:
+            raise self._client_error(response, "InvokeModel")
+        return response.content
+
+    async def _stream_signed(self, model_id: str, body: str, timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        url, headers = self._signed(
+            model_id, "invoke-with-response-stream", body,
+            {"Content-Type": "application/json", "X-Amzn-Bedrock-Accept": "application/json"}
+        )
+        http = await self._client()
+        async with http.stream(
+            "POST",
+            url,
+            content=body,
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise self._client_error(response, "InvokeModelWithResponseStream")
+
+            # The body is an AWS event stream; each "chunk" event wraps base64 model JSON
+            events = EventStreamBuffer()
+            async for data in response.aiter_bytes():
+                events.add_data(data)
+                for message in events:
+                    if message.headers.get(":message-type") == "exception":
+                        error_type = message.headers.get(":exception-type", "unknownError")
+                        raise ClientError(
+                            {"Error": {"Code": error_type[0].upper() + error_type[1:], "Message": message.payload.decode("utf-8", "replace")}},
+                            "InvokeModelWithResponseStream",
+                        )
+                    if message.headers.get(":event-type") == "chunk":
+                        yield json.loads(base64.b64decode(json.loads(message.payload)["bytes"]))
+
+    def _client_error(self, response: httpx.Response, operation: str) -> ClientError:
+        # Surface the same exception type the boto3 client raises
+        error_type = response.headers.get("x-amzn-errortype", "UnknownError").split(":")[0]
+        try:
+            message = response.json().get("message", response.text)
+        except ValueError:
+            message = response.text
+        return ClientError(
+            {
+                "Error": {"Code": error_type, "Message": message},
+                "ResponseMetadata": {"HTTPStatusCode": response.status_code},
+            },
+            operation,
+        )
+
+    def _claude_body(self, prompt: str, system: Optional[str] = None) -> str:
         # Claude 3 Messages API format
-        body = json.dumps({
+        body = {
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 2000,
             "messages": [
@@ -35,79 +213,116 @@ class BedrockService:
                     "content": [{"type": "text", "text": prompt}]
                 }
             ]
-        })
-        
+        }
+        if system:
+            body["system"] = [{"type": "text", "text": system}]
+        return json.dumps(body)
+
+    def _parse_claude(self, response_body: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+        # Parse usage and content; Claude's input_tokens excludes the cached prefix
+        usage = response_body.get('usage', {})
+        cache_read_tokens = usage.get('cache_read_input_tokens') or 0
+        cache_write_tokens = usage.get('cache_creation_input_tokens') or 0
+        input_tokens = usage.get('input_tokens', 0) + cache_read_tokens + cache_write_tokens
+        output_tokens = usage.get('output_tokens', 0)
+
+        # Handle different Claude 3 response structures if they occur
+        if 'content' in response_body and len(response_body['content']) > 0:
+            content_text = response_body['content'][0]['text']
+        elif 'completion' in response_body:
+            content_text = response_body['completion']
+        else:
+            print(f"WARNING: Unexpected Claude response format: {response_body}")
+            content_text = str(response_body)
+
+        return {
+            "response_text": content_text,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_write_tokens": cache_write_tokens
+        }
+
+    def _claude_chunk(self, chunk: Dict[str, Any], usage: Dict[str, int]) -> str:
+        # Messages API stream events: message_start / content_block_delta / message_delta
+        if chunk.get("type") == "message_start":
+            start = chunk.get("message", {}).get("usage", {})
+            usage["cache_read_tokens"] = start.get("cache_read_input_tokens") or 0
+            usage["cache_write_tokens"] = start.get("cache_creation_input_tokens") or 0
+            usage["input_tokens"] = start.get("input_tokens", 0) + usage["cache_read_tokens"] + usage["cache_write_tokens"]
+        elif chunk.get("type") == "message_delta":
+            usage["output_tokens"] = chunk.get("usage", {}).get("output_tokens", usage["output_tokens"])
+        elif chunk.get("type") == "content_block_delta":
+            return chunk.get("delta", {}).get("text", "")
+        return ""
+
+    def _invoke_claude(self, model_id: str, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
+        body = self._claude_body(prompt, system)
+
         try:
             response = self.client.invoke_model(
                 modelId=model_id,
                 body=body
             )
-            
+
             raw_body = response['body'].read()
-            response_body = json.loads(raw_body)
-            
-            # Parse usage and content
-            usage = response_body.get('usage', {})
-            input_tokens = usage.get('input_tokens', 0)
-            output_tokens = usage.get('output_tokens', 0)
-            
-            # Handle different Claude 3 response structures if they occur
-            if 'content' in response_body and len(response_body['content']) > 0:
-                content_text = response_body['content'][0]['text']
-            elif 'completion' in response_body:
-                content_text = response_body['completion']
-            else:
-                print(f"WARNING: Unexpected Claude response format: {response_body}")
-                content_text = str(response_body)
-
-            return {
-                "response_text": content_text,
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens
-            }
+            return self._parse_claude(json.loads(raw_body), prompt)
         except Exception as e:
             print(f"CRITICAL: Claude Bedrock Error ({model_id}): {str(e)}")
             if 'raw_body' in locals():
                 print(f"Raw Response Body: {raw_body}")
             raise e
 
-    def _invoke_llama(self, model_id: str, prompt: str) -> Dict[str, Any]:
-        # Llama 3 format
+    def _llama_body(self, prompt: str, system: Optional[str] = None) -> str:
+        # Llama 3 format (Bedrock has no prompt caching for Llama; the system turn is plain text)
+        system_turn = f"<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|>" if system else ""
         formatted_prompt = f"""
-<|begin_of_text|><|start_header_id|>user<|end_header_id|>
+<|begin_of_text|>{system_turn}<|start_header_id|>user<|end_header_id|>
 
 {prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>
 """
-        body = json.dumps({
+        return json.dumps({
             "prompt": formatted_prompt,
             "max_gen_len": 2048,
             "temperature": 0.5,
             "top_p": 0.9
         })
 
+    def _parse_llama(self, response_body: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+        # Llama on Bedrock response extract
+        content_text = response_body.get('generation', '')
+        if not content_text and 'text' in response_body: # Potential newer format
+            content_text = response_body['text']
+
+        # Bedrock Llama includes token counts
+        input_tokens = response_body.get('prompt_token_count', len(prompt.split()) * 1.3)
+        output_tokens = response_body.get('generation_token_count', len(content_text.split()) * 1.3)
+
+        return {
+            "response_text": content_text,
+            "input_tokens": int(input_tokens),
+            "output_tokens": int(output_tokens)
+        }
+
+    def _llama_chunk(self, chunk: Dict[str, Any], usage: Dict[str, int]) -> str:
+        # Token counts arrive on the first chunk (prompt) and cumulatively (generation)
+        if chunk.get("prompt_token_count"):
+            usage["input_tokens"] = chunk["prompt_token_count"]
+        if chunk.get("generation_token_count"):
+            usage["output_tokens"] = chunk["generation_token_count"]
+        return chunk.get("generation", "")
+
+    def _invoke_llama(self, model_id: str, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
+        body = self._llama_body(prompt, system)
+
         try:
             response = self.client.invoke_model(
                 modelId=model_id,
                 body=body
             )
-            
+
             raw_body = response['body'].read()
-            response_body = json.loads(raw_body)
-            
-            # Llama on Bedrock response extract
-            content_text = response_body.get('generation', '')
-            if not content_text and 'text' in response_body: # Potential newer format
-                content_text = response_body['text']
-            
-            # Bedrock Llama includes token counts
-            input_tokens = response_body.get('prompt_token_count', len(prompt.split()) * 1.3)
-            output_tokens = response_body.get('generation_token_count', len(content_text.split()) * 1.3)
-
-            return {
-                "response_text": content_text,
-                "input_tokens": int(input_tokens),
-                "output_tokens": int(output_tokens)
-            }
+            return self._parse_llama(json.loads(raw_body), prompt)
         except Exception as e:
             print(f"CRITICAL: Llama Bedrock Error ({model_id}): {str(e)}")
             if 'raw_body' in locals():
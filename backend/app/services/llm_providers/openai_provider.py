@@ -1,31 +1,101 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, NOT_GIVEN
 from app.core.config import settings
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable
 
 class OpenAIProvider:
     def __init__(self):
         if settings.OPENAI_API_KEY:
             self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            # Retries are handled by app.services.retry (budgeted, deadline-aware)
+            self.async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
         else:
             self.client = None
+            self.async_client = None
             print("Warning: OPENAI_API_KEY not set.")
 
-    def invoke_model(self, model_id: str, prompt: str) -> Dict[str, Any]:
+    def invoke_model(self, model_id: str, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
         """
         Invokes OpenAI Chat Completion API.
+        system is a static instruction prefix sent ahead of the prompt; OpenAI caches
+        long repeated prefixes automatically and bills them at the cached input rate.
         """
         if not self.client:
             raise ValueError("OpenAI Client not initialized (Missing Key)")
 
         response = self.client.chat.completions.create(
+            model=model_id,
+            messages=self._messages(prompt, system),
+            temperature=0.7
+        )
+        return self._parse_response(response)
+
+    async def invoke_model_async(self, model_id: str, prompt: str, timeout: Optional[float] = None, system: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of invoke_model using the AsyncOpenAI client.
+        timeout (seconds) is applied to the HTTP request itself.
+        """
+        if not self.async_client:
+            raise ValueError("OpenAI Client not initialized (Missing Key)")
+
+        response = await self.async_client.chat.completions.create(
+            model=model_id,
+            messages=self._messages(prompt, system),
+            temperature=0.7,
+            timeout=timeout if timeout is not None else NOT_GIVEN
+        )
+        return self._parse_response(response)
+
+    async def stream_model_async(
+        self,
+        model_id: str,
+        prompt: str,
+        on_delta: Callable[[str], None],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Streaming variant (stream=True): on_delta receives each content delta; usage
+        comes from the final chunk (stream_options.include_usage).
+        """
+        if not self.async_client:
+            raise ValueError("OpenAI Client not initialized (Missing Key)")
+
+        stream = await self.async_client.chat.completions.create(
             model=model_id,
             messages=[
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7
+            temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout if timeout is not None else NOT_GIVEN
         )
 
-        # Extract usage
+        parts = []
+        input_tokens = output_tokens = cache_read_tokens = 0
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                on_delta(chunk.choices[0].delta.content)
+            if chunk.usage:
+                input_tokens = chunk.usage.prompt_tokens
+                output_tokens = chunk.usage.completion_tokens
+                cache_read_tokens = _cached_tokens(chunk.usage)
+
+        return {
+            "response_text": "".join(parts),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens
+        }
+
+    def _messages(self, prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+        # The cache matches on the exact leading tokens, so the static part goes first
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _parse_response(self, response) -> Dict[str, Any]:
+        # Extract usage (prompt_tokens includes the cached ones)
         usage = response.usage
         input_tokens = usage.prompt_tokens
         output_tokens = usage.completion_tokens
@@ -34,5 +104,10 @@ class OpenAIProvider:
         return {
             "response_text": response_text,
             "input_tokens": input_tokens,
-            "output_tokens": output_tokens
+            "output_tokens": output_tokens,
+            "cache_read_tokens": _cached_tokens(usage)
         }
+
+def _cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details else 0
@@ -1,7 +1,24 @@
 from google import genai
-from typing import Dict, Any
+from google.genai import types
+from typing import Dict, Any, Optional, Callable
 from app.core.config import settings
 
+def request_config(timeout: Optional[float], system_instruction: Optional[str] = None) -> Optional[types.GenerateContentConfig]:
+    """
+    Per-request config carrying an HTTP timeout (genai expects milliseconds) and an
+    optional system instruction; Gemini 2.5+ implicitly caches repeated prefixes.
+    """
+    if timeout is None and system_instruction is None:
+        return None
+    return types.GenerateContentConfig(
+        http_options=types.HttpOptions(timeout=max(1, int(timeout * 1000))) if timeout is not None else None,
+        system_instruction=system_instruction
+    )
+
+def cached_tokens(usage_metadata) -> int:
+    """Prompt tokens Gemini served from its context cache."""
+    return int(getattr(usage_metadata, "cached_content_token_count", None) or 0)
+
 class VertexProvider:
     def __init__(self):
         if settings.GOOGLE_API_KEY:
@@ -18,17 +35,78 @@ class VertexProvider:
         if not self.client:
             raise ValueError("Vertex Client not initialized (Missing API Key)")
 
-        # Clean model ID (remove google/ prefix if present)
-        clean_model_id = model_id.replace("google/", "")
-
         response = self.client.models.generate_content(
-            model=clean_model_id,
+            model=self._clean_model_id(model_id),
             contents=prompt
         )
+        return self._parse_response(response, prompt)
 
+    async def invoke_model_async(self, model_id: str, prompt: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Async variant of invoke_model using the genai client's aio surface.
+        timeout (seconds) is applied to the HTTP request itself.
+        """
+        if not self.client:
+            raise ValueError("Vertex Client not initialized (Missing API Key)")
+
+        response = await self.client.aio.models.generate_content(
+            model=self._clean_model_id(model_id),
+            contents=prompt,
+            config=request_config(timeout)
+        )
+        return self._parse_response(response, prompt)
+
+    async def stream_model_async(
+        self,
+        model_id: str,
+        prompt: str,
+        on_delta: Callable[[str], None],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Streaming variant using generate_content_stream: on_delta receives each text
+        chunk; the last chunk carries the usage metadata.
+        """
+        if not self.client:
+            raise ValueError("Vertex Client not initialized (Missing API Key)")
+
+        parts = []
+        usage_metadata = None
+        async for chunk in await self.client.aio.models.generate_content_stream(
+            model=self._clean_model_id(model_id),
+            contents=prompt,
+            config=request_config(timeout)
+        ):
+            if chunk.text:
+                parts.append(chunk.text)
+                on_delta(chunk.text)
+            if getattr(chunk, "usage_metadata", None):
+                usage_metadata = chunk.usage_metadata
+
+        response_text = "".join(parts)
+        if usage_metadata and usage_metadata.prompt_token_count is not None:
+            input_tokens = usage_metadata.prompt_token_count
+            output_tokens = usage_metadata.candidates_token_count or 0
+        else:
+            # Fallback estimation
+            input_tokens = len(prompt.split()) * 1.3
+            output_tokens = len(response_text.split()) * 1.3
+
+        return {
+            "response_text": response_text,
+            "input_tokens": int(input_tokens),
+            "output_tokens": int(output_tokens),
+            "cache_read_tokens": cached_tokens(usage_metadata)
+        }
+
+    def _clean_model_id(self, model_id: str) -> str:
+        # Clean model ID (remove google/ prefix if present)
+        return model_id.replace("google/", "")
+
+    def _parse_response(self, response, prompt: str) -> Dict[str, Any]:
         # Extract usage metadata
         usage_metadata = response.usage_metadata if hasattr(response, 'usage_metadata') else None
-        
+
         if usage_metadata:
             input_tokens = usage_metadata.prompt_token_count
             output_tokens = usage_metadata.candidates_token_count
@@ -40,5 +118,6 @@ class VertexProvider:
         return {
             "response_text": response.text,
             "input_tokens": int(input_tokens),
-            "output_tokens": int(output_tokens)
+            "output_tokens": int(output_tokens),
+            "cache_read_tokens": cached_tokens(usage_metadata)
         }
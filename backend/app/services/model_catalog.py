@@ -0,0 +1,257 @@
+import hashlib
+import json
+import math
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.utils.cache import TTLCache
+
+PRICING_DIR = Path(__file__).resolve().parents[2] / "pricing"
+PRICING_FILES = ("aws_anthropic.json", "aws_meta.json", "openai.json", "gcp_vertex.json")
+
+# Rates used when a model is not in the pricing files (per token)
+DEFAULT_RATES = {
+    "anthropic": (0.8 / 1_000_000, 2.4 / 1_000_000),  # Claude Instant approx
+    "meta": (0.0003 / 1000, 0.0006 / 1000),
+    "openai": (2.50 / 1_000_000, 10.00 / 1_000_000),  # GPT-4o standard
+    "gcp": (0.075 / 1_000_000, 0.30 / 1_000_000),  # Gemini Flash
+}
+
+# Bedrock model ids: new style claude-sonnet-4-5-20250929, old style claude-3-5-sonnet-20240620
+_CLAUDE_NEW_ID = re.compile(r"claude-(haiku|sonnet|opus)-(\d+)(?:-(\d))?(?=-|:|$)")
+_CLAUDE_OLD_ID = re.compile(r"claude-(\d+)(?:-(\d))?-(haiku|sonnet|opus)")
+_CLAUDE_NEW_NAME = re.compile(r"^Claude (Haiku|Sonnet|Opus) (\d+(?:\.\d)?)$")
+_CLAUDE_OLD_NAME = re.compile(r"^Claude (\d+(?:\.\d)?) (Haiku|Sonnet|Opus)( v2)?$")
+_LLAMA_ID = re.compile(r"llama-?(\d)(?:[-.](\d)(?!\d))?.*?-(\d+b)\b")
+_LLAMA_SIZE = re.compile(r"(\d+)B\b")
+# Llama 4 ships several models of the same size, told apart by name
+_LLAMA_VARIANTS = ("maverick", "scout")
+_OPENAI_REASONING_ID = re.compile(r"(?:^|[./])o\d")
+
+# resolve() memo size: model ids come from requests, so the memo must not grow with them
+RESOLVE_MEMO_ENTRIES = 4096
+
+Rates = Tuple[str, float, float, float, float, float, float]
+
+class PricingValidationError(ValueError):
+    """A pricing file is missing, malformed or contains unusable rates."""
+    pass
+
+class ModelSpec(NamedTuple):
+    """Everything the hot path needs to know about one model_id."""
+    model_id: str
+    provider: str  # ModelProvider value: "aws", "openai", "google" or "other"
+    adapter: Optional[str]  # request/response format: "claude", "llama", "openai", "gemini"
+    pricing_family: Optional[str]  # "anthropic", "meta", "openai", "gcp"
+    pricing_name: Optional[str]  # entry in the pricing file; None means default rates
+    input_rate: float  # USD per input token
+    output_rate: float  # USD per output token
+    batch_input_rate: float  # batch inference tier; on-demand rates where none is published
+    batch_output_rate: float
+    cache_read_rate: float  # prompt tokens served from the provider's prompt cache
+    cache_write_rate: float  # prompt tokens written to it; both are the input rate where none is published
+
+class ModelCatalog:
+    """
+    Pricing and routing for every model_id, compiled once from pricing/*.json.
+    resolve() does the pattern matching the first time a model_id is seen and
+    memoizes the ModelSpec (in a bounded LRU), so later lookups are a single map access.
+
+    A catalog is immutable once built; reloading means building a new one. With
+    strict=True any unreadable file or bad rate raises PricingValidationError instead
+    of silently falling back to default rates.
+    """
+
+    def __init__(self, pricing_dir: Path = PRICING_DIR, strict: bool = False):
+        self.pricing_dir = pricing_dir
+        self.strict = strict
+        self.loaded_at = time.time()
+        # Content hash of the pricing files; recorded on every costed telemetry row
+        self.version = ""
+        self.mtimes: Dict[str, Optional[int]] = {}
+        self._digest = hashlib.sha256()
+        # Entries are (pricing name, input, output, batch input, batch output, cache read, cache write) per token
+        self.claude: Dict[Tuple[str, str, str], Rates] = {}
+        self.llama: Dict[Tuple[str, str, str], Rates] = {}
+        self.openai: List[Rates] = []
+        self.gcp: List[Rates] = []
+        # Entries never go stale (the catalog is immutable), so only the LRU bound evicts them
+        self._resolved = TTLCache(RESOLVE_MEMO_ENTRIES, math.inf)
+        try:
+            self._compile()
+        except (KeyError, TypeError, AttributeError) as e:
+            raise PricingValidationError(f"malformed pricing entry: {e!r}") from e
+        self.version = self._digest.hexdigest()[:12]
+        if strict:
+            self._validate()
+
+    def _load(self, name: str) -> Dict[str, Any]:
+        path = self.pricing_dir / name
+        self.mtimes[name] = file_mtime(path)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            self._digest.update(name.encode() + b"\0" + raw)
+            return json.loads(raw)
+        except Exception as e:
+            if self.strict:
+                raise PricingValidationError(f"{name}: {e}") from e
+            print(f"Error loading pricing file {path}: {e}")
+            return {}
+
+    def _compile(self) -> None:
+        # Anthropic: per 1M tokens, keyed by (family, version, revision)
+        for m in self._load("aws_anthropic.json").get("models", []):
+            key = _claude_name_key(m["model"])
+            if key:
+                batch = m.get("batch") or m
+                cache = m.get("cache") or {}
+                self.claude[key] = (m["model"], *_per_token(
+                    1_000_000, m["input"], m["output"], batch["input"], batch["output"],
+                    _or(cache.get("read"), m["input"]), _or(cache.get("write_5m"), m["input"])
+                ))
+
+        # Meta: per 1000 tokens, keyed by (family, size, variant); the first entry wins
+        for family, models in self._load("aws_meta.json").get("models", {}).items():
+            for m in models:
+                size = _LLAMA_SIZE.search(m["model"])
+                key = (family, size.group(1) + "b", _llama_variant(m["model"].lower())) if size else None
+                if key and key not in self.llama:
+                    rates = m["on_demand"]
+                    batch = m.get("batch") or rates
+                    self.llama[key] = (m["model"], *_per_token(
+                        1000, rates["input"], rates["output"], batch["input"], batch["output"], rates["input"], rates["input"]
+                    ))
+
+        # OpenAI / Vertex: per 1M tokens; longest name first so "gpt-4o-mini" beats "gpt-4o"
+        tiers = self._load("openai.json").get("tiers", {})
+        batch_tier = {}
+        for m in tiers.get("batch", []):
+            batch_tier.setdefault(m["model"], m)
+        seen = set()
+        for m in tiers.get("standard", []):
+            if m["model"] not in seen:
+                seen.add(m["model"])
+                batch = batch_tier.get(m["model"], m)
+                # OpenAI caches prompts automatically; writes cost the normal input rate
+                self.openai.append((m["model"], *_per_token(
+                    1_000_000, m["input"], m["output"], batch["input"], batch["output"], _or(m.get("cached_input"), m["input"]), m["input"]
+                )))
+        self.openai.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+        # Vertex batch prediction and context cache prices are not in the pricing file; on-demand rates apply
+        for m in self._load("gcp_vertex.json").get("models", []):
+            self.gcp.append((m["model"], *_per_token(1_000_000, m["input"], m["output"], m["input"], m["output"], m["input"], m["input"])))
+        self.gcp.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def _validate(self) -> None:
+        tables = {"aws_anthropic.json": self.claude.values(), "aws_meta.json": self.llama.values(), "openai.json": self.openai, "gcp_vertex.json": self.gcp}
+        for name, entries in tables.items():
+            entries = list(entries)
+            if not entries:
+                raise PricingValidationError(f"{name}: no models could be priced")
+            for model, *rates in entries:
+                if not all(isinstance(rate, (int, float)) and math.isfinite(rate) and rate >= 0 for rate in rates):
+                    raise PricingValidationError(f"{name}: invalid rates for {model}")
+
+    def counts(self) -> Dict[str, int]:
+        return {"anthropic": len(self.claude), "meta": len(self.llama), "openai": len(self.openai), "gcp": len(self.gcp)}
+
+    def disk_mtimes(self) -> Dict[str, Optional[int]]:
+        return {name: file_mtime(self.pricing_dir / name) for name in self.mtimes}
+
+    def changed_on_disk(self) -> bool:
+        """True if any pricing file's mtime differs from when this catalog was built."""
+        return self.disk_mtimes() != self.mtimes
+
+    def resolve(self, model_id: str, provider_hint: str = "") -> ModelSpec:
+        """
+        provider_hint is the host platform ("aws_bedrock", "openai", "gcp", ...); it only
+        decides pricing for model ids that name no known family.
+        """
+        key = (model_id, provider_hint)
+        spec = self._resolved.get(key)
+        if spec is None:
+            spec = self._build(model_id, provider_hint.lower())
+            self._resolved.put(key, spec)
+        return spec
+
+    def _build(self, model_id: str, hint: str) -> ModelSpec:
+        lowered = model_id.lower()
+        if "claude" in lowered or "anthropic" in hint:
+            return self._spec(model_id, "aws", "claude", "anthropic", self._claude_rates(lowered))
+        if "llama" in lowered or "meta" in hint:
+            return self._spec(model_id, "aws", "llama", "meta", self._llama_rates(lowered))
+        if "gpt" in lowered or _OPENAI_REASONING_ID.search(lowered) or "openai" in hint:
+            return self._spec(model_id, "openai", "openai", "openai", self._longest_match(self.openai, lowered))
+        if "gemini" in lowered or any(h in hint for h in ("gcp", "vertex", "google")):
+            return self._spec(model_id, "google", "gemini", "gcp", self._gcp_rates(lowered))
+        return ModelSpec(model_id, "aws" if "aws" in hint or "bedrock" in lowered else "other", None, None, None, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+    def _spec(self, model_id: str, provider: str, adapter: str, family: str, match: Optional[Rates]) -> ModelSpec:
+        if match is None:
+            input_rate, output_rate = DEFAULT_RATES[family]
+            return ModelSpec(model_id, provider, adapter, family, None, input_rate, output_rate, input_rate, output_rate, input_rate, input_rate)
+        return ModelSpec(model_id, provider, adapter, family, *match)
+
+    def _claude_rates(self, model_id: str) -> Optional[Rates]:
+        found = _CLAUDE_NEW_ID.search(model_id)
+        if found:
+            family, major, minor = found.groups()
+        else:
+            found = _CLAUDE_OLD_ID.search(model_id)
+            if not found:
+                return None
+            major, minor, family = found.groups()
+        version = f"{major}.{minor}" if minor else major
+        revision = "v2" if re.search(r"-v2(?::|$)", model_id) else ""
+        return self.claude.get((family, version, revision)) or self.claude.get((family, version, ""))
+
+    def _llama_rates(self, model_id: str) -> Optional[Rates]:
+        found = _LLAMA_ID.search(model_id)
+        if not found:
+            return None
+        major, minor, size = found.groups()
+        family = f"llama_{major}_{minor}" if minor else f"llama_{major}"
+        return self.llama.get((family, size, _llama_variant(model_id))) or self.llama.get((family, size, ""))
+
+    def _gcp_rates(self, model_id: str) -> Optional[Rates]:
+        clean = model_id.replace("google/", "")
+        for entry in self.gcp:
+            if entry[0] == clean:
+                return entry
+        return self._longest_match(self.gcp, clean) or next((e for e in self.gcp if clean in e[0]), None)
+
+    def _longest_match(self, entries: List[Rates], model_id: str) -> Optional[Rates]:
+        # entries are sorted longest name first
+        return next((entry for entry in entries if entry[0] in model_id), None)
+
+def _per_token(unit: int, *prices: float) -> Tuple[float, ...]:
+    return tuple(price / unit for price in prices)
+
+def _or(price: Optional[float], fallback: float) -> float:
+    # Pricing files use null for tiers a model does not offer
+    return fallback if price is None else price
+
+def file_mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def _llama_variant(name: str) -> str:
+    return next((variant for variant in _LLAMA_VARIANTS if variant in name), "")
+
+def _claude_name_key(name: str) -> Optional[Tuple[str, str, str]]:
+    """'Claude Sonnet 4.5' -> ('sonnet', '4.5', ''); 'Claude 3.5 Sonnet v2' -> ('sonnet', '3.5', 'v2')."""
+    found = _CLAUDE_NEW_NAME.match(name)
+    if found:
+        return found.group(1).lower(), found.group(2), ""
+    found = _CLAUDE_OLD_NAME.match(name)
+    if found:
+        return found.group(2).lower(), found.group(1), "v2" if found.group(3) else ""
+    # Variants such as "- Long Context" are priced per request, not by model id
+    return None
+
+model_catalog = ModelCatalog()
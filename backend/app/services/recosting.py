@@ -0,0 +1,178 @@
+import logging
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.db import engine as default_engine
+from app.services.pricing_service import PricingService, pricing_service
+from app.services.rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# Walks the table in rowid (storage) order so reads and the UPDATEs that follow touch
+# pages sequentially; the uuid primary key would scatter them across the file.
+_SELECT_CHUNK = (
+    "SELECT {key}, model_id, host_platform, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, total_cost, hedge_cost, "
+    "cache_hit, coalesced, pricing_version, batch_job_id IS NOT NULL FROM governancetelemetry "
+    "WHERE {key} > ? ORDER BY {key} LIMIT ?"
+)
+_UPDATE_ROW = (
+    "UPDATE governancetelemetry SET total_cost = ?, hedge_cost = ?, pricing_version = ? WHERE {key} = ?"
+)
+
+def _statements(engine: Engine) -> Tuple[str, str, Any]:
+    """SELECT / UPDATE in the driver's own placeholder style, and the keyset start value."""
+    if engine.dialect.name == "sqlite":
+        key, start = "rowid", 0
+    else:
+        # No rowid outside SQLite; page on the primary key instead
+        key, start = "id", ""
+    select_chunk, update_row = _SELECT_CHUNK.format(key=key), _UPDATE_ROW.format(key=key)
+    if engine.dialect.paramstyle in ("format", "pyformat"):
+        select_chunk, update_row = select_chunk.replace("?", "%s"), update_row.replace("?", "%s")
+    return select_chunk, update_row, start
+
+class RateTable:
+    """
+    Per-token rate vectors indexed by a dense code per (model_id, host_platform), so a
+    whole chunk is priced with two gathers instead of one catalog lookup per row.
+    """
+
+    def __init__(self, pricing: PricingService):
+        self.catalog = pricing.catalog  # pin one version for the whole job
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._input: List[float] = []
+        self._output: List[float] = []
+        self._batch_input: List[float] = []
+        self._batch_output: List[float] = []
+        self._cache_read: List[float] = []
+        self._cache_write: List[float] = []
+        self.input_rates = np.zeros(0)
+        self.output_rates = np.zeros(0)
+        self.batch_input_rates = np.zeros(0)
+        self.batch_output_rates = np.zeros(0)
+        self.cache_read_rates = np.zeros(0)
+        self.cache_write_rates = np.zeros(0)
+
+    def encode(self, model_ids: Tuple[str, ...], hosts: Tuple[str, ...]) -> np.ndarray:
+        codes = self._codes
+        grown = len(codes)
+        encoded = np.fromiter(
+            (codes.get(pair, -1) for pair in zip(model_ids, hosts)), dtype=np.int64, count=len(model_ids)
+        )
+        missing = np.flatnonzero(encoded < 0)
+        for i in missing:
+            pair = (model_ids[i], hosts[i])
+            if pair not in codes:
+                spec = self.catalog.resolve(*pair)
+                codes[pair] = len(self._input)
+                self._input.append(spec.input_rate)
+                self._output.append(spec.output_rate)
+                self._batch_input.append(spec.batch_input_rate)
+                self._batch_output.append(spec.batch_output_rate)
+                self._cache_read.append(spec.cache_read_rate)
+                self._cache_write.append(spec.cache_write_rate)
+            encoded[i] = codes[pair]
+        if len(codes) != grown:
+            self.input_rates = np.asarray(self._input)
+            self.output_rates = np.asarray(self._output)
+            self.batch_input_rates = np.asarray(self._batch_input)
+            self.batch_output_rates = np.asarray(self._batch_output)
+            self.cache_read_rates = np.asarray(self._cache_read)
+            self.cache_write_rates = np.asarray(self._cache_write)
+        return encoded
+
+def recost_telemetry(
+    pricing: PricingService = pricing_service,
+    engine: Engine = default_engine,
+    chunk_size: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Recomputes total_cost / hedge_cost of every GovernanceTelemetry row with the live
+    pricing table and stamps its pricing_version.
+
+    Rows are streamed in rowid order (keyset pagination), so memory stays bounded by
+    chunk_size; each chunk is priced with NumPy and written back in one executemany
+    UPDATE, touching only rows whose cost or version actually changes.
+    Cached and coalesced rows stay at zero cost, as when they were recorded.
+    """
+    chunk_size = chunk_size or settings.RECOST_CHUNK_SIZE
+    rates = RateTable(pricing)
+    version = rates.catalog.version
+    started = time.perf_counter()
+    report = {"rows": 0, "updated": 0, "chunks": 0, "cost_before": 0.0, "cost_after": 0.0}
+
+    select_chunk, update_row, after = _statements(engine)
+    while True:
+        # Plain DBAPI cursor: SQLAlchemy Row objects and per-row parameter
+        # compilation would cost more than the arithmetic itself
+        with engine.begin() as conn, closing(conn.connection.cursor()) as cursor:
+            cursor.execute(select_chunk, (after, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            ids, model_ids, hosts, input_tokens, output_tokens, cache_read, cache_write, total, hedge, cache_hit, coalesced, versions, batch = zip(*rows)
+            after = ids[-1]
+
+            codes = rates.encode(model_ids, hosts)
+            # Rows ingested from batch inference jobs are billed at the batch tier
+            batch = np.asarray(batch, dtype=bool)
+            # Prompt tokens read from / written to the provider's prompt cache have their own rates
+            cache_read = np.asarray(cache_read, dtype=np.float64)
+            cache_write = np.asarray(cache_write, dtype=np.float64)
+            uncached = np.maximum(np.asarray(input_tokens, dtype=np.float64) - cache_read - cache_write, 0.0)
+            base = (
+                uncached * np.where(batch, rates.batch_input_rates[codes], rates.input_rates[codes])
+                + cache_read * rates.cache_read_rates[codes]
+                + cache_write * rates.cache_write_rates[codes]
+                + np.asarray(output_tokens, dtype=np.float64) * np.where(batch, rates.batch_output_rates[codes], rates.output_rates[codes])
+            )
+            old_total = np.asarray(total, dtype=np.float64)
+            old_hedge = np.asarray(hedge, dtype=np.float64)
+            # Nothing was billed for answers served from cache or shared with another call
+            free = np.asarray(cache_hit, dtype=bool) | np.asarray(coalesced, dtype=bool)
+            base[free] = 0.0
+            # A hedged duplicate is a full second copy of the call
+            new_hedge = np.where(old_hedge > 0, base, 0.0)
+            new_total = base + new_hedge
+
+            changed = (
+                ~np.isclose(new_total, old_total, rtol=1e-9, atol=1e-12)
+                | ~np.isclose(new_hedge, old_hedge, rtol=1e-9, atol=1e-12)
+                | (np.asarray(versions, dtype=object) != version)
+            )
+            selected = np.flatnonzero(changed)
+            if selected.size and not dry_run:
+                cursor.executemany(update_row, [
+                    (t, h, version, ids[i])
+                    for i, t, h in zip(selected.tolist(), new_total[selected].tolist(), new_hedge[selected].tolist())
+                ])
+
+            report["rows"] += len(ids)
+            report["updated"] += int(selected.size)
+            report["chunks"] += 1
+            report["cost_before"] += float(old_total.sum())
+            report["cost_after"] += float(new_total.sum())
+
+    if report["updated"] and not dry_run:
+        # Cost sums changed under the rollups; recompute them in one pass
+        rebuild_rollups(engine)
+
+    report["pricing_version"] = version
+    report["dry_run"] = dry_run
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(
+        "Re-costed %d telemetry rows (%d changed) with pricing %s in %sms%s",
+        report["rows"], report["updated"], version, report["elapsed_ms"], " (dry run)" if dry_run else ""
+    )
+    return report
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    recost_telemetry(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,158 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+import openai
+from botocore.exceptions import ClientError
+from google.genai import errors as genai_errors
+from app.core.config import settings
+from app.core.deadline import Deadline
+
+# Bedrock error codes worth another attempt; everything else (validation, access denied,
+# unknown model) fails the same way every time.
+RETRYABLE_BEDROCK_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+}
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class StreamInterrupted(Exception):
+    """A streamed call failed after text was already forwarded; retrying would repeat it."""
+    pass
+
+def is_retryable(exc: BaseException) -> bool:
+    """Classifies a provider error as transient (retry) or fatal (fail immediately)."""
+    if isinstance(exc, ClientError):
+        error = exc.response.get("Error", {})
+        status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return error.get("Code") in RETRYABLE_BEDROCK_CODES or status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, openai.APITimeoutError):
+        # The SDK timeout is the remaining deadline; nothing is left to retry with
+        return False
+    if isinstance(exc, openai.RateLimitError):
+        # An exhausted quota will not recover within this request
+        return getattr(exc, "code", None) != "insufficient_quota"
+    if isinstance(exc, (openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, httpx.TimeoutException):
+        return False
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return False
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Server-suggested delay (Retry-After header) if the error carries one."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None and isinstance(exc, ClientError):
+        headers = exc.response.get("ResponseMetadata", {}).get("HTTPHeaders")
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class RetryBudget:
+    """
+    Global cap on retries so they cannot amplify an outage: every first attempt
+    deposits `ratio` tokens and every retry spends one, so sustained retries stay
+    under ratio x request volume. The balance starts full at `capacity`, which
+    bounds how many retries a burst of failures can trigger.
+    """
+
+    def __init__(self, ratio: float, capacity: int):
+        self.ratio = ratio
+        self.capacity = float(capacity)
+        self.balance = float(capacity)
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.balance < 1:
+            self.exhausted += 1
+            return False
+        self.balance -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+            "balance": round(self.balance, 2),
+            "ratio": self.ratio,
+        }
+
+class AttemptLog:
+    """Per-call record of how many attempts were made and why earlier ones failed."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors: List[str] = []
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient provider errors.
+    Each attempt gets the remaining deadline as its timeout, and no retry is started
+    if its backoff would outlive the deadline or the global budget is spent.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, budget: RetryBudget):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def backoff(self, retry: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (retry - 1))))
+        suggested = _retry_after(exc)
+        if suggested is not None:
+            delay = max(delay, min(suggested, self.max_delay))
+        return delay
+
+    async def run(
+        self,
+        attempt: Callable[[Optional[float]], Awaitable[Any]],
+        deadline: Optional[Deadline] = None,
+        log: Optional[AttemptLog] = None,
+        label: str = "provider call"
+    ) -> Any:
+        log = log or AttemptLog()
+        self.budget.record_request()
+        while True:
+            log.count += 1
+            try:
+                return await attempt(deadline.remaining() if deadline else None)
+            except Exception as e:
+                if log.count >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.backoff(log.count, e)
+                if deadline is not None and delay >= deadline.remaining():
+                    raise
+                if not self.budget.try_spend():
+                    print(f"Retry budget exhausted, not retrying {label}")
+                    raise
+                log.errors.append(type(e).__name__)
+                print(f"Retrying {label} in {delay:.2f}s after {type(e).__name__} (attempt {log.count})")
+                await asyncio.sleep(delay)
+
+retry_policy = RetryPolicy(
+    max_attempts=settings.RETRY_MAX_ATTEMPTS,
+    base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+    max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+    budget=RetryBudget(ratio=settings.RETRY_BUDGET_RATIO, capacity=settings.RETRY_BUDGET_CAPACITY)
+)
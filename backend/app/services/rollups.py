@@ -0,0 +1,176 @@
+"""
+Incremental maintenance of TelemetryRollup.
+
+Every code path that inserts, rescores or deletes GovernanceTelemetry rows calls
+apply() / apply_async() in the same transaction with the rows' old and new
+states; the measures are added to (or subtracted from) the hour and day buckets
+by upsert, and the analytics result cache is invalidated when it commits. rebuild() recomputes the whole table from raw rows with the same
+contribution(), e.g. after a bulk re-cost or to repair drift.
+
+    python -m app.services.rollups    # rebuild from DATABASE_URL
+"""
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.models.rollup import TelemetryRollup
+from app.models.telemetry import GovernanceTelemetry
+from app.services.analytics_cache import analytics_cache
+
+# Bucket label format per grain (UTC)
+GRAINS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+KEY = ("grain", "bucket", "model_id", "host_platform", "query_category", "governance_context")
+PHASES = ("db_setup_ms", "guardrail_ms", "provider_call_ms", "time_to_first_token_ms", "evaluation_ms", "persistence_ms")
+MEASURES = (
+    "request_count", "accuracy_sum", "accuracy_sumsq", "cost_sum", "cost_sumsq", "latency_sum",
+    "online_count", "online_latency_sum", "online_latency_sumsq", "input_tokens_sum", "output_tokens_sum",
+    "paid_count", "paid_accuracy_sum", "scored_count", "scored_accuracy_sum", "scored_accuracy_sumsq",
+) + tuple(f"{phase}_{part}" for phase in PHASES for part in ("count", "sum"))
+# Telemetry columns a row's contribution depends on
+SOURCE_COLUMNS = (
+    "timestamp", "model_id", "host_platform", "query_category", "governance_context", "accuracy_score",
+    "total_cost", "latency_ms", "batch_job_id", "input_tokens", "output_tokens", "scored",
+) + PHASES
+
+RollupKey = Tuple[str, str, str, str, str, str]
+# Keys per pruning DELETE (six bound parameters each; stays under SQLite's old 999 limit)
+PRUNE_CHUNK = 150
+
+def snapshot(row: Any) -> Dict[str, Any]:
+    """The values of row that feed the rollups; take one before mutating a row in place."""
+    return {column: getattr(row, column) for column in SOURCE_COLUMNS}
+
+def _values(row: Any) -> Mapping[str, Any]:
+    return row if isinstance(row, Mapping) else snapshot(row)
+
+def contribution(row: Any) -> Dict[str, float]:
+    """Measures a single telemetry row adds to each of its buckets."""
+    values = _values(row)
+    accuracy = values["accuracy_score"] or 0.0
+    cost = values["total_cost"] or 0.0
+    latency = values["latency_ms"] or 0.0
+    online = values["batch_job_id"] is None
+    scored = bool(values["scored"])
+    measures = {
+        "request_count": 1,
+        "accuracy_sum": accuracy,
+        "accuracy_sumsq": accuracy * accuracy,
+        "cost_sum": cost,
+        "cost_sumsq": cost * cost,
+        "latency_sum": latency,
+        "online_count": 1 if online else 0,
+        "online_latency_sum": latency if online else 0.0,
+        "online_latency_sumsq": latency * latency if online else 0.0,
+        "input_tokens_sum": values["input_tokens"] or 0,
+        "output_tokens_sum": values["output_tokens"] or 0,
+        "paid_count": 1 if cost > 0 else 0,
+        "paid_accuracy_sum": accuracy if cost > 0 else 0.0,
+        "scored_count": 1 if scored else 0,
+        "scored_accuracy_sum": accuracy if scored else 0.0,
+        "scored_accuracy_sumsq": accuracy * accuracy if scored else 0.0,
+    }
+    for phase in PHASES:
+        ms = values[phase]
+        measures[f"{phase}_count"] = 0 if ms is None else 1
+        measures[f"{phase}_sum"] = ms or 0.0
+    return measures
+
+def keys(row: Any) -> List[RollupKey]:
+    values = _values(row)
+    dims = (values["model_id"], values["host_platform"], values["query_category"] or "", values["governance_context"])
+    return [(grain, values["timestamp"].strftime(fmt)) + dims for grain, fmt in GRAINS.items()]
+
+def deltas(added: Iterable[Any] = (), removed: Iterable[Any] = ()) -> Dict[RollupKey, Dict[str, float]]:
+    """Net change per rollup key for rows entering (added) and leaving (removed) the aggregates."""
+    totals: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for rows, sign in ((added, 1), (removed, -1)):
+        for row in rows:
+            measures = contribution(row)
+            for key in keys(row):
+                bucket = totals[key]
+                for name, value in measures.items():
+                    bucket[name] += sign * value
+    return totals
+
+def _params(totals: Dict[RollupKey, Dict[str, float]]) -> List[Dict[str, Any]]:
+    return [{**dict(zip(KEY, key)), **measures} for key, measures in totals.items()]
+
+def _upsert(dialect: str):
+    table = TelemetryRollup.__table__
+    if dialect == "sqlite":
+        statement = sqlite_insert(table)
+    elif dialect == "postgresql":
+        statement = postgresql_insert(table)
+    else:
+        raise ValueError(f"Telemetry rollups need INSERT ... ON CONFLICT, not available on {dialect}")
+    return statement.on_conflict_do_update(
+        index_elements=list(KEY),
+        set_={name: table.c[name] + statement.excluded[name] for name in MEASURES}
+    )
+
+def _prunes(removed: List[Any]):
+    """DELETEs for the buckets the removed rows may have emptied, found by key (uq_telemetryrollup_key), not a scan."""
+    table = TelemetryRollup.__table__
+    pruned = sorted({key for row in removed for key in keys(row)})
+    for start in range(0, len(pruned), PRUNE_CHUNK):
+        # One equality term per key, each a unique index lookup (SQLite scans for a row-value IN)
+        yield delete(table).where(
+            or_(*(
+                and_(*(table.c[column] == value for column, value in zip(KEY, key)))
+                for key in pruned[start:start + PRUNE_CHUNK]
+            )),
+            table.c.request_count <= 0
+        )
+
+def apply(session: Session, added: Iterable[Any] = (), removed: Iterable[Any] = ()) -> None:
+    """Folds rows into (added) or out of (removed, e.g. pre-update snapshots) the rollups."""
+    removed = list(removed)
+    params = _params(deltas(added, removed))
+    if params:
+        session.exec(_upsert(session.get_bind().dialect.name), params=params)
+    for prune in _prunes(removed):
+        session.exec(prune)
+    analytics_cache.mark(session)
+
+async def apply_async(session: AsyncSession, added: Iterable[Any] = (), removed: Iterable[Any] = ()) -> None:
+    """apply() for AsyncSession."""
+    removed = list(removed)
+    params = _params(deltas(added, removed))
+    if params:
+        await session.exec(_upsert(session.get_bind().dialect.name), params=params)
+    for prune in _prunes(removed):
+        await session.exec(prune)
+    analytics_cache.mark(session)
+
+def rebuild(conn: Connection, chunk_size: Optional[int] = None) -> int:
+    """Replaces every rollup with aggregates recomputed from raw telemetry; returns the bucket count."""
+    telemetry = GovernanceTelemetry.__table__
+    rows = conn.execution_options(yield_per=chunk_size or settings.RECOST_CHUNK_SIZE).execute(
+        select(*(telemetry.c[column] for column in SOURCE_COLUMNS))
+    )
+    totals = deltas(row._mapping for row in rows)
+    conn.execute(delete(TelemetryRollup.__table__))
+    params = _params(totals)
+    if params:
+        conn.execute(insert(TelemetryRollup.__table__), params)
+    return len(params)
+
+def rebuild_rollups(engine: Engine) -> Dict[str, Any]:
+    started = time.perf_counter()
+    # One transaction: readers see either the old or the rebuilt rollups
+    with engine.begin() as conn:
+        buckets = rebuild(conn)
+    analytics_cache.bump()
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    print(f"Rebuilt {buckets} telemetry rollup buckets in {elapsed_ms}ms")
+    return {"buckets": buckets, "elapsed_ms": elapsed_ms}
+
+if __name__ == "__main__":
+    from app.core.db import engine
+    rebuild_rollups(engine)
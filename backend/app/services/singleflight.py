@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, later
+    callers with the same key await the same task instead of starting their own.
+    The shared task is cancelled only when every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared) where shared is True if another caller started the call."""
+        self.calls += 1
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # Shielded so one caller's timeout doesn't cancel the call for the others
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if self._waiters.get(key, 0) <= 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(key, 0) - 1
+            if remaining > 0:
+                self._waiters[key] = remaining
+            else:
+                self._waiters.pop(key, None)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,95 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.core.executor import invocation_executor
+from app.utils.cache import TTLCache
+from app.utils.common import content_hash, normalize_query
+
+class VerdictCache:
+    """
+    Memoizes judge verdicts keyed by (evaluator model, query hash, response hash).
+    The first tier is a bounded in-memory TTLCache; when a path is configured a
+    SQLite file backs it so verdicts survive restarts and are shared by workers.
+    The async variants run the SQLite tier (a read, or a commit plus fsync) on the
+    shared invocation executor, off the event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(max_entries, ttl_seconds)
+        self.path = path
+        self.persistent_hits = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "model_id TEXT NOT NULL, query_hash TEXT NOT NULL, response_hash TEXT NOT NULL, "
+                "verdict TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (model_id, query_hash, response_hash))"
+            )
+            self._conn.commit()
+
+    def key(self, model_id: str, query: str, response: str) -> Tuple[str, str, str]:
+        return (model_id, content_hash(normalize_query(query)), content_hash(response))
+
+    def get(self, model_id: str, query: str, response: str) -> Optional[Dict[str, Any]]:
+        key = self.key(model_id, query, response)
+        verdict = self.memory.get(key)
+        if verdict is None and self._conn is not None:
+            verdict = self._load_into_memory(key)
+        # Callers may annotate the verdict, so never hand out the cached dict itself
+        return dict(verdict) if verdict is not None else None
+
+    async def get_async(self, model_id: str, query: str, response: str) -> Optional[Dict[str, Any]]:
+        key = self.key(model_id, query, response)
+        verdict = self.memory.get(key)
+        if verdict is None and self._conn is not None:
+            verdict = await invocation_executor.run(self._load_into_memory, key)
+        return dict(verdict) if verdict is not None else None
+
+    def put(self, model_id: str, query: str, response: str, verdict: Dict[str, Any]) -> None:
+        key = self.key(model_id, query, response)
+        self.memory.put(key, dict(verdict))
+        if self._conn is not None:
+            self._store(key, verdict)
+
+    async def put_async(self, model_id: str, query: str, response: str, verdict: Dict[str, Any]) -> None:
+        key = self.key(model_id, query, response)
+        self.memory.put(key, dict(verdict))
+        if self._conn is not None:
+            await invocation_executor.run(self._store, key, verdict)
+
+    def _load_into_memory(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        verdict = self._load(key)
+        if verdict is not None:
+            self.persistent_hits += 1
+            self.memory.put(key, verdict)
+        return verdict
+
+    def _store(self, key: Tuple[str, str, str], verdict: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(verdict), time.time())
+            )
+            self._conn.commit()
+
+    def _load(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT verdict FROM verdicts "
+                "WHERE model_id = ? AND query_hash = ? AND response_hash = ? AND created_at > ?",
+                (*key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["persistent"] = self._conn is not None
+        stats["persistent_hits"] = self.persistent_hits
+        return stats
@@ -0,0 +1,230 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.telemetry import GovernanceTelemetry
+from app.services import rollups
+from app.services.db_service import apply_accuracy, telemetry_from_log
+
+# Durability modes
+DURABILITY_ASYNC = "async"    # return once queued; a crash loses what is still queued
+DURABILITY_COMMIT = "commit"  # wait for the group commit that includes the write
+
+class _Write:
+    __slots__ = ("kind", "args", "started", "done")
+
+    def __init__(self, kind: str, args: tuple, done: Optional[asyncio.Future] = None):
+        self.kind = kind  # conversation, response, accuracy, barrier
+        self.args = args
+        self.started = time.perf_counter()
+        self.done = done
+
+class WriteBehindWriter:
+    """
+    Single writer for the request path's conversation, message and telemetry rows.
+
+    Callers only enqueue; one background task drains the bounded queue and commits
+    whatever has accumulated (up to batch_size writes) in a single transaction, so
+    concurrent analyses share one commit instead of paying one each. Writes are
+    applied in queue order, so an accuracy update always follows its telemetry row.
+
+    In "commit" durability mode, add_response() and update_accuracy() return only
+    once their batch is committed; in "async" mode they return as soon as the write
+    is queued. flush() waits for everything queued so far; stop() flushes and ends
+    the writer (app lifespan and worker shutdown).
+    """
+
+    def __init__(
+        self,
+        max_queue: int = settings.WRITE_BEHIND_MAX_QUEUE,
+        batch_size: int = settings.WRITE_BEHIND_BATCH_SIZE,
+        linger_ms: float = settings.WRITE_BEHIND_LINGER_MS,
+        durability: str = settings.WRITE_BEHIND_DURABILITY
+    ):
+        if durability not in (DURABILITY_ASYNC, DURABILITY_COMMIT):
+            raise ValueError(f"Unknown write-behind durability mode: {durability}")
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.linger_ms = linger_ms
+        self.durability = durability
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writes = 0
+        self._commits = 0
+        self._failed = 0
+        self._max_batch = 0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            # Started on first use, on the caller's event loop (the app's, a worker's or a test's)
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = loop.create_task(self._run())
+        return self._queue
+
+    async def _enqueue(self, kind: str, *args: Any, wait: bool = False) -> Any:
+        queue = self._ensure_started()
+        write = _Write(kind, args, asyncio.get_running_loop().create_future() if wait else None)
+        # Blocks only when the queue is full: backpressure instead of unbounded memory
+        await queue.put(write)
+        if write.done is None:
+            return None
+        return await write.done
+
+    async def add_conversation(self, title: str, first_message: Optional[str] = None) -> str:
+        """Queues a conversation (and its opening user message); returns its id right away."""
+        conv = Conversation(title=title)
+        await self._enqueue("conversation", conv, first_message)
+        return conv.id
+
+    async def add_response(self, conversation_id: str, log_data: dict) -> float:
+        """
+        Queues the assistant message and its telemetry row and returns the persistence
+        time in ms. In commit mode that is the row's own persistence_ms (queue wait plus
+        write, up to its commit); in async mode only the time taken to enqueue.
+        """
+        started = time.perf_counter()
+        if self.durability == DURABILITY_COMMIT:
+            telemetry = await self._enqueue("response", conversation_id, log_data, wait=True)
+            return telemetry.persistence_ms
+        await self._enqueue("response", conversation_id, log_data)
+        return (time.perf_counter() - started) * 1000
+
+    async def update_accuracy(self, trace_id: str, accuracy: dict, evaluation_ms: Optional[float] = None) -> None:
+        """Queues the evaluator verdict for a telemetry row (see DBService.update_telemetry_accuracy)."""
+        await self._enqueue("accuracy", trace_id, accuracy, evaluation_ms, wait=self.durability == DURABILITY_COMMIT)
+
+    async def flush(self) -> None:
+        """Waits until every write queued before this call is committed (or has failed)."""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._enqueue("barrier", wait=True)
+
+    async def stop(self) -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            # Whatever queued up during the last commit goes into this one; optionally
+            # linger briefly so a burst of concurrent responses shares the fsync
+            deadline = time.perf_counter() + self.linger_ms / 1000
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[_Write]) -> None:
+        writes = [write for write in batch if write.kind != "barrier"]
+        try:
+            results = await self._write(writes)
+        except Exception as e:
+            # One bad row must not sink the rest of the batch: retry each on its own
+            print(f"Write-behind batch of {len(writes)} failed ({e}); retrying individually")
+            results = []
+            for write in writes:
+                try:
+                    results.extend(await self._write([write]))
+                except Exception as single_error:
+                    print(f"Write-behind {write.kind} write failed: {single_error}")
+                    self._failed += 1
+                    results.append(single_error)
+        for write, result in zip(writes, results):
+            _settle(write, result)
+        for write in batch:
+            if write.kind == "barrier":
+                _settle(write, None)
+
+    async def _write(self, writes: List[_Write]) -> List[Any]:
+        """All writes in one transaction; returns each write's row."""
+        if not writes:
+            return []
+        results = []
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            # Telemetry inserted in this batch, so a verdict queued right behind it needs no lookup
+            inserted: Dict[str, GovernanceTelemetry] = {}
+            # Existing rows rescored in this batch, with their state before the first change
+            rescored: Dict[str, GovernanceTelemetry] = {}
+            before: List[Dict[str, Any]] = []
+            for write in writes:
+                if write.kind == "conversation":
+                    conv, first_message = write.args
+                    session.add(conv)
+                    if first_message is not None:
+                        session.add(Message(conversation_id=conv.id, role="user", content=first_message))
+                    results.append(conv)
+                elif write.kind == "response":
+                    conversation_id, log_data = write.args
+                    msg = Message(conversation_id=conversation_id, role="assistant", content=log_data.get("response_text") or "")
+                    telemetry = telemetry_from_log(msg.id, log_data)
+                    session.add(msg)
+                    session.add(telemetry)
+                    inserted[telemetry.trace_id] = telemetry
+                    results.append(telemetry)
+                else:
+                    trace_id, accuracy, evaluation_ms = write.args
+                    telemetry = inserted.get(trace_id) or (await session.exec(
+                        select(GovernanceTelemetry).where(GovernanceTelemetry.trace_id == trace_id)
+                    )).first()
+                    if telemetry is not None:
+                        if trace_id not in inserted and trace_id not in rescored:
+                            rescored[trace_id] = telemetry
+                            before.append(rollups.snapshot(telemetry))
+                        apply_accuracy(telemetry, accuracy, evaluation_ms)
+                        session.add(telemetry)
+                    results.append(telemetry)
+            now = time.perf_counter()
+            for write, result in zip(writes, results):
+                if write.kind == "response":
+                    result.persistence_ms = (now - write.started) * 1000
+            await rollups.apply_async(session, added=[*inserted.values(), *rescored.values()], removed=before)
+            await session.commit()
+        self._writes += len(writes)
+        self._commits += 1
+        self._max_batch = max(self._max_batch, len(writes))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "durability": self.durability,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "writes": self._writes,
+            "commits": self._commits,
+            "failed": self._failed,
+            "avg_batch": round(self._writes / self._commits, 2) if self._commits else 0.0,
+            "max_batch": self._max_batch,
+        }
+
+def _settle(write: _Write, result: Any) -> None:
+    # A caller that gave up waiting (cancelled request) leaves a done future behind
+    if write.done is None or write.done.done():
+        return
+    if isinstance(result, Exception):
+        write.done.set_exception(result)
+    else:
+        write.done.set_result(result)
+
+write_behind = WriteBehindWriter()
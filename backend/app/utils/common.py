@@ -0,0 +1,12 @@
+import hashlib
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt, used for cache keys."""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+def content_hash(text: str) -> str:
+    """Stable SHA-256 hex digest of a prompt or response."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+class PhaseTimer:
+    """
+    Wall-clock duration (ms) of each named phase of one analysis, e.g. db_setup,
+    guardrail, provider_call, evaluation, persistence. Repeated phases accumulate.
+    """
+
+    def __init__(self, **known_ms: float):
+        self.phases: Dict[str, float] = {name: ms for name, ms in known_ms.items() if ms is not None}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name: str, ms: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def get(self, name: str) -> Optional[float]:
+        return self.phases.get(name)
+
+    def copy(self) -> "PhaseTimer":
+        return PhaseTimer(**self.phases)
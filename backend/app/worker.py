@@ -0,0 +1,160 @@
+"""
+Standalone job worker: drains the durable job queue (POST /api/v1/jobs, and
+re-costs queued by POST /api/v1/system/pricing/recost).
+
+    python -m app.worker
+
+Run as many as needed, on any host that shares the database; each claims one job
+at a time under a lease and checkpoints every (query, model) cell as it finishes.
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import uuid
+from typing import Optional
+from app.core.config import settings
+from app.core.db import init_db
+from app.core.executor import invocation_executor
+from app.models.job import Job, JobCell
+from app.services import ai_engine
+from app.services.job_queue import JOB_KIND_RECOST, JobQueue, job_queue
+from app.services.pricing_service import pricing_service
+from app.services.recosting import recost_telemetry
+from app.services.write_behind import write_behind
+
+class Worker:
+    def __init__(
+        self,
+        queue: JobQueue = job_queue,
+        worker_id: Optional[str] = None,
+        concurrency: int = settings.JOB_CELL_CONCURRENCY,
+        poll_interval: float = settings.JOB_WORKER_POLL_SECONDS
+    ):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+
+    async def run_forever(self, stop: asyncio.Event) -> None:
+        print(f"Worker {self.worker_id} started")
+        while not stop.is_set():
+            job = await invocation_executor.run(self.queue.claim, self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            processing = asyncio.create_task(self.process(job))
+            stopping = asyncio.create_task(stop.wait())
+            await asyncio.wait({processing, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            stopping.cancel()
+            if not processing.done():
+                # Shutting down mid-job: hand it back; checkpointed cells are kept
+                processing.cancel()
+                await asyncio.gather(processing, return_exceptions=True)
+                await invocation_executor.run(self.queue.release, job.id, self.worker_id)
+                print(f"Worker {self.worker_id} released job {job.id}")
+        print(f"Worker {self.worker_id} stopped")
+
+    async def run_once(self) -> bool:
+        """Claims and runs a single job; False if the queue had nothing runnable."""
+        job = await invocation_executor.run(self.queue.claim, self.worker_id)
+        if job is None:
+            return False
+        await self.process(job)
+        return True
+
+    async def process(self, job: Job) -> None:
+        print(f"Worker {self.worker_id} running job {job.id} (attempt {job.attempts})")
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, asyncio.current_task()))
+        try:
+            if job.kind == JOB_KIND_RECOST:
+                # Price with the table on disk now, which the API's dry run also used, not the
+                # one this process loaded at startup
+                await invocation_executor.run(pricing_service.reload)
+                report = await invocation_executor.run(recost_telemetry)
+                await invocation_executor.run(self.queue.finish, job.id, self.worker_id, report)
+                print(f"Worker {self.worker_id} finished job {job.id}")
+                return
+            queries = json.loads(job.queries)
+            conversation_ids = json.loads(job.conversation_ids)
+            limit = asyncio.Semaphore(self.concurrency)
+            # Failed cells stay pending until they run out of attempts
+            while True:
+                cells = await invocation_executor.run(self.queue.pending_cells, job.id)
+                if not cells:
+                    break
+                await asyncio.gather(*(
+                    self._run_cell(job, cell, queries[cell.query_index], conversation_ids[cell.query_index], limit)
+                    for cell in cells
+                ))
+            await invocation_executor.run(self.queue.finish, job.id, self.worker_id)
+            print(f"Worker {self.worker_id} finished job {job.id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Worker {self.worker_id} failed job {job.id}: {e}")
+            await invocation_executor.run(self.queue.fail_attempt, job.id, self.worker_id, str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _run_cell(self, job: Job, cell: JobCell, query: str, conversation_id: str, limit: asyncio.Semaphore) -> None:
+        # A previous run may have written the cell's row and died before checkpointing it
+        trace_id = await invocation_executor.run(self.queue.cell_trace, cell.id)
+        if trace_id is not None:
+            await invocation_executor.run(self.queue.record_cell, cell.id, True, trace_id)
+            return
+        async with limit:
+            log_entry = await ai_engine.analyze_governance(
+                query=query,
+                provider_str=cell.host_platform,
+                model_id=cell.model_id,
+                conversation_id=conversation_id,
+                evaluator_model=job.evaluator_model or "gemini-2.5-pro",
+                governance_context=job.governance_context,
+                evaluate=job.evaluator_model is not None,
+                # Nothing scores a job's rows afterwards
+                unscored_rationale=ai_engine.NOT_EVALUATED,
+                job_cell_id=cell.id
+            )
+        # Never checkpoint a cell whose telemetry is still only queued
+        await write_behind.flush()
+        await invocation_executor.run(
+            self.queue.record_cell, cell.id, log_entry.success, log_entry.trace_id, log_entry.error_message
+        )
+
+    async def _heartbeat(self, job_id: str, processing: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await invocation_executor.run(self.queue.heartbeat, job_id, self.worker_id):
+                # Lease lost (e.g. a long stall): another worker owns the job now
+                print(f"Worker {self.worker_id} lost the lease on job {job_id}")
+                processing.cancel()
+                return
+
+async def main() -> None:
+    init_db()
+    invocation_executor.start()
+    # Comparison jobs are priced as they run, so follow pricing changes like the API does
+    pricing_watcher = None
+    if settings.PRICING_RELOAD_INTERVAL_SECONDS > 0:
+        pricing_watcher = asyncio.create_task(pricing_service.watch(settings.PRICING_RELOAD_INTERVAL_SECONDS))
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await Worker().run_forever(stop)
+    finally:
+        if pricing_watcher is not None:
+            pricing_watcher.cancel()
+        await write_behind.stop()
+        await ai_engine.aclose()
+        invocation_executor.shutdown(wait=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Re-costing throughput on a synthetic telemetry table.
+
+Run from backend/:  python -m benchmarks.bench_recost [rows]
+"""
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+import app.models  # noqa: F401  (registers tables on SQLModel.metadata)
+from app.services.recosting import recost_telemetry
+
+MODELS = [
+    ("us.anthropic.claude-sonnet-4-5-20250929-v1:0", "ModelProvider.AWS"),
+    ("us.meta.llama3-3-70b-instruct-v1:0", "ModelProvider.AWS"),
+    ("gpt-4o-mini", "ModelProvider.OPENAI"),
+    ("gpt-4o", "ModelProvider.OPENAI"),
+    ("gemini-2.5-flash", "ModelProvider.GOOGLE"),
+]
+
+def main(rows: int = 1_000_000):
+    path = Path(tempfile.mkdtemp()) / "bench.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    insert = text(
+        "INSERT INTO governancetelemetry (id, trace_id, governance_context, host_platform, model_id, latency_ms, "
+        "input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, total_cost, hedge_cost, cache_hit, coalesced, "
+        "attempts, accuracy_score, evaluator_cost, timestamp) "
+        "VALUES (:id, 't', 'aws', :host, :model, 1.0, :inp, :out, 0, 0, 0.01, 0.0, 0, 0, 1, 0.0, 0.0, '2025-01-01')"
+    )
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, rows, 100_000):
+            batch = []
+            for _ in range(min(100_000, rows - start)):
+                model, host = random.choice(MODELS)
+                batch.append({"id": str(uuid.uuid4()), "host": host, "model": model, "inp": random.randint(10, 4000), "out": random.randint(10, 2000)})
+            conn.execute(insert, batch)
+    print(f"seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    for label in ("dry run", "write", "rerun"):
+        report = recost_telemetry(engine=engine, dry_run=label == "dry run")
+        print(f"{label:8}: {report['rows']} rows, {report['updated']} updated, {report['elapsed_ms'] / 1000:.2f}s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+import app.models  # noqa: F401  (registers tables on SQLModel.metadata)
+from app.core.db import make_async_engine, make_engine
+from app.core.migrations import migrate
+from app.services.analytics_cache import analytics_cache
+
+
+@pytest.fixture
+def db_engine(monkeypatch, tmp_path):
+    """Throwaway SQLite engine (production pragma profile) swapped in for the services that write to the DB."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+    # Same file for the async request path; NullPool because every test runs its own event loop
+    async_engine = make_async_engine(url, poolclass=NullPool)
+    monkeypatch.setattr("app.services.db_service.engine", engine)
+    monkeypatch.setattr("app.services.db_service.async_engine", async_engine)
+    monkeypatch.setattr("app.services.job_queue.engine", engine)
+    monkeypatch.setattr("app.services.write_behind.async_engine", async_engine)
+    # Tests read rows back as soon as the analysis returns
+    monkeypatch.setattr("app.services.write_behind.write_behind.durability", "commit")
+    # Cached analytics from another test's database must not be served
+    analytics_cache.clear()
+    yield engine
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+@pytest.fixture
+def telemetry_log():
+    """Factory for the GovernanceLog dicts (as .model_dump()) the telemetry writers take."""
+    def make(
+        model_id, trace_id=None, score=0.0, cost=0.001, latency=100.0,
+        input_tokens=10, output_tokens=20, batch_job_id=None, timings=None, **accuracy
+    ):
+        return {
+            "trace_id": trace_id or f"trace-{model_id}",
+            "provider": "openai",
+            "model_id": model_id,
+            "tags": {"governance_context": "aws"},
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens, "latency_ms": latency},
+            "cost": {"total_cost": cost},
+            # query_category, rationale, scored, ...
+            "accuracy": {"score": score, **accuracy},
+            "timings": timings or {},
+            "batch_job_id": batch_job_id,
+            "response_text": f"{model_id} says no",
+        }
+    return make
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(limits, max_wait=1.0, output_token_estimate=0):
+    return AdmissionController(
+        provider_limits={"openai": limits},
+        model_limits={},
+        max_wait=max_wait,
+        output_token_estimate=output_token_estimate
+    )
+
+
+def test_concurrency_cap_queues_excess_callers():
+    controller = _controller({"concurrency": 2})
+    running = []
+    peak = []
+
+    async def call():
+        async with controller.admit("openai", "gpt-4o", "hello"):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+
+    async def burst():
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    asyncio.run(burst())
+
+    stats = controller.stats()[0]
+    assert max(peak) == 2
+    assert stats["admitted"] == 5 and stats["queued"] >= 3 and stats["active"] == 0
+
+
+def test_rate_limit_rejects_when_queueing_window_is_too_short():
+    controller = _controller({"rpm": 1}, max_wait=0.05)
+
+    async def twice():
+        async with controller.admit("openai", "gpt-4o", "hello"):
+            pass
+        async with controller.admit("openai", "gpt-4o", "hello"):
+            pass
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(twice())
+    assert controller.stats()[0]["rejected"] == 1
+
+
+def test_token_estimate_is_reconciled_with_actual_usage():
+    controller = _controller({"tpm": 6000}, output_token_estimate=1000)
+
+    async def call():
+        async with controller.admit("openai", "gpt-4o", "x" * 400) as ticket:
+            assert ticket.estimated_tokens == 1100
+            ticket.actual_tokens = 100
+
+    asyncio.run(call())
+
+    assert controller.stats()[0]["tpm_available"] == pytest.approx(5900, abs=1)
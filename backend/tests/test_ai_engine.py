@@ -0,0 +1,387 @@
+import asyncio
+import time
+import httpx
+from botocore.exceptions import ClientError
+from sqlmodel import Session, select
+
+from app.models.telemetry import GovernanceTelemetry
+from app.core.deadline import Deadline
+from app.schemas.requests import ModelConfig
+from app.services import ai_engine
+from app.services.hedging import LatencyTracker
+from app.services.retry import RetryBudget, RetryPolicy
+from app.services.singleflight import SingleFlight
+from app.utils.timing import PhaseTimer
+from app.utils.cache import TTLCache
+
+
+def _fake_invoke(delay: float):
+    async def invoke(model_id, prompt, timeout=None):
+        await asyncio.sleep(delay)
+        return {"response_text": f"answer from {model_id}", "input_tokens": 10, "output_tokens": 20}
+    return invoke
+
+
+async def _fake_evaluate(query, response, model_id="gemini-2.5-pro", timeout=None):
+    return {"score": 80, "rationale": "ok", "query_category": "Straightforward"}
+
+
+def test_batch_runs_models_concurrently(monkeypatch, db_engine):
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", _fake_invoke(0.2))
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+    configs = [ModelConfig(host_platform="aws_bedrock", model_id=f"anthropic.model-{i}") for i in range(5)]
+
+    started = time.perf_counter()
+    results = asyncio.run(ai_engine.analyze_governance_batch("is my bucket public?", configs, batch_evaluation=False))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.2 * len(configs)
+    assert [r.model_id for r in results] == [c.model_id for c in configs]
+    assert all(r.success and r.accuracy.score == 80 for r in results)
+    with Session(db_engine) as session:
+        assert len(session.exec(select(GovernanceTelemetry)).all()) == len(configs)
+
+
+def test_batch_timeout_becomes_failed_log(monkeypatch, db_engine):
+    seen = {}
+
+    async def hanging_invoke(model_id, prompt, timeout=None):
+        seen["timeout"] = timeout
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            seen["cancelled"] = True
+            raise
+
+    monkeypatch.setattr(ai_engine, "MODEL_TIMEOUT", 0.05)
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", hanging_invoke)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    results = asyncio.run(ai_engine.analyze_governance_batch(
+        "is my bucket public?", [ModelConfig(host_platform="aws_bedrock", model_id="anthropic.slow")]
+    ))
+
+    assert results[0].success is False
+    assert "timeout" in results[0].error_message
+    assert 0 < seen["timeout"] <= 0.05 and seen["cancelled"] is True
+    with Session(db_engine) as session:
+        row = session.exec(select(GovernanceTelemetry)).one()
+        assert row.trace_id == results[0].trace_id and row.output_tokens == 0
+
+
+def test_evaluation_skipped_when_deadline_exhausted(monkeypatch, db_engine):
+    judge_calls = []
+
+    async def evaluate(query, response, model_id="gemini-2.5-pro", timeout=None):
+        judge_calls.append(timeout)
+        return {"score": 80, "rationale": "ok"}
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", _fake_invoke(0.01))
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", evaluate)
+
+    log = asyncio.run(ai_engine.analyze_governance(
+        "is my bucket public?", "aws_bedrock", "anthropic.fast", deadline=Deadline(1.0)
+    ))
+
+    assert log.success is True
+    assert judge_calls == []
+    assert log.accuracy.rationale == "Evaluation skipped (deadline exhausted)"
+
+
+def test_throttled_call_is_retried_and_attempts_recorded(monkeypatch, db_engine):
+    calls = []
+
+    async def throttled_once(model_id, prompt, timeout=None):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise ClientError({"Error": {"Code": "ThrottlingException"}, "ResponseMetadata": {"HTTPStatusCode": 429}}, "InvokeModel")
+        return {"response_text": "bucket is private", "input_tokens": 10, "output_tokens": 20}
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01, budget=RetryBudget(ratio=0.2, capacity=5))
+    monkeypatch.setattr(ai_engine, "retry_policy", policy)
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", throttled_once)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    log = asyncio.run(ai_engine.analyze_governance("is my bucket public?", "aws_bedrock", "anthropic.flaky"))
+
+    assert log.success is True and log.attempts == 2
+    assert calls[1] < calls[0]
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().attempts == 2
+
+
+def test_slow_call_is_hedged_and_duplicate_spend_reported(monkeypatch, db_engine):
+    calls = []
+
+    async def invoke(model_id, prompt, timeout=None):
+        calls.append(model_id)
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+        return {"response_text": "bucket is private", "input_tokens": 10, "output_tokens": 20}
+
+    tracker = LatencyTracker(window=10, min_samples=1)
+    tracker.record(("openai", "gpt-4o"), 0.02)
+    monkeypatch.setattr(ai_engine.settings, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(ai_engine.settings, "HEDGE_MIN_DELAY_SECONDS", 0.02)
+    monkeypatch.setattr(ai_engine, "provider_latency", tracker)
+    monkeypatch.setattr(ai_engine.openai_service, "invoke_model_async", invoke)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    started = time.perf_counter()
+    log = asyncio.run(ai_engine.analyze_governance("is my bucket public?", "openai", "gpt-4o"))
+
+    assert time.perf_counter() - started < 1.0
+    assert len(calls) == 2 and log.attempts == 2
+    assert log.cost.hedge_cost > 0
+    assert log.cost.total_cost == log.cost.input_cost + log.cost.output_cost + log.cost.hedge_cost
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().hedge_cost == log.cost.hedge_cost
+
+
+def test_phase_timings_are_recorded_separately(monkeypatch, db_engine):
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", _fake_invoke(0.05))
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    log = asyncio.run(ai_engine.analyze_governance(
+        "is my bucket public?", "aws_bedrock", "anthropic.timed", timer=PhaseTimer(guardrail=12.5)
+    ))
+
+    timings = log.timings
+    assert timings.guardrail_ms == 12.5
+    assert timings.provider_call_ms >= 50
+    # latency_ms is still end to end: it also covers creating the conversation
+    assert log.usage.latency_ms >= timings.provider_call_ms
+    assert timings.db_setup_ms > 0 and timings.evaluation_ms >= 0 and timings.persistence_ms > 0
+    with Session(db_engine) as session:
+        row = session.exec(select(GovernanceTelemetry)).one()
+        assert row.guardrail_ms == 12.5 and row.provider_call_ms == timings.provider_call_ms
+        assert row.persistence_ms == timings.persistence_ms
+
+
+def test_stream_emits_result_before_evaluation(monkeypatch, db_engine):
+    judge_started = asyncio.Event()
+
+    async def slow_evaluate(query, response, model_id="gemini-2.5-pro", timeout=None):
+        judge_started.set()
+        await asyncio.sleep(0.1)
+        return {"score": 90, "rationale": "judged", "query_category": "Straightforward"}
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", _fake_invoke(0.01))
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", slow_evaluate)
+
+    async def collect():
+        events = []
+        async for event_type, log in ai_engine.analyze_governance_stream(
+            "is my bucket public?", [ModelConfig(host_platform="aws_bedrock", model_id="anthropic.fast")],
+            stream_tokens=False
+        ):
+            events.append((event_type, log.trace_id, log.accuracy.score, judge_started.is_set()))
+        return events
+
+    events = asyncio.run(collect())
+
+    assert [e[0] for e in events] == ["result", "evaluation"]
+    assert events[0][1] == events[1][1]
+    assert events[0][2] == 0 and events[0][3] is False
+    assert events[1][2] == 90
+    with Session(db_engine) as session:
+        row = session.exec(select(GovernanceTelemetry)).one()
+        assert row.trace_id == events[0][1]
+        assert row.accuracy_score == 90 and row.query_category == "Straightforward"
+
+
+def test_stream_forwards_deltas_before_result_and_records_ttft(monkeypatch, db_engine):
+    async def stream(model_id, prompt, on_delta, timeout=None):
+        for word in ("bucket ", "is ", "private"):
+            await asyncio.sleep(0.01)
+            on_delta(word)
+        return {"response_text": "bucket is private", "input_tokens": 10, "output_tokens": 3}
+
+    async def batch_evaluate(query, responses, model_id="gemini-2.5-pro", timeout=None):
+        return [{"score": 90, "rationale": "judged"} for _ in responses]
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "stream_model_async", stream)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_batch_async", batch_evaluate)
+
+    async def collect():
+        return [event async for event in ai_engine.analyze_governance_stream(
+            "is my bucket public?", [ModelConfig(host_platform="aws_bedrock", model_id="anthropic.streamer")],
+            batch_evaluation=True
+        )]
+
+    events = asyncio.run(collect())
+
+    assert [e[0] for e in events] == ["delta", "delta", "delta", "result", "evaluation"]
+    assert "".join(e[1]["text"] for e in events[:3]) == "bucket is private"
+    assert all(e[1]["model_id"] == "anthropic.streamer" for e in events[:3])
+    result = events[3][1]
+    assert result.response_text == "bucket is private"
+    assert 0 < result.usage.time_to_first_token_ms < result.usage.latency_ms
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().time_to_first_token_ms == result.usage.time_to_first_token_ms
+
+
+def test_batch_evaluation_uses_single_judge_call(monkeypatch, db_engine):
+    judge_calls = []
+
+    async def batch_evaluate(query, responses, model_id="gemini-2.5-pro", timeout=None):
+        judge_calls.append(responses)
+        return [{"score": 70 + i, "rationale": "batched"} for i in range(len(responses))]
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", _fake_invoke(0.01))
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_batch_async", batch_evaluate)
+    configs = [ModelConfig(host_platform="aws_bedrock", model_id=f"anthropic.model-{i}") for i in range(3)]
+
+    results = asyncio.run(ai_engine.analyze_governance_batch("is my bucket public?", configs, batch_evaluation=True))
+
+    assert len(judge_calls) == 1 and len(judge_calls[0]) == 3
+    assert sorted(r.accuracy.score for r in results) == [70, 71, 72]
+    with Session(db_engine) as session:
+        scores = sorted(row.accuracy_score for row in session.exec(select(GovernanceTelemetry)))
+        assert scores == [70, 71, 72]
+
+
+def test_response_cache_hit_is_free_and_bypassable(monkeypatch, db_engine):
+    calls = []
+
+    async def invoke(model_id, prompt, timeout=None):
+        calls.append(prompt)
+        return {"response_text": "bucket is private", "input_tokens": 10, "output_tokens": 20}
+
+    monkeypatch.setattr(ai_engine, "response_cache", TTLCache(max_entries=8, ttl_seconds=60))
+    monkeypatch.setattr(ai_engine.openai_service, "invoke_model_async", invoke)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    def run(query, **kwargs):
+        return asyncio.run(ai_engine.analyze_governance(query, "openai", "gpt-4o", **kwargs))
+
+    first = run("Is my S3 bucket public?")
+    second = run("  is my s3   bucket PUBLIC? ")
+    bypassed = run("Is my S3 bucket public?", bypass_cache=True)
+
+    assert len(calls) == 2
+    assert not first.cache_hit and first.cost.total_cost > 0
+    assert second.cache_hit and second.cost.total_cost == 0
+    assert not bypassed.cache_hit
+    assert first.input_hash == second.input_hash and first.output_hash == second.output_hash
+    with Session(db_engine) as session:
+        assert sorted(row.cache_hit for row in session.exec(select(GovernanceTelemetry))) == [False, False, True]
+
+
+def test_identical_inflight_calls_are_coalesced(monkeypatch, db_engine):
+    calls = []
+
+    async def invoke(model_id, prompt, timeout=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return {"response_text": "bucket is private", "input_tokens": 10, "output_tokens": 20}
+
+    monkeypatch.setattr(ai_engine, "provider_flights", SingleFlight())
+    monkeypatch.setattr(ai_engine.openai_service, "invoke_model_async", invoke)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", _fake_evaluate)
+
+    async def burst():
+        return await asyncio.gather(*(
+            ai_engine.analyze_governance("Is my S3 bucket public?", "openai", "gpt-4o") for _ in range(3)
+        ))
+
+    logs = asyncio.run(burst())
+
+    assert len(calls) == 1
+    assert sorted(log.coalesced for log in logs) == [False, True, True]
+    assert len({log.trace_id for log in logs}) == 3
+    assert sum(log.cost.total_cost > 0 for log in logs) == 1
+    with Session(db_engine) as session:
+        assert len(session.exec(select(GovernanceTelemetry)).all()) == 3
+
+
+def test_single_flight_cancels_shared_call_only_when_all_callers_leave():
+    flights = SingleFlight()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        finished.append(True)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flights.do("k", slow))
+        second = asyncio.create_task(flights.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == ("done", True)
+
+        lone = asyncio.create_task(flights.do("k2", slow))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        await asyncio.sleep(0.15)
+
+    asyncio.run(main())
+    assert finished == [True]
+
+
+def test_bedrock_http_client_is_per_event_loop_and_closed_at_shutdown():
+    service = ai_engine.bedrock_service
+
+    first = asyncio.run(service._client())
+    # A new event loop (worker, test) gets its own client and closes the first loop's
+    second = asyncio.run(service._client())
+    assert second is not first and first.is_closed
+    # Slow models need the model timeout, not httpx's 5s default
+    assert second.timeout == httpx.Timeout(ai_engine.MODEL_TIMEOUT)
+
+    asyncio.run(ai_engine.aclose())
+    assert second.is_closed and service._http is None
+
+
+def test_only_judge_verdicts_count_as_scored():
+    verdict = {"score": 80, "rationale": "Correct.", "evaluator_model": "gemini-2.5-pro"}
+    assert ai_engine._build_accuracy(verdict, "gemini-2.5-pro").scored
+    for placeholder in (
+        {"score": 0, "rationale": ai_engine.PENDING_EVALUATION},
+        {"score": 0, "rationale": ai_engine.NOT_EVALUATED},
+        {"score": 0, "rationale": "Evaluation failed: timeout"},
+        {"score": 50, "rationale": "Evaluator Output Malformed: ..."},
+    ):
+        assert not ai_engine._build_accuracy(placeholder, "gemini-2.5-pro").scored
+
+
+def test_stream_judging_outlives_a_disconnect_and_failures_are_terminal(monkeypatch, db_engine):
+    async def invoke(model_id, prompt, timeout=None):
+        await asyncio.sleep(0.01 if "fast" in model_id else 5)
+        return {"response_text": f"answer from {model_id}", "input_tokens": 10, "output_tokens": 20}
+
+    async def evaluate(query, response, model_id="gemini-2.5-pro", timeout=None):
+        await asyncio.sleep(0.05)
+        if "broken" in response:
+            raise RuntimeError("judge exploded")
+        return {"score": 90, "rationale": "judged", "evaluator_model": model_id}
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", invoke)
+    monkeypatch.setattr(ai_engine.evaluator_service, "evaluate_response_async", evaluate)
+    configs = [
+        ModelConfig(host_platform="aws_bedrock", model_id="anthropic.fast"),
+        ModelConfig(host_platform="aws_bedrock", model_id="anthropic.fast-broken"),
+        ModelConfig(host_platform="aws_bedrock", model_id="anthropic.slow"),
+    ]
+
+    async def disconnect_after_results():
+        stream = ai_engine.analyze_governance_stream("q", configs, batch_evaluation=False, stream_tokens=False)
+        results = 0
+        async for event_type, _ in stream:
+            results += event_type == "result"
+            if results == 2:
+                break
+        # The client goes away while both judge calls are in flight
+        await stream.aclose()
+        assert ai_engine._detached_evaluations
+        await asyncio.gather(*ai_engine._detached_evaluations)
+
+    asyncio.run(disconnect_after_results())
+
+    with Session(db_engine) as session:
+        rows = {row.model_id: row for row in session.exec(select(GovernanceTelemetry)).all()}
+    # The slow model was cancelled; both answered models left "pending" behind
+    assert set(rows) == {"anthropic.fast", "anthropic.fast-broken"}
+    assert rows["anthropic.fast"].accuracy_score == 90 and rows["anthropic.fast"].scored
+    assert rows["anthropic.fast-broken"].accuracy_rationale.startswith("Evaluation failed")
+    assert not rows["anthropic.fast-broken"].scored
@@ -0,0 +1,73 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import get_async_session
+from app.main import app
+from app.services import db_service as db_module
+from app.services.analytics_cache import analytics_cache
+from app.services.db_service import async_db_service, db_service
+
+
+def test_repeat_polls_are_served_from_cache_until_telemetry_is_written(db_engine, telemetry_log):
+    queries = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append(statement)
+
+    async def session_override():
+        async with AsyncSession(db_module.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    async def seed():
+        conv = await async_db_service.create_conversation("q")
+        await async_db_service.add_response(conv.id, telemetry_log("gpt-4o", "t1", score=50))
+        return conv.id
+
+    conversation_id = asyncio.run(seed())
+    # The cache's counters are process-wide; earlier tests may have moved them
+    baseline = analytics_cache.stats()
+    event.listen(db_module.async_engine.sync_engine, "before_cursor_execute", count)
+    app.dependency_overrides[get_async_session] = session_override
+    try:
+        client = TestClient(app)
+        first = client.get("/api/v1/analytics/summary").json()
+        issued = len(queries)
+        assert client.get("/api/v1/analytics/summary").json() == first
+        assert len(queries) == issued
+
+        # Different params are a different entry
+        client.get("/api/v1/analytics/model-performance?limit=1")
+        client.get("/api/v1/analytics/model-performance?limit=2")
+        assert analytics_cache.stats()["misses"] - baseline["misses"] == 3
+
+        # A committed telemetry write (sync service here) invalidates every entry
+        generation = analytics_cache.generation
+        message = db_service.add_message(conversation_id, "assistant", "second")
+        db_service.add_telemetry(message.id, telemetry_log("gpt-4o-mini", "t2", score=50))
+        assert analytics_cache.generation == generation + 1
+        assert client.get("/api/v1/analytics/summary").json()["total_requests"] == 2
+        assert len(queries) > issued
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+        event.remove(db_module.async_engine.sync_engine, "before_cursor_execute", count)
+
+    stats = client.get("/api/v1/system/analytics-cache").json()
+    assert stats["hits"] - baseline["hits"] == 1 and stats["misses"] - baseline["misses"] == 4
+
+
+def test_max_staleness_bounds_unseen_writes(monkeypatch):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return ["result"]
+
+    monkeypatch.setattr(analytics_cache.entries, "ttl_seconds", 0.0)
+    asyncio.run(analytics_cache.get_or_compute(("summary", ()), compute))
+    asyncio.run(analytics_cache.get_or_compute(("summary", ()), compute))
+    # Expired immediately: recomputed even though no write bumped the generation
+    assert len(calls) == 2
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import get_async_session
+from app.main import app
+from app.models.telemetry import GovernanceTelemetry
+from app.services import db_service as db_module
+from app.services.db_service import async_db_service
+
+
+@pytest.fixture
+def client(db_engine):
+    async def session_override():
+        async with AsyncSession(db_module.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_async_session, None)
+
+
+def test_async_writes_are_served_by_async_endpoints(client, db_engine, telemetry_log):
+    async def seed():
+        conv = await async_db_service.create_conversation("is my bucket public?")
+        await async_db_service.add_message(conv.id, "user", "is my bucket public?")
+        await async_db_service.add_response(conv.id, telemetry_log("gpt-4o", score=80, cost=0.002, query_category="Straightforward", scored=True))
+        await async_db_service.add_response(conv.id, telemetry_log("gpt-4o-mini", score=60, query_category="Straightforward", scored=True))
+        await async_db_service.update_telemetry_accuracy("trace-gpt-4o-mini", {"score": 70, "evaluator_cost": 0.0001, "scored": True}, 12.5)
+        return conv.id
+
+    conv_id = asyncio.run(seed())
+
+    conversations = client.get("/api/v1/history/conversations").json()
+    assert [(c["id"], c["message_count"]) for c in conversations] == [(conv_id, 3)]
+    detail = client.get(f"/api/v1/history/conversations/{conv_id}").json()
+    assert [m["role"] for m in detail["messages"]].count("assistant") == 2
+    assert {m["telemetry"]["model_id"] for m in detail["messages"] if m["telemetry"]} == {"gpt-4o", "gpt-4o-mini"}
+
+    performance = {row["model_id"]: row for row in client.get("/api/v1/analytics/model-performance").json()}
+    assert performance["gpt-4o-mini"]["avg_accuracy"] == 70
+    summary = client.get("/api/v1/analytics/summary").json()
+    assert summary["total_requests"] == 2 and summary["top_model_by_accuracy"] == "gpt-4o"
+
+    assert client.delete(f"/api/v1/history/conversations/{conv_id}").json() == {"status": "deleted"}
+    assert client.get(f"/api/v1/history/conversations/{conv_id}").status_code == 404
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).all() == []
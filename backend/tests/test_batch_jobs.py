@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.models.batch_job import BatchJob, BatchJobPart
+from app.models.telemetry import GovernanceTelemetry
+from app.schemas.requests import ModelConfig
+from app.services import ai_engine
+from app.services.batch_backends import LocalBatchBackend
+from app.services.batch_jobs import BatchJobRunner
+from app.services.db_service import db_service
+
+
+async def _responder(model_id, prompt):
+    if "fail" in prompt:
+        raise RuntimeError("record rejected")
+    return {"response_text": f"{model_id}: ok", "input_tokens": 1_000_000, "output_tokens": 1_000_000}
+
+
+def _run_job(runner, queries, configs, **kwargs):
+    async def go():
+        job = await runner.submit(queries, configs, **kwargs)
+        if job.id in runner._tasks:
+            await runner._tasks[job.id]
+        return runner.status(job.id)
+    return asyncio.run(go())
+
+
+def test_batch_job_ingests_results_at_batch_rates(db_engine):
+    local = LocalBatchBackend(_responder, polls=2)
+    runner = BatchJobRunner(backends={"openai": local, "aws": local}, poll_interval=0)
+    configs = [
+        ModelConfig(host_platform="openai", model_id="gpt-4o-mini"),
+        ModelConfig(host_platform="aws_bedrock", model_id="us.anthropic.claude-sonnet-4-5-20250929-v1:0"),
+    ]
+
+    status = _run_job(runner, ["is my bucket public?", "please fail", "rotate keys?"], configs)
+
+    assert status["status"] == "completed"
+    assert (status["total_records"], status["completed_records"], status["failed_records"]) == (6, 4, 2)
+    assert all(part["status"] == "completed" for part in status["parts"])
+    with Session(db_engine) as session:
+        rows = session.exec(select(GovernanceTelemetry)).all()
+    assert len(rows) == 6 and all(row.batch_job_id == status["id"] for row in rows)
+    mini = [row for row in rows if row.model_id == "gpt-4o-mini" and row.output_tokens]
+    # gpt-4o-mini batch tier: 0.075 in + 0.30 out per 1M tokens
+    assert all(row.total_cost == pytest.approx(0.375) for row in mini)
+    claude = [row for row in rows if "claude" in row.model_id and row.output_tokens]
+    assert all(row.total_cost == pytest.approx(1.65 + 8.25) for row in claude)
+
+
+def test_models_without_batch_backend_fail_at_submission(db_engine):
+    runner = BatchJobRunner(backends={"openai": LocalBatchBackend()}, poll_interval=0)
+
+    status = _run_job(runner, ["q"], [ModelConfig(host_platform="gcp_vertex", model_id="gemini-2.5-pro")])
+
+    assert status["status"] == "failed" and status["failed_records"] == 1
+    assert "No batch inference backend" in status["parts"][0]["error"]
+    with Session(db_engine) as session:
+        assert session.exec(select(BatchJobPart)).one().status == "failed"
+
+
+def test_concurrent_pollers_ingest_and_judge_each_record_once(db_engine, monkeypatch):
+    judged = []
+
+    async def evaluate_log(log_entry, evaluator_model):
+        judged.append(log_entry.batch_record_id)
+        return log_entry
+
+    monkeypatch.setattr(ai_engine, "evaluate_log", evaluate_log)
+    local = LocalBatchBackend(_responder, polls=3)
+    configs = [
+        ModelConfig(host_platform="openai", model_id="gpt-4o-mini"),
+        ModelConfig(host_platform="aws_bedrock", model_id="us.anthropic.claude-sonnet-4-5-20250929-v1:0"),
+    ]
+    # Two web processes that both resumed the same running job
+    first = BatchJobRunner(backends={"openai": local, "aws": local}, poll_interval=0, owner="web-1")
+    second = BatchJobRunner(backends={"openai": local, "aws": local}, poll_interval=0, owner="web-2")
+
+    async def go():
+        job = await first.submit(["is my bucket public?", "please fail", "rotate keys?"], configs, evaluator_model="gemini-2.5-pro")
+        second.start(job.id)
+        await asyncio.gather(*list(first._tasks.values()), *list(second._tasks.values()))
+        return first.status(job.id)
+
+    status = asyncio.run(go())
+
+    assert status["status"] == "completed"
+    assert (status["completed_records"], status["failed_records"]) == (4, 2)
+    with Session(db_engine) as session:
+        rows = session.exec(select(GovernanceTelemetry)).all()
+        assert session.exec(select(BatchJobPart.lease_owner)).all() == [None, None]
+    assert len(rows) == 6
+    assert sorted(judged) == ["q0", "q0", "q2", "q2"]
+
+
+def test_reingesting_a_part_skips_stored_records(db_engine):
+    conversation_ids = db_service.create_query_conversations(["q one", "q two"])
+    job = BatchJob(governance_context="aws", queries=json.dumps(["q one", "q two"]), conversation_ids=json.dumps(conversation_ids), total_records=2)
+    part = BatchJobPart(job_id=job.id, host_platform="openai", model_id="gpt-4o-mini", backend="local")
+    db_service.create_batch_job(job, [part])
+    job, (part,) = db_service.get_batch_job(job.id)
+    runner = BatchJobRunner(backends={}, owner="web-1")
+    results = [{"record_id": f"q{i}", "response_text": "ok", "input_tokens": 10, "output_tokens": 10} for i in range(2)]
+
+    def finish():
+        assert db_service.claim_batch_part(part.id, "web-1", 60)
+        part.status = "completed"
+        records = runner._records(job, part, results)
+        return db_service.finish_batch_part(part, "web-1", 2, 0, [(c, r, log.model_dump()) for c, r, log in records])
+
+    assert sorted(finish()) == ["q0", "q1"]
+    # Another process holding a stale copy cannot finish the part a second time
+    assert not db_service.claim_batch_part(part.id, "web-2", 60)
+    # A retried part (e.g. after a crash) finds its records already stored
+    with Session(db_engine) as session:
+        session.execute(update(BatchJobPart).where(BatchJobPart.id == part.id).values(status="running"))
+        session.commit()
+    assert finish() == []
+    with Session(db_engine) as session:
+        assert len(session.exec(select(GovernanceTelemetry)).all()) == 2
+    # The key itself is unique, whatever path writes the row
+    msg = db_service.add_message(conversation_ids[0], "assistant", "dup")
+    with pytest.raises(IntegrityError):
+        db_service.add_telemetry(msg.id, runner._records(job, part, results[:1])[0][2].model_dump())
+
+
+def test_transient_poll_errors_leave_the_part_running(db_engine):
+    class FlakyBackend(LocalBatchBackend):
+        failures = 2
+
+        async def poll(self, external_id):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("throttled")
+            return await super().poll(external_id)
+
+    flaky = FlakyBackend(_responder)
+    runner = BatchJobRunner(backends={"openai": flaky}, poll_interval=0)
+
+    status = _run_job(runner, ["is my bucket public?"], [ModelConfig(host_platform="openai", model_id="gpt-4o-mini")])
+
+    assert flaky.failures == 0
+    assert status["status"] == "completed" and (status["completed_records"], status["failed_records"]) == (1, 0)
+    assert status["parts"][0]["error"] is None
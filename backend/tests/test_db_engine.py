@@ -0,0 +1,120 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.db import async_url, engine_options, make_async_engine, make_engine
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "foreign_keys")
+
+
+def _read(conn_execute):
+    return {name: conn_execute(text(f"PRAGMA {name}")).scalar() for name in PRAGMAS}
+
+
+def test_sqlite_profile_applies_to_every_connection(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    try:
+        assert isinstance(engine.pool, QueuePool)
+        assert engine.echo is False
+        with engine.connect() as first, engine.connect() as second:
+            for conn in (first, second):
+                pragmas = _read(conn.execute)
+                assert pragmas["journal_mode"] == "wal"
+                assert pragmas["synchronous"] == 1  # NORMAL
+                assert pragmas["busy_timeout"] == 5000
+                assert pragmas["mmap_size"] == 256 * 1024 * 1024
+                assert pragmas["cache_size"] == -64 * 1024
+                assert pragmas["foreign_keys"] == 1
+    finally:
+        engine.dispose()
+
+
+def test_async_engine_gets_the_same_profile(tmp_path):
+    engine = make_async_engine(f"sqlite:///{tmp_path / 'profile.db'}", poolclass=NullPool)
+
+    async def read():
+        async with engine.connect() as conn:
+            results = {}
+            for name in PRAGMAS:
+                results[name] = (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+        await engine.dispose()
+        return results
+
+    pragmas = asyncio.run(read())
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1
+    assert pragmas["busy_timeout"] == 5000
+
+
+def test_in_memory_sqlite_skips_wal():
+    engine = make_engine("sqlite://")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_postgres_url_gets_pool_sizing():
+    options = engine_options("postgresql://gov:secret@db:5432/governance")
+    assert options["pool_size"] == 10
+    assert options["max_overflow"] == 20
+    assert options["pool_pre_ping"] is True
+    assert options["pool_recycle"] == 1800
+    assert "connect_args" not in options
+    assert async_url("postgresql://gov:secret@db:5432/governance") == "postgresql+asyncpg://gov:secret@db:5432/governance"
+
+
+def test_sync_writes_from_executor_threads_are_serialized_on_sqlite(monkeypatch):
+    from sqlalchemy.pool import StaticPool
+    from sqlmodel import Session, SQLModel, select
+    import app.models  # noqa: F401
+    from app.core.executor import InvocationExecutor
+    from app.models.telemetry import GovernanceTelemetry
+    from app.services.db_service import db_service
+
+    # One connection shared by every thread: concurrent transactions on it corrupt each other
+    engine = make_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr("app.services.db_service.engine", engine)
+    executor = InvocationExecutor(max_workers=8)
+    log = {"provider": "aws", "model_id": "m", "accuracy": {"score": 0.0}}
+
+    def write(i):
+        conv = db_service.create_conversation(f"query {i}")
+        msg = db_service.add_message(conv.id, "assistant", "answer")
+        db_service.add_telemetry(msg.id, {**log, "trace_id": f"t-{i}"})
+        return db_service.update_telemetry_accuracy(f"t-{i}", {"score": 80, "rationale": "ok"})
+
+    async def main():
+        return await asyncio.gather(*(executor.run(write, i) for i in range(40)))
+
+    try:
+        assert all(row.accuracy_score == 80 for row in asyncio.run(main()))
+        with Session(engine) as session:
+            assert len(session.exec(select(GovernanceTelemetry)).all()) == 40
+    finally:
+        executor.shutdown()
+        engine.dispose()
+
+
+def test_legacy_database_is_copied_to_the_new_location_once(tmp_path):
+    import sqlite3
+    from app.core.db import adopt_legacy_database
+
+    legacy = tmp_path / "database.db"
+    with sqlite3.connect(legacy) as conn:
+        conn.execute("CREATE TABLE conversation (id TEXT)")
+        conn.execute("INSERT INTO conversation VALUES ('kept')")
+    url = f"sqlite:///{tmp_path / 'data' / 'database.db'}"
+
+    assert adopt_legacy_database(url, str(legacy))
+    engine = make_engine(url)
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT id FROM conversation")).scalar() == "kept"
+    finally:
+        engine.dispose()
+    # The new file exists from now on, so a later start never copies over it
+    assert not adopt_legacy_database(url, str(legacy))
+    assert not adopt_legacy_database(url, None)
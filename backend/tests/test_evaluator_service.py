@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.services.evaluator_service import JUDGE_BATCH_INSTRUCTIONS, JUDGE_INSTRUCTIONS, evaluator_service
+from app.services.llm_providers.bedrock import BedrockService
+from app.services.pricing_service import pricing_service
+from app.services.verdict_cache import VerdictCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_verdict_cache(monkeypatch):
+    monkeypatch.setattr(evaluator_service, "verdict_cache", VerdictCache(max_entries=16, ttl_seconds=60))
+
+
+def _reply(text, input_tokens=0, output_tokens=0, **cache):
+    return {"response_text": text, "input_tokens": input_tokens, "output_tokens": output_tokens, **cache}
+
+
+def test_batch_grades_all_responses_in_one_call(monkeypatch):
+    prompts = []
+
+    async def judge(model_id, prompt, timeout=None, system=JUDGE_INSTRUCTIONS):
+        prompts.append(prompt)
+        assert system == JUDGE_BATCH_INSTRUCTIONS
+        return _reply("```json\n" + json.dumps({
+            "query_category": "Straightforward",
+            "prompt_optimization": "Name the bucket.",
+            "results": [
+                {"response": 1, "score": 90, "rationale": "good"},
+                {"response": 2, "score": 40, "rationale": "weak"},
+                {"response": 3, "score": 75, "rationale": "fine"},
+            ],
+        }) + "\n```", input_tokens=3000, output_tokens=300)
+
+    monkeypatch.setattr(evaluator_service, "_call_judge_async", judge)
+
+    results = asyncio.run(evaluator_service.evaluate_batch_async("is my bucket public?", ["a", "b", "c"]))
+
+    assert len(prompts) == 1
+    assert [r["score"] for r in results] == [90, 40, 75]
+    assert all(r["query_category"] == "Straightforward" for r in results)
+    # One judge call, billed once and split evenly across the verdicts
+    call_cost = pricing_service.calculate_cost("", "gemini-2.5-pro", 3000, 300)["total_cost"]
+    assert sum(r["evaluator_cost"] for r in results) == pytest.approx(call_cost)
+
+
+def test_batch_falls_back_per_response_over_budget_or_when_skipped(monkeypatch):
+    calls = []
+
+    async def judge(model_id, prompt, timeout=None, system=JUDGE_INSTRUCTIONS):
+        calls.append(prompt)
+        if "RESPONSE 1:" in prompt:
+            # Batched verdict that silently drops the second response
+            return _reply(json.dumps({"results": [{"response": 1, "score": 88, "rationale": "ok"}]}))
+        return _reply(json.dumps({"score": 55, "rationale": "single"}))
+
+    monkeypatch.setattr(evaluator_service, "_call_judge_async", judge)
+
+    results = asyncio.run(evaluator_service.evaluate_batch_async("q", ["a", "b"]))
+    assert [r["score"] for r in results] == [88, 55]
+    assert len(calls) == 2
+
+    calls.clear()
+    monkeypatch.setattr("app.services.evaluator_service.settings.EVALUATOR_BATCH_TOKEN_BUDGET", 10)
+    results = asyncio.run(evaluator_service.evaluate_batch_async("q", ["c", "d"]))
+    assert [r["score"] for r in results] == [55, 55]
+    assert len(calls) == 2 and not any("RESPONSE 1:" in c for c in calls)
+
+
+def test_verdicts_are_memoized_and_persisted(monkeypatch, tmp_path):
+    calls = []
+
+    async def judge(model_id, prompt, timeout=None, system=JUDGE_INSTRUCTIONS):
+        calls.append(prompt)
+        return _reply(json.dumps({"score": 77, "rationale": "ok", "query_category": "Straightforward"}))
+
+    monkeypatch.setattr(evaluator_service, "_call_judge_async", judge)
+    path = str(tmp_path / "verdicts.db")
+    monkeypatch.setattr(evaluator_service, "verdict_cache", VerdictCache(max_entries=16, ttl_seconds=60, path=path))
+
+    first = asyncio.run(evaluator_service.evaluate_response_async("Is it public?", "No."))
+    again = asyncio.run(evaluator_service.evaluate_response_async("is it  public?", "No."))
+    assert first == again and len(calls) == 1
+
+    # A fresh process-level cache still finds the verdict in the SQLite tier
+    monkeypatch.setattr(evaluator_service, "verdict_cache", VerdictCache(max_entries=16, ttl_seconds=60, path=path))
+    batch = asyncio.run(evaluator_service.evaluate_batch_async("Is it public?", ["No.", "Yes."]))
+    assert batch[0]["score"] == 77 and len(calls) == 2
+    assert evaluator_service.verdict_cache.stats()["persistent_hits"] == 1
+
+
+def test_sqlite_verdict_tier_runs_off_the_event_loop(monkeypatch, tmp_path):
+    async def judge(model_id, prompt, timeout=None):
+        return _reply(json.dumps({"score": 77, "rationale": "ok"}))
+
+    cache = VerdictCache(max_entries=16, ttl_seconds=60, path=str(tmp_path / "verdicts.db"))
+    threads = []
+    for name in ("_load", "_store"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: threads.append(threading.current_thread().name) or method(*args))
+    monkeypatch.setattr(evaluator_service, "_call_judge_async", judge)
+    monkeypatch.setattr(evaluator_service, "verdict_cache", cache)
+
+    asyncio.run(evaluator_service.evaluate_response_async("q", "a"))
+    assert len(threads) == 2 and all(name.startswith("invocation") for name in threads)
+
+
+def test_judge_instructions_are_sent_as_the_system_turn(monkeypatch):
+    judge = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
+    bodies = []
+
+    async def post_signed(model_id, body, timeout=None):
+        bodies.append(json.loads(body))
+        return json.dumps({
+            "content": [{"type": "text", "text": json.dumps({"score": 80, "rationale": "ok"})}],
+            "usage": {"input_tokens": 100, "cache_read_input_tokens": 1200, "cache_creation_input_tokens": 0, "output_tokens": 50},
+        }).encode()
+
+    bedrock = BedrockService.__new__(BedrockService)
+    monkeypatch.setattr(bedrock, "_post_signed", post_signed, raising=False)
+    monkeypatch.setattr(evaluator_service, "bedrock_service", bedrock)
+
+    result = asyncio.run(evaluator_service.evaluate_response_async("is my bucket public?", "No.", model_id=judge))
+
+    body = bodies[0]
+    # Static instructions go in the system block; only query and response vary
+    assert body["system"] == [{"type": "text", "text": JUDGE_INSTRUCTIONS}]
+    user_text = body["messages"][0]["content"][0]["text"]
+    assert "is my bucket public?" in user_text and "INSTRUCTIONS" not in user_text
+    assert evaluator_service._build_prompt("q", "r") != evaluator_service._build_prompt("q", "other")
+    # Cached prefix tokens the provider reports are still counted and priced
+    assert result["evaluator_cost"] == pytest.approx(
+        pricing_service.calculate_cost("", judge, 1300, 50, cache_read_tokens=1200)["total_cost"]
+    )
+
+    # Cache reads the provider does report are still billed at the cache read rate
+    expected = pricing_service.calculate_cost("aws_bedrock", judge, 1300, 50, cache_read_tokens=1200)["total_cost"]
+    assert result["score"] == 80 and result["evaluator_cost"] == pytest.approx(expected)
+    assert expected == pytest.approx(100 * 3.30e-6 + 1200 * 0.33e-6 + 50 * 16.50e-6)
+    # The same verdict served from the verdict cache costs nothing
+    again = asyncio.run(evaluator_service.evaluate_response_async("is my bucket public?", "No.", model_id=judge))
+    assert again["evaluator_cost"] == 0.0 and len(bodies) == 1
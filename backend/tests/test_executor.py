@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+from app.core.executor import InvocationExecutor
+
+
+def test_executor_bounds_workers_and_reports_saturation():
+    executor = InvocationExecutor(max_workers=2)
+    peak = 0
+    running = 0
+    lock = threading.Lock()
+
+    def blocking_call():
+        nonlocal peak, running
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(executor.run(blocking_call) for _ in range(6)))
+
+    try:
+        assert asyncio.run(main()) == ["done"] * 6
+    finally:
+        executor.shutdown()
+
+    metrics = executor.metrics()
+    assert peak == 2
+    assert metrics["completed"] == 6
+    assert metrics["queue_depth"] == 0 and metrics["active_workers"] == 0
+    # Four of the six calls had to queue behind the two workers
+    assert metrics["max_wait_ms"] >= 40
+
+
+def test_cancelled_queued_call_leaves_the_queue():
+    executor = InvocationExecutor(max_workers=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        # The only worker is busy, so this one is still queued when it times out
+        try:
+            await asyncio.wait_for(executor.run(time.sleep, 0), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        assert executor.metrics()["queue_depth"] == 0
+        release.set()
+        await running
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert executor.metrics()["queue_depth"] == 0
@@ -0,0 +1,36 @@
+import asyncio
+
+from app.services.hedging import LatencyTracker, hedged
+
+
+def _call(delay, value, log):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(f"{value} cancelled")
+            raise
+        return value
+    return call
+
+
+def test_p95_needs_enough_samples():
+    tracker = LatencyTracker(window=100, min_samples=20)
+    for i in range(19):
+        tracker.record("m", i / 100)
+    assert tracker.p95("m") is None
+
+    tracker.record("m", 0.19)
+    assert tracker.p95("m") == 0.19
+
+
+def test_fast_primary_never_starts_backup():
+    log = []
+    result = asyncio.run(hedged(_call(0.01, "primary", log), _call(0.01, "backup", log), delay=0.5))
+    assert result == ("primary", False) and log == []
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    log = []
+    result = asyncio.run(hedged(_call(1.0, "primary", log), _call(0.01, "backup", log), delay=0.02))
+    assert result == ("backup", True) and log == ["primary cancelled"]
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlmodel import Session, select
+
+from app.models.job import Job, JobCell
+from app.models.telemetry import GovernanceTelemetry
+from app.schemas.requests import ModelConfig
+from app.services import ai_engine
+from app.services.job_queue import JobQueue
+from app.worker import Worker
+
+
+CONFIGS = [
+    ModelConfig(host_platform="openai", model_id="gpt-4o-mini"),
+    ModelConfig(host_platform="aws_bedrock", model_id="us.anthropic.claude-sonnet-4-5-20250929-v1:0"),
+]
+
+
+def _fake_engine(monkeypatch, fail=lambda query, model_id, call: False):
+    calls = []
+
+    async def analyze_governance(query, provider_str, model_id, **kwargs):
+        calls.append((query, model_id))
+        ok = not fail(query, model_id, len(calls))
+        return SimpleNamespace(success=ok, trace_id=f"t{len(calls)}", error_message=None if ok else "provider error")
+
+    monkeypatch.setattr(ai_engine, "analyze_governance", analyze_governance)
+    return calls
+
+
+def test_worker_checkpoints_every_cell(db_engine, monkeypatch):
+    calls = _fake_engine(monkeypatch, fail=lambda query, model_id, call: query == "bad" and "claude" in model_id)
+    queue = JobQueue(max_cell_attempts=2)
+    job = queue.enqueue(["is my bucket public?", "bad"], CONFIGS, evaluator_model=None)
+
+    assert asyncio.run(Worker(queue, "w1").run_once())
+
+    status = queue.status(job.id)
+    assert status["status"] == "completed" and status["progress"] == 1.0
+    assert (status["total_cells"], status["completed_cells"], status["failed_cells"]) == (4, 3, 1)
+    failed = [cell for cell in status["cells"] if cell["status"] == "failed"]
+    # The failing cell was retried up to max_cell_attempts, the others ran once
+    assert len(failed) == 1 and failed[0]["attempts"] == 2 and failed[0]["error"] == "provider error"
+    assert len(calls) == 5
+    assert not asyncio.run(Worker(queue, "w1").run_once())
+
+
+def test_lapsed_lease_is_reclaimed_and_resumes_pending_cells(db_engine, monkeypatch):
+    calls = _fake_engine(monkeypatch)
+    queue = JobQueue(lease_seconds=60)
+    job = queue.enqueue(["q1", "q2"], CONFIGS)
+
+    # First worker claims, checkpoints one cell, then dies without finishing
+    assert queue.claim("crashed").id == job.id
+    assert queue.claim("other") is None
+    first = queue.pending_cells(job.id)[0]
+    queue.record_cell(first.id, True, trace_id="before-crash")
+    with Session(db_engine) as session:
+        stale = session.get(Job, job.id)
+        stale.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        session.add(stale)
+        session.commit()
+
+    assert asyncio.run(Worker(queue, "w2").run_once())
+
+    status = queue.status(job.id)
+    assert status["status"] == "completed" and status["attempts"] == 2
+    assert status["completed_cells"] == 4 and len(calls) == 3
+    assert not queue.heartbeat(job.id, "crashed")
+    with Session(db_engine) as session:
+        assert session.get(JobCell, first.id).trace_id == "before-crash"
+
+
+def test_claim_is_exclusive_and_attempts_are_bounded(db_engine):
+    queue = JobQueue(max_attempts=2, retry_delay=0)
+    job = queue.enqueue(["q"], CONFIGS[:1])
+
+    claims = [queue.claim(f"w{i}") for i in range(3)]
+    assert [claim is not None for claim in claims] == [True, False, False]
+
+    queue.fail_attempt(job.id, "w0", "worker crashed")
+    assert queue.status(job.id)["status"] == "queued"
+    assert queue.claim("w1").attempts == 2
+    queue.fail_attempt(job.id, "w1", "worker crashed again")
+
+    status = queue.status(job.id)
+    assert status["status"] == "failed" and status["error"] == "worker crashed again"
+    assert queue.claim("w2") is None
+
+
+def test_counts_only_status_skips_cells(db_engine):
+    queue = JobQueue(max_cell_attempts=1)
+    job = queue.enqueue(["q1", "q2"], CONFIGS)
+    first, second = queue.pending_cells(job.id)[:2]
+    queue.record_cell(first.id, True, trace_id="t1")
+    queue.record_cell(second.id, False, error="provider error")
+
+    full = queue.status(job.id)
+    counts = queue.status(job.id, include_cells=False)
+    assert counts["cells"] == [] and len(full["cells"]) == 4
+    assert {key: value for key, value in counts.items() if key != "cells"} == {key: value for key, value in full.items() if key != "cells"}
+    assert (counts["completed_cells"], counts["failed_cells"], counts["progress"]) == (1, 1, 0.5)
+
+
+def test_cells_without_evaluator_are_recorded_as_not_evaluated(db_engine, monkeypatch):
+    async def invoke(model_id, prompt, timeout=None, **kwargs):
+        return {"response_text": "answer", "input_tokens": 10, "output_tokens": 20}
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", invoke)
+    queue = JobQueue()
+    queue.enqueue(["q"], CONFIGS[1:], evaluator_model=None)
+
+    assert asyncio.run(Worker(queue, "w1").run_once())
+    with Session(db_engine) as session:
+        telemetry = session.exec(select(GovernanceTelemetry)).one()
+    assert telemetry.accuracy_rationale == ai_engine.NOT_EVALUATED
+
+
+def test_rerun_cell_reuses_the_row_written_before_a_lost_checkpoint(db_engine, monkeypatch):
+    calls = []
+
+    async def invoke(model_id, prompt, timeout=None, **kwargs):
+        calls.append(model_id)
+        return {"response_text": "answer", "input_tokens": 10, "output_tokens": 20}
+
+    monkeypatch.setattr(ai_engine.bedrock_service, "invoke_model_async", invoke)
+    queue = JobQueue(retry_delay=0)
+    job = queue.enqueue(["q"], CONFIGS[1:], evaluator_model=None)
+    record_cell = queue.record_cell
+
+    def crash_once(*args, **kwargs):
+        # The worker dies after the telemetry commit, before the checkpoint
+        monkeypatch.setattr(queue, "record_cell", record_cell)
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(queue, "record_cell", crash_once)
+    assert asyncio.run(Worker(queue, "w1").run_once())
+    assert queue.status(job.id)["status"] == "queued"
+
+    assert asyncio.run(Worker(queue, "w2").run_once())
+
+    status = queue.status(job.id)
+    assert status["status"] == "completed" and status["completed_cells"] == 1
+    assert len(calls) == 1
+    with Session(db_engine) as session:
+        telemetry = session.exec(select(GovernanceTelemetry)).one()
+    assert telemetry.job_cell_id == status["cells"][0]["id"] and status["cells"][0]["trace_id"] == telemetry.trace_id
@@ -0,0 +1,112 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import get_async_session, make_engine
+from app.core.migrations import MIGRATIONS, applied_versions, migrate
+from app.main import app
+from app.services import db_service as db_module
+from app.services.rollups import KEY, MEASURES
+
+ANALYTICS_URLS = [
+    "/api/v1/analytics/model-performance",
+    "/api/v1/analytics/cost-breakdown?group_by=model",
+    "/api/v1/analytics/cost-breakdown?group_by=platform",
+    "/api/v1/analytics/accuracy-trends?days=7",
+    "/api/v1/analytics/complexity-analysis",
+    "/api/v1/analytics/summary",
+]
+
+
+def test_legacy_database_is_migrated_once(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # Telemetry table as created before the columns added by later features
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE governancetelemetry (id VARCHAR PRIMARY KEY, message_id VARCHAR, trace_id VARCHAR, "
+            "governance_context VARCHAR, host_platform VARCHAR, model_id VARCHAR, latency_ms FLOAT, "
+            "input_tokens INTEGER, output_tokens INTEGER, total_cost FLOAT, accuracy_score FLOAT, "
+            "accuracy_rationale VARCHAR, timestamp DATETIME)"
+        ))
+
+    assert migrate(engine) == [migration.version for migration in MIGRATIONS]
+    assert migrate(engine) == []
+    assert applied_versions(engine) == [migration.version for migration in MIGRATIONS]
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("governancetelemetry")}
+    assert {"query_category", "batch_job_id", "cache_read_tokens", "persistence_ms"} <= columns
+    assert "telemetryrollup" in inspector.get_table_names()
+    indexes = {index["name"] for index in inspector.get_indexes("governancetelemetry")}
+    assert "ix_governancetelemetry_batch_job_id" in indexes
+    # Version 3's analytics indexes are gone again once analytics read the rollups
+    assert not {"ix_telemetry_model_platform", "ix_telemetry_category_model", "ix_telemetry_timestamp_model"} & indexes
+    engine.dispose()
+
+
+def _rollups(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT * FROM telemetryrollup")).mappings().all()
+    return {tuple(row[column] for column in KEY): {name: row[name] for name in MEASURES} for row in rows}
+
+
+def test_frozen_rollup_backfill_matches_maintained_rollups(db_engine):
+    for i in range(6):
+        scored = i % 3 != 0
+        db_module.db_service.add_telemetry(None, {
+            "trace_id": f"t-{i}", "provider": "aws", "model_id": f"model-{i % 2}",
+            "usage": {"latency_ms": 100.0 * i, "input_tokens": 10, "output_tokens": i},
+            "cost": {"total_cost": 0.01 * (i % 3)},
+            "batch_job_id": "job" if i == 5 else None,
+            "accuracy": {
+                "score": 10.0 * i if scored else 0.0,
+                "rationale": "Correct." if scored else "Evaluation pending",
+                "scored": scored,
+                "query_category": "Straightforward" if i % 2 else None,
+            },
+            "timings": {"guardrail_ms": 5.0 * i} if i % 2 else {},
+        })
+    maintained = _rollups(db_engine)
+
+    # Version 10 re-derives scored from the rationale, then refills every measure
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE governancetelemetry SET scored = FALSE"))
+        next(migration for migration in MIGRATIONS if migration.version == 10).apply(conn)
+    backfilled = _rollups(db_engine)
+
+    # Two models, one with and one without a query category, at both grains
+    assert len(maintained) == 4 and backfilled.keys() == maintained.keys()
+    assert sum(measures["scored_count"] for measures in maintained.values()) == 2 * 4
+    for key, measures in maintained.items():
+        assert backfilled[key] == pytest.approx(measures), key
+
+
+def test_every_analytics_query_uses_an_index(db_engine):
+    # Analytics read the rollups; each query must reach them through an index, not a scan
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "telemetryrollup" in statement:
+            statements.append((statement, parameters))
+
+    async def session_override():
+        async with AsyncSession(db_module.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    event.listen(db_module.async_engine.sync_engine, "before_cursor_execute", capture)
+    app.dependency_overrides[get_async_session] = session_override
+    try:
+        client = TestClient(app)
+        for url in ANALYTICS_URLS:
+            assert client.get(url).status_code == 200, url
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+        event.remove(db_module.async_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert len(statements) >= len(ANALYTICS_URLS)
+    with db_engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            scans = [step for step in plan if "telemetryrollup" in step]
+            assert scans and all("INDEX" in step for step in scans), (statement, plan)
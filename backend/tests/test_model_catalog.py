@@ -0,0 +1,77 @@
+import pytest
+
+from app.services.model_catalog import DEFAULT_RATES, ModelCatalog
+
+PER_M = 1_000_000
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return ModelCatalog()
+
+
+@pytest.mark.parametrize("model_id,name,input_rate,output_rate", [
+    ("us.anthropic.claude-sonnet-4-5-20250929-v1:0", "Claude Sonnet 4.5", 3.30, 16.50),
+    ("anthropic.claude-sonnet-4-20250514-v1:0", "Claude Sonnet 4", 3.00, 15.00),
+    ("anthropic.claude-3-5-sonnet-20241022-v2:0", "Claude 3.5 Sonnet v2", 3.00, 15.00),
+])
+def test_claude_ids_resolve_to_their_own_entry(catalog, model_id, name, input_rate, output_rate):
+    spec = catalog.resolve(model_id, "aws_bedrock")
+    assert spec.pricing_name == name
+    assert spec.input_rate * PER_M == pytest.approx(input_rate)
+    assert spec.output_rate * PER_M == pytest.approx(output_rate)
+
+
+def test_llama_ids_resolve_by_version_size_and_variant(catalog):
+    assert catalog.resolve("us.meta.llama3-2-11b-instruct-v1:0").pricing_name == "Llama 3.2 Instruct 11B"
+    assert catalog.resolve("us.meta.llama4-scout-17b-instruct-v1:0").pricing_name == "Llama 4 Scout 17B"
+    assert catalog.resolve("us.meta.llama4-maverick-17b-instruct-v1:0").pricing_name == "Llama 4 Maverick 17B"
+
+
+def test_longest_name_wins_for_openai_and_gemini(catalog):
+    mini = catalog.resolve("gpt-4o-mini", "openai")
+    assert mini.pricing_name == "gpt-4o-mini"
+    assert mini.input_rate < catalog.resolve("gpt-4o", "openai").input_rate
+    assert catalog.resolve("gemini-2.5-flash-lite", "gcp").pricing_name == "gemini-2.5-flash-lite"
+
+
+def test_prompt_cache_rates(catalog):
+    sonnet = catalog.resolve("us.anthropic.claude-sonnet-4-5-20250929-v1:0")
+    assert sonnet.cache_read_rate * 1e6 == pytest.approx(0.33)
+    assert sonnet.cache_write_rate * 1e6 == pytest.approx(4.125)
+    mini = catalog.resolve("gpt-4o-mini", "openai")
+    assert mini.cache_read_rate * 1e6 == pytest.approx(0.075) and mini.cache_write_rate == mini.input_rate
+    # No published cache rate (null or absent): cached tokens cost the normal input rate
+    assert catalog.resolve("gpt-5-pro", "openai").cache_read_rate == catalog.resolve("gpt-5-pro", "openai").input_rate
+    assert catalog.resolve("gemini-2.5-pro").cache_read_rate == catalog.resolve("gemini-2.5-pro").input_rate
+
+
+def test_unknown_models_fall_back_to_family_defaults(catalog):
+    spec = catalog.resolve("gpt-unreleased", "openai")
+    assert spec.pricing_name is None
+    assert (spec.input_rate, spec.output_rate) == DEFAULT_RATES["openai"]
+    assert catalog.resolve("mystery-model").input_rate == 0.0
+
+
+def test_resolve_is_memoized(catalog):
+    assert catalog.resolve("gpt-4o", "openai") is catalog.resolve("gpt-4o", "openai")
+
+
+@pytest.mark.parametrize("model_id,provider,adapter", [
+    ("anthropic.claude-3-haiku-20240307-v1:0", "aws", "claude"),
+    ("us.meta.llama3-3-70b-instruct-v1:0", "aws", "llama"),
+    ("o3-mini", "openai", "openai"),
+    ("gemini-2.5-pro", "google", "gemini"),
+])
+def test_routing(catalog, model_id, provider, adapter):
+    spec = catalog.resolve(model_id)
+    assert (spec.provider, spec.adapter) == (provider, adapter)
+
+
+def test_resolve_memo_is_bounded(catalog, monkeypatch):
+    monkeypatch.setattr(catalog._resolved, "max_entries", 8)
+    for i in range(50):
+        catalog.resolve(f"made-up-model-{i}")
+    assert len(catalog._resolved) == 8
+    # Evicted ids still resolve, they are just rebuilt
+    assert catalog.resolve("made-up-model-0").provider == "other"
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+from app.services.model_catalog import PRICING_DIR, ModelCatalog
+from app.services.pricing_service import PricingService
+
+
+@pytest.fixture
+def pricing_dir(tmp_path):
+    for name in ("aws_anthropic.json", "aws_meta.json", "openai.json", "gcp_vertex.json"):
+        shutil.copy(PRICING_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+def _edit_openai(pricing_dir, update):
+    path = pricing_dir / "openai.json"
+    data = json.loads(path.read_text())
+    update(data)
+    path.write_text(json.dumps(data))
+    # Make sure the change is visible even on filesystems with coarse mtimes
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _set_gpt4o_input(price):
+    def update(data):
+        for model in data["tiers"]["standard"]:
+            if model["model"] == "gpt-4o":
+                model["input"] = price
+    return update
+
+
+def test_changed_file_is_swapped_in_with_a_new_version(pricing_dir):
+    service = PricingService(ModelCatalog(pricing_dir))
+    before = service.calculate_cost("openai", "gpt-4o", 1_000_000, 0)
+
+    assert service.reload() is False  # nothing changed on disk
+    _edit_openai(pricing_dir, _set_gpt4o_input(5.0))
+    assert service.reload() is True
+
+    after = service.calculate_cost("openai", "gpt-4o", 1_000_000, 0)
+    assert after["input_cost"] == pytest.approx(5.0)
+    assert after["pricing_version"] != before["pricing_version"]
+    assert service.stats()["reloads"] == 1
+
+
+def test_invalid_table_is_rejected_and_current_version_kept(pricing_dir):
+    service = PricingService(ModelCatalog(pricing_dir))
+    version = service.version
+
+    _edit_openai(pricing_dir, _set_gpt4o_input(-1))
+    assert service.reload() is False
+    assert service.version == version
+    assert "invalid rates for gpt-4o" in service.stats()["last_error"]
+    assert service.reload() is False  # the same rejected files are not re-parsed
+    assert service.stats()["failed_reloads"] == 1
+
+    (pricing_dir / "gcp_vertex.json").write_text("{not json")
+    assert service.reload(force=True) is False
+    assert service.stats()["failed_reloads"] == 2
+    assert service.calculate_cost("openai", "gpt-4o", 1_000_000, 0)["input_cost"] == pytest.approx(2.5)
+
+
+def test_watcher_reloads_on_the_shared_executor(pricing_dir, monkeypatch):
+    service = PricingService(ModelCatalog(pricing_dir))
+    version = service.version
+    reloads = []
+    reload = service.reload
+
+    def tracked_reload():
+        changed = reload()
+        reloads.append(threading.current_thread().name)
+        return changed
+
+    monkeypatch.setattr(service, "reload", tracked_reload)
+    _edit_openai(pricing_dir, _set_gpt4o_input(5.0))
+
+    async def watch_briefly():
+        watcher = asyncio.create_task(service.watch(0.01))
+        while not reloads:
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(watch_briefly(), timeout=5))
+    assert reloads[0].startswith("invocation") and service.version != version
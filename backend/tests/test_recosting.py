@@ -0,0 +1,117 @@
+import pytest
+from sqlmodel import Session, select
+
+from app.models.telemetry import GovernanceTelemetry
+from app.services.pricing_service import pricing_service
+from app.services.recosting import recost_telemetry
+
+
+def _row(model_id, input_tokens, output_tokens, total_cost, **fields):
+    return GovernanceTelemetry(
+        trace_id=model_id, governance_context="aws", host_platform="ModelProvider.OPENAI",
+        model_id=model_id, latency_ms=1.0, input_tokens=input_tokens, output_tokens=output_tokens,
+        total_cost=total_cost, **fields
+    )
+
+
+def test_recost_rewrites_stale_costs_in_chunks(db_engine):
+    with Session(db_engine) as session:
+        session.add_all([
+            # Billed at gpt-4o rates by the old substring matcher
+            _row("gpt-4o-mini", 1_000_000, 1_000_000, 12.5),
+            _row("gpt-4o", 1_000_000, 0, 2.5, pricing_version=pricing_service.version),
+            _row("gpt-4o", 1_000_000, 0, 5.0, hedge_cost=2.0),
+            _row("gpt-4o", 1_000_000, 0, 0.0, cache_hit=True),
+        ])
+        session.commit()
+
+    report = recost_telemetry(engine=db_engine, chunk_size=3)
+
+    assert report["rows"] == 4 and report["chunks"] == 2
+    assert report["updated"] == 3  # the row already costed with this version is untouched
+    with Session(db_engine) as session:
+        rows = {(r.model_id, r.hedge_cost > 0, r.cache_hit): r for r in session.exec(select(GovernanceTelemetry))}
+    assert rows[("gpt-4o-mini", False, False)].total_cost == pytest.approx(0.75)
+    hedged = rows[("gpt-4o", True, False)]
+    assert (hedged.total_cost, hedged.hedge_cost) == (pytest.approx(5.0), pytest.approx(2.5))
+    assert rows[("gpt-4o", False, True)].total_cost == 0.0
+    assert all(r.pricing_version == pricing_service.version for r in rows.values())
+
+
+def test_dry_run_reports_without_writing(db_engine):
+    with Session(db_engine) as session:
+        session.add(_row("gpt-4o-mini", 1_000_000, 1_000_000, 12.5))
+        session.commit()
+
+    report = recost_telemetry(engine=db_engine, dry_run=True)
+
+    assert report["updated"] == 1
+    assert report["cost_after"] == pytest.approx(0.75)
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().total_cost == 12.5
+
+
+def test_batch_job_rows_are_recosted_at_batch_rates(db_engine):
+    with Session(db_engine) as session:
+        session.add(_row("gpt-4o-mini", 1_000_000, 1_000_000, 0.75, batch_job_id="job-1"))
+        session.commit()
+
+    recost_telemetry(engine=db_engine)
+
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().total_cost == pytest.approx(0.375)
+
+
+def test_recost_prices_prompt_cache_tokens_at_cache_rates(db_engine):
+    with Session(db_engine) as session:
+        session.add(_row("gpt-4o-mini", 1_000_000, 0, 0.15, cache_read_tokens=600_000))
+        session.commit()
+
+    recost_telemetry(engine=db_engine)
+
+    with Session(db_engine) as session:
+        row = session.exec(select(GovernanceTelemetry)).one()
+    # 400k uncached at 0.15 + 600k cached at 0.075 per 1M
+    assert row.total_cost == pytest.approx(0.06 + 0.045)
+    assert row.total_cost == pytest.approx(pricing_service.calculate_cost("openai", "gpt-4o-mini", 1_000_000, 0, cache_read_tokens=600_000)["total_cost"])
+
+
+def test_recost_endpoint_defaults_to_dry_run_and_queues_the_rewrite(db_engine, monkeypatch):
+    import asyncio
+    import functools
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.job_queue import JobQueue
+    from app.worker import Worker
+
+    with Session(db_engine) as session:
+        session.add(_row("gpt-4o-mini", 1_000_000, 1_000_000, 12.5))
+        session.commit()
+    monkeypatch.setattr("app.api.v1.endpoints.system.recost_telemetry", functools.partial(recost_telemetry, engine=db_engine))
+    calls = []
+
+    def recost(**kwargs):
+        calls.append("recost")
+        return recost_telemetry(engine=db_engine, **kwargs)
+
+    reload = pricing_service.reload
+    monkeypatch.setattr("app.worker.recost_telemetry", recost)
+    monkeypatch.setattr(pricing_service, "reload", lambda *args, **kwargs: calls.append("reload") or reload(*args, **kwargs))
+    client = TestClient(app)
+
+    preview = client.post("/api/v1/system/pricing/recost")
+    assert preview.status_code == 200 and preview.json()["dry_run"] and preview.json()["updated"] == 1
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().total_cost == 12.5
+
+    queued = client.post("/api/v1/system/pricing/recost?dry_run=false")
+    assert queued.status_code == 202 and queued.json()["kind"] == "recost"
+
+    # The rewrite happens in a worker, not in the request
+    assert asyncio.run(Worker(JobQueue(), "w1").run_once())
+    # ... priced with the pricing table currently on disk, not the one loaded at worker startup
+    assert calls == ["reload", "recost"]
+    job = client.get(f"/api/v1/jobs/{queued.json()['id']}").json()
+    assert job["status"] == "completed" and job["result"]["updated"] == 1 and not job["result"]["dry_run"]
+    with Session(db_engine) as session:
+        assert session.exec(select(GovernanceTelemetry)).one().total_cost == pytest.approx(0.75)
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.core.deadline import Deadline
+from app.services.retry import AttemptLog, RetryBudget, RetryPolicy, is_retryable
+
+
+def _client_error(code, status=400):
+    return ClientError({"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "InvokeModel")
+
+
+def _flaky(failures, error):
+    calls = []
+
+    async def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+    return attempt, calls
+
+
+def _policy(capacity=20, max_attempts=3):
+    return RetryPolicy(max_attempts=max_attempts, base_delay=0.001, max_delay=0.01, budget=RetryBudget(ratio=0.2, capacity=capacity))
+
+
+def test_errors_are_classified():
+    assert is_retryable(_client_error("ThrottlingException", 429))
+    assert is_retryable(_client_error("ServiceUnavailableException", 503))
+    assert not is_retryable(_client_error("ValidationException", 400))
+    assert not is_retryable(ValueError("Unsupported Bedrock model"))
+
+
+def test_transient_errors_are_retried_until_success():
+    attempt, calls = _flaky(2, _client_error("ThrottlingException", 429))
+    log = AttemptLog()
+
+    assert asyncio.run(_policy().run(attempt, Deadline(5), log)) == "ok"
+    assert log.count == 3 and log.errors == ["ClientError", "ClientError"]
+    assert all(0 < timeout <= 5 for timeout in calls)
+
+
+def test_fatal_errors_and_exhausted_budget_are_not_retried():
+    attempt, calls = _flaky(1, _client_error("AccessDeniedException", 403))
+    with pytest.raises(ClientError):
+        asyncio.run(_policy().run(attempt))
+    assert len(calls) == 1
+
+    policy = _policy(capacity=0)
+    attempt, calls = _flaky(1, _client_error("ThrottlingException", 429))
+    with pytest.raises(ClientError):
+        asyncio.run(policy.run(attempt))
+    assert len(calls) == 1 and policy.budget.exhausted == 1
+
+
+def test_no_retry_when_backoff_would_outlive_deadline():
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=1.0, budget=RetryBudget(ratio=0.2, capacity=20))
+    attempt, calls = _flaky(1, _client_error("ThrottlingException", 429))
+    deadline = Deadline(0.0)
+
+    with pytest.raises(ClientError):
+        asyncio.run(policy.run(attempt, deadline))
+    assert len(calls) == 1 and policy.budget.retries == 0
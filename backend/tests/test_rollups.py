@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import get_async_session
+from app.main import app
+from app.models.rollup import TelemetryRollup
+from app.services import db_service as db_module
+from app.services.db_service import db_service
+from app.services.rollups import MEASURES, rebuild_rollups
+from app.services.write_behind import WriteBehindWriter
+
+
+def _rollups(engine):
+    with Session(engine) as session:
+        rows = session.exec(select(TelemetryRollup)).all()
+        return {
+            (r.grain, r.bucket, r.model_id, r.host_platform, r.query_category, r.governance_context):
+            tuple(round(getattr(r, name), 9) for name in MEASURES)
+            for r in rows
+        }
+
+
+def test_incremental_rollups_match_rebuild_and_serve_analytics(db_engine, telemetry_log):
+    writer = WriteBehindWriter(durability="commit")
+
+    async def seed():
+        conversation_id = await writer.add_conversation("q", "q")
+        await writer.add_response(conversation_id, telemetry_log("gpt-4o", "t1", cost=0.002, latency=100.0, timings={"provider_call_ms": 100.0}))
+        await writer.add_response(conversation_id, telemetry_log("gpt-4o", "t2", cost=0.004, latency=300.0, timings={"provider_call_ms": 300.0}))
+        await writer.add_response(conversation_id, telemetry_log("gpt-4o-mini", "t3", cost=0.0, latency=50.0, timings={"provider_call_ms": 50.0}))
+        # Rescoring moves rows into their evaluated category
+        await writer.update_accuracy("t1", {"score": 80, "query_category": "Advanced", "scored": True}, 5.0)
+        await writer.update_accuracy("t2", {"score": 60, "query_category": "Advanced", "scored": True}, 7.0)
+        await writer.update_accuracy("t3", {"score": 40, "query_category": "Straightforward", "scored": True}, 3.0)
+        await writer.stop()
+        return conversation_id
+
+    conversation_id = asyncio.run(seed())
+    # Batch inference ingestion goes through the sync service
+    message = db_service.add_message(conversation_id, "assistant", "batched")
+    db_service.add_telemetry(message.id, telemetry_log("gpt-4o", "t4", cost=0.001, latency=0.0, batch_job_id="job-1", timings={"provider_call_ms": 0.0}))
+
+    incremental = _rollups(db_engine)
+    rebuild_rollups(db_engine)
+    assert incremental == _rollups(db_engine)
+
+    async def session_override():
+        async with AsyncSession(db_module.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    try:
+        client = TestClient(app)
+        performance = {row["model_id"]: row for row in client.get("/api/v1/analytics/model-performance").json()}
+        gpt = performance["gpt-4o"]
+        assert gpt["total_requests"] == 3 and gpt["total_cost"] == 0.007
+        # Batch rows count towards cost but not latency; the unscored batch row not towards accuracy
+        assert gpt["avg_latency_ms"] == 200.0 and gpt["stddev_latency_ms"] == 100.0
+        assert gpt["avg_accuracy"] == 70.0 and gpt["stddev_accuracy"] == 10.0
+        complexity = client.get("/api/v1/analytics/complexity-analysis").json()
+        assert [(row["query_category"], row["model_id"], row["request_count"]) for row in complexity] == [
+            ("Advanced", "gpt-4o", 2), ("Straightforward", "gpt-4o-mini", 1)
+        ]
+        trends = client.get("/api/v1/analytics/accuracy-trends?days=1").json()
+        assert {row["date"] for row in trends} == {datetime.utcnow().strftime("%Y-%m-%d")}
+        summary = client.get("/api/v1/analytics/summary").json()
+        assert summary["total_requests"] == 4 and summary["most_cost_effective_model"] == "gpt-4o"
+
+        # Deleting the conversation takes its rows out of every bucket
+        assert client.delete(f"/api/v1/history/conversations/{conversation_id}").status_code == 200
+        assert _rollups(db_engine) == {}
+        assert client.get("/api/v1/analytics/summary").json()["total_requests"] == 0
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+
+
+def test_rescoring_prunes_only_the_emptied_buckets_by_key(db_engine, telemetry_log):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM telemetryrollup"):
+            statements.append((statement, parameters))
+
+    db_service.add_telemetry(None, telemetry_log("gpt-4o", "t1", cost=0.002, latency=100.0))
+    db_service.add_telemetry(None, telemetry_log("gpt-4o", "t2", cost=0.002, latency=100.0))
+    event.listen(db_engine, "before_cursor_execute", capture)
+    try:
+        db_service.update_telemetry_accuracy("t1", {"score": 80, "query_category": "Advanced", "scored": True})
+    finally:
+        event.remove(db_engine, "before_cursor_execute", capture)
+
+    # t2 keeps the uncategorised buckets alive; moving t1 creates the "Advanced" ones
+    assert {key[4] for key in _rollups(db_engine)} == {"", "Advanced"}
+    assert len(statements) == 1
+    with db_engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statements[0][0]}", statements[0][1])]
+    assert plan and all("INDEX" in step for step in plan), plan
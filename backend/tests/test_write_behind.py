@@ -0,0 +1,50 @@
+import asyncio
+
+from sqlmodel import Session, select
+
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.telemetry import GovernanceTelemetry
+from app.services.write_behind import WriteBehindWriter
+
+
+def test_concurrent_writes_share_group_commits(db_engine, telemetry_log):
+    writer = WriteBehindWriter(linger_ms=20)
+
+    async def run():
+        conversation_id = await writer.add_conversation("is my bucket public?", "is my bucket public?")
+        await asyncio.gather(*(writer.add_response(conversation_id, telemetry_log(f"model-{i}", rationale="pending")) for i in range(10)))
+        await writer.update_accuracy("trace-model-3", {"score": 90, "rationale": "correct"}, 4.0)
+        # Async mode: nothing is committed until the writer gets to it
+        await writer.stop()
+
+    asyncio.run(run())
+
+    stats = writer.stats()
+    assert stats["writes"] == 12
+    assert stats["commits"] < 12
+    with Session(db_engine) as session:
+        assert len(session.exec(select(Conversation)).all()) == 1
+        assert len(session.exec(select(Message)).all()) == 11
+        rows = session.exec(select(GovernanceTelemetry)).all()
+        assert len(rows) == 10 and all(row.persistence_ms > 0 for row in rows)
+        scored = session.exec(select(GovernanceTelemetry).where(GovernanceTelemetry.trace_id == "trace-model-3")).one()
+        assert scored.accuracy_score == 90 and scored.evaluation_ms == 4.0
+
+
+def test_failed_write_does_not_sink_its_batch(db_engine, telemetry_log):
+    writer = WriteBehindWriter(linger_ms=20, durability="commit")
+
+    async def run():
+        conversation_id = await writer.add_conversation("q", "q")
+        good = writer.add_response(conversation_id, telemetry_log("good", rationale="pending"))
+        # No such conversation: the foreign key rejects this row
+        bad = writer.add_response("missing-conversation", telemetry_log("bad", rationale="pending"))
+        return await asyncio.gather(good, bad, return_exceptions=True)
+
+    good, bad = asyncio.run(run())
+
+    assert good > 0 and isinstance(bad, Exception)
+    assert writer.stats()["failed"] == 1
+    with Session(db_engine) as session:
+        assert [row.model_id for row in session.exec(select(GovernanceTelemetry)).all()] == ["good"]
@@ -12,7 +12,7 @@ import {
   ExecutionConfig
 } from '@/types/ai-platform';
 import { AI_MODELS, getModelById } from '@/data/models';
-import api, { BackendModelConfig, GovernanceLog } from '@/services/api';
+import api, { AccuracyMetrics, BackendModelConfig, GovernanceLog } from '@/services/api';
 import { useToast } from '@/hooks/use-toast';
 import {
   generateAnalytics,
@@ -408,13 +408,59 @@ export function useAIPlatform() {
       const modelRuns: ModelRun[] = [];
       let total = config.selectedModels.length;
       let completed = 0;
+      // Text of models still generating, keyed by model_id (filled by 'delta' events)
+      const drafts = new Map<string, ModelRun>();
+      let buffered = '';
+
+      // Push the current runs into the session and analytics panels
+      const publishRuns = () => {
+        // Update session progressively
+        const assistantMessage: Message = {
+          id: generateId(),
+          role: 'assistant',
+          content: 'Multi-model response',
+          timestamp: new Date(),
+          modelRuns: [...modelRuns, ...drafts.values()],
+        };
+
+        const updatedSession: Session = {
+          ...targetSession,
+          title: targetSession.messages.length === 0
+            ? (prompt.slice(0, 40) + (prompt.length > 40 ? '...' : ''))
+            : targetSession.title,
+          updatedAt: new Date(),
+          messages: [...targetSession.messages.filter(m => m.role !== 'assistant' || m.id !== assistantMessage.id), userMessage, assistantMessage],
+          totalTokens: targetSession.totalTokens + modelRuns.reduce((sum, run) => sum + run.inputTokens + run.outputTokens, 0),
+          totalCost: targetSession.totalCost + modelRuns.reduce((sum, run) => sum + run.cost, 0),
+          isTokenOptimized: config.useHistory && targetSession.messages.length > 0,
+        };
+
+        setCurrentSession(updatedSession);
+        setSessions(prev => {
+          const index = prev.findIndex(s => s.id === updatedSession.id);
+          if (index >= 0) {
+            return prev.map(s => s.id === updatedSession.id ? updatedSession : s);
+          } else {
+            return [updatedSession, ...prev];
+          }
+        });
+
+        // Update analytics progressively
+        setAnalytics(generateAnalytics(modelRuns));
+        setRecommendations(generateRecommendations(modelRuns));
+        setConfidence(generateConfidence(modelRuns));
+        setDivergence(generateDivergence(modelRuns));
+        setPromptSuggestions(analyzePrompt(prompt));
+      };
 
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const chunk = decoder.decode(value);
-        const lines = chunk.split('\n');
+        // An SSE line can be split across reads; keep the incomplete tail for the next one
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() ?? '';
 
         for (const line of lines) {
           if (line.startsWith('data: ')) {
@@ -423,8 +469,25 @@ export function useAIPlatform() {
             if (data.type === 'start') {
               total = data.total;
               onProgress?.(0, total);
+            } else if (data.type === 'delta') {
+              // Partial text from a model that is still generating
+              const draft = drafts.get(data.model_id);
+              drafts.set(data.model_id, {
+                id: `draft-${data.model_id}`,
+                modelId: data.model_id,
+                response: (draft?.response ?? '') + data.text,
+                inputTokens: 0,
+                outputTokens: 0,
+                latencyMs: 0,
+                cost: 0,
+                contextUsage: 0,
+                timestamp: new Date(),
+                status: 'running',
+              });
+              publishRuns();
             } else if (data.type === 'result') {
               const log: GovernanceLog = data.data;
+              drafts.delete(log.model_id);
               const model = getModelById(log.model_id);
 
               const modelRun: ModelRun = {
@@ -450,44 +513,21 @@ export function useAIPlatform() {
               modelRuns.push(modelRun);
               completed++;
               onProgress?.(completed, total);
-
-              // Update session progressively
-              const assistantMessage: Message = {
-                id: generateId(),
-                role: 'assistant',
-                content: 'Multi-model response',
-                timestamp: new Date(),
-                modelRuns: [...modelRuns],
-              };
-
-              const updatedSession: Session = {
-                ...targetSession,
-                title: targetSession.messages.length === 0
-                  ? (prompt.slice(0, 40) + (prompt.length > 40 ? '...' : ''))
-                  : targetSession.title,
-                updatedAt: new Date(),
-                messages: [...targetSession.messages.filter(m => m.role !== 'assistant' || m.id !== assistantMessage.id), userMessage, assistantMessage],
-                totalTokens: targetSession.totalTokens + modelRuns.reduce((sum, run) => sum + run.inputTokens + run.outputTokens, 0),
-                totalCost: targetSession.totalCost + modelRuns.reduce((sum, run) => sum + run.cost, 0),
-                isTokenOptimized: config.useHistory && targetSession.messages.length > 0,
-              };
-
-              setCurrentSession(updatedSession);
-              setSessions(prev => {
-                const index = prev.findIndex(s => s.id === updatedSession.id);
-                if (index >= 0) {
-                  return prev.map(s => s.id === updatedSession.id ? updatedSession : s);
-                } else {
-                  return [updatedSession, ...prev];
-                }
-              });
-
-              // Update analytics progressively
-              setAnalytics(generateAnalytics(modelRuns));
-              setRecommendations(generateRecommendations(modelRuns));
-              setConfidence(generateConfidence(modelRuns));
-              setDivergence(generateDivergence(modelRuns));
-              setPromptSuggestions(analyzePrompt(prompt));
+              publishRuns();
+            } else if (data.type === 'evaluation') {
+              // Judge verdict for a result already received (two-phase streaming)
+              const index = modelRuns.findIndex(run => run.id === data.id);
+              if (index >= 0) {
+                const accuracy: AccuracyMetrics = data.data;
+                modelRuns[index] = {
+                  ...modelRuns[index],
+                  accuracy: accuracy.score,
+                  accuracyRationale: accuracy.rationale,
+                  queryCategory: accuracy.query_category,
+                  promptOptimization: accuracy.prompt_optimization,
+                };
+                publishRuns();
+              }
             } else if (data.type === 'complete') {
               toast({
                 title: "Analysis Complete",
@@ -21,13 +21,18 @@ export interface UsageMetrics {
     input_tokens: number;
     output_tokens: number;
     total_tokens: number;
+    cache_read_tokens?: number; // part of input_tokens served from the provider's prompt cache
+    cache_write_tokens?: number; // part of input_tokens written to the prompt cache
     latency_ms: number;
+    time_to_first_token_ms?: number | null; // streamed calls only
 }
 
 export interface CostMetrics {
     input_cost: number;
     output_cost: number;
-    total_cost: number;
+    total_cost: number; // includes hedge_cost
+    hedge_cost?: number; // duplicate spend from a hedged request
+    pricing_version?: string | null; // pricing table used for this cost
 }
 
 export interface AccuracyMetrics {
@@ -36,6 +41,7 @@ export interface AccuracyMetrics {
     evaluator_model: string;
     query_category?: string;
     prompt_optimization?: string;
+    evaluator_cost?: number; // judge call cost in USD (0 when the verdict was reused)
 }
 
 export interface GovernanceLog {
@@ -100,6 +106,15 @@ export interface ModelPerformance {
     avg_input_tokens: number;
     avg_output_tokens: number;
     total_cost: number;
+    stddev_accuracy?: number | null;
+    stddev_latency_ms?: number | null;
+    // Per-phase breakdown (ms); null where no row recorded the phase
+    avg_db_setup_ms?: number | null;
+    avg_guardrail_ms?: number | null;
+    avg_provider_call_ms?: number | null;
+    avg_time_to_first_token_ms?: number | null;
+    avg_evaluation_ms?: number | null;
+    avg_persistence_ms?: number | null;
 }
 
 export interface CostBreakdown {